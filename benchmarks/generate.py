@@ -0,0 +1,492 @@
+"""
+Fills the `students` table with millions of realistic synthetic students.
+
+Every row satisfies the `Student` model. Phone numbers are canonical
+Iranian mobile numbers matching `RegexPatternEnum.IRAN_PHONE_NUMBER`,
+unique across the whole dataset. Gender and education are
+`GenderOptions` and `GradeOptions` members. A student is born, enrolls
+and graduates in that order, at an age and after a duration that fit
+their degree, and the students still studying have no graduation date.
+Names, streets and cities follow a Zipf distribution, so a few values are
+very common and most are rare, and enrollments cluster at the start of
+the two terms and grow towards recent years.
+
+Rows are produced in chunks of ``--chunk-size``. Each chunk is generated
+from its own random stream, derived from ``--seed`` and the chunk's
+position, so a seed always yields the same students however many
+``--workers`` share the work; only the ids, taken from the sequence in
+load order, differ between runs. ``--start`` skips that many rows of the
+seed's dataset, so a table can be grown in several runs without repeating
+a phone number.
+
+Each worker process generates its chunks and streams them to the server
+with ``COPY FROM STDIN``, one transaction per chunk. A chunk colliding
+with a phone number already in the table is loaded through a temporary
+table with ``ON CONFLICT DO NOTHING`` instead, and the colliding rows are
+counted as skipped. The partitions of the enrollment years are created
+before the load, so no row lands in the default partition.
+
+``--defer-indexes`` drops the secondary indexes of the table for the load
+and builds them again at the end, which is several times faster than
+maintaining them row by row. Queries on the table are slow meanwhile, so
+use it on a database of its own.
+
+Usage::
+
+    python -m benchmarks.generate --rows 10000000 --seed 42 --truncate --defer-indexes
+    python -m benchmarks.generate --rows 1000000 --start 10000000 --seed 42
+"""
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import psycopg
+from psycopg import errors, sql
+
+from database.partitions import SKIP_CONFLICTS
+from kernel.settings.database import DB_CONF
+from kernel.settings.partitioning import PARTITION_MONTHS
+from student.helpers.enums import GenderOptions, GradeOptions
+
+COLUMNS = [
+    'first_name', 'last_name', 'phone_number', 'gender', 'birth_date',
+    'education', 'enrollment_date', 'graduation_date', 'address',
+]
+
+COPY = sql.SQL('COPY {} ({}) FROM STDIN').format(
+    sql.Identifier('students'), sql.SQL(', ').join(map(sql.Identifier, COLUMNS))
+)
+
+# mobile prefixes in use, all but 099, which the load test creates students
+# with; each holds 10^7 numbers
+PHONE_PREFIXES = (
+    '0901', '0902', '0903', '0904', '0905',
+    '0910', '0911', '0912', '0913', '0914', '0915', '0916', '0917', '0918', '0919',
+    '0920', '0921', '0922',
+    '0930', '0933', '0935', '0936', '0937', '0938', '0939',
+)
+PHONE_SUFFIXES = 10 ** 7
+
+FEMALE_NAMES = (
+    'Fatemeh', 'Zahra', 'Maryam', 'Zeinab', 'Masoumeh', 'Sara', 'Narges', 'Leila',
+    'Mahsa', 'Elham', 'Somayeh', 'Nazanin', 'Ameneh', 'Hanieh', 'Faezeh', 'Samira',
+    'Parisa', 'Negin', 'Shirin', 'Mina', 'Azadeh', 'Roya', 'Niloufar', 'Atefeh',
+    'Setareh', 'Yasaman', 'Kimia', 'Helia', 'Ava', 'Parastoo', 'Tarannom', 'Golnaz',
+    'Mahtab', 'Shiva', 'Bahar', 'Ladan', 'Soheila', 'Forough', 'Pegah', 'Raha',
+)
+MALE_NAMES = (
+    'Mohammad', 'Ali', 'Hossein', 'Mahdi', 'Reza', 'Amir', 'Mohammadreza', 'Hassan',
+    'Abolfazl', 'Mohsen', 'Ahmad', 'Saeed', 'Mostafa', 'Hamid', 'Javad', 'Majid',
+    'Amirhossein', 'Morteza', 'Mehdi', 'Alireza', 'Behnam', 'Peyman', 'Kourosh', 'Arash',
+    'Babak', 'Dariush', 'Farhad', 'Kaveh', 'Navid', 'Omid', 'Pouya', 'Sina',
+    'Siavash', 'Soroush', 'Parsa', 'Aria', 'Bardia', 'Kian', 'Nima', 'Ramin',
+)
+LAST_NAMES = (
+    'Mohammadi', 'Hosseini', 'Ahmadi', 'Rezaei', 'Moradi', 'Mousavi', 'Karimi', 'Jafari',
+    'Rahimi', 'Hashemi', 'Ghasemi', 'Abbasi', 'Sadeghi', 'Heidari', 'Mahmoudi', 'Ebrahimi',
+    'Alizadeh', 'Rostami', 'Kazemi', 'Jalali', 'Asadi', 'Salehi', 'Najafi', 'Zamani',
+    'Akbari', 'Ghorbani', 'Yousefi', 'Bagheri', 'Shahbazi', 'Nazari', 'Rahmani', 'Kamali',
+    'Azizi', 'Safari', 'Tehrani', 'Esfahani', 'Shirazi', 'Tabrizi', 'Kermani', 'Yazdani',
+    'Mashhadi', 'Rashidi', 'Soltani', 'Farahani', 'Behzadi', 'Sharifi', 'Amini', 'Habibi',
+    'Nouri', 'Golzari', 'Pahlavan', 'Mirzaei', 'Khosravi', 'Darvishi', 'Nikpour', 'Bahrami',
+    'Farzaneh', 'Ansari', 'Vahidi', 'Sobhani',
+)
+STREETS = (
+    'Azadi', 'Enghelab', 'Valiasr', 'Jomhouri', 'Imam Khomeini', 'Ferdowsi', 'Hafez',
+    'Saadi', 'Keshavarz', 'Motahari', 'Shariati', 'Pasdaran', 'Beheshti', 'Taleghani',
+    'Bahar', 'Golestan', 'Laleh', 'Nastaran', 'Sepah', 'Kargar', 'Ostad Moein', 'Nejatollahi',
+)
+CITIES = (
+    'Tehran', 'Mashhad', 'Isfahan', 'Karaj', 'Shiraz', 'Tabriz', 'Qom', 'Ahvaz',
+    'Kermanshah', 'Urmia', 'Rasht', 'Zahedan', 'Hamadan', 'Kerman', 'Yazd', 'Ardabil',
+    'Bandar Abbas', 'Arak', 'Zanjan', 'Sanandaj', 'Qazvin', 'Khorramabad', 'Gorgan', 'Sari',
+)
+
+GENDERS = [member.name for member in GenderOptions]
+EDUCATIONS = [member.name for member in GradeOptions]
+
+# share of students by degree, and for each degree the youngest and oldest
+# age at enrollment and the nominal years of study
+EDUCATION_WEIGHTS = {
+    GradeOptions.DIPLOMA: 15,
+    GradeOptions.BACHELOR: 55,
+    GradeOptions.MASTER: 22,
+    GradeOptions.DOCTORATE: 8,
+}
+EDUCATION_PROFILES = {
+    GradeOptions.DIPLOMA.name: (17, 20, 2),
+    GradeOptions.BACHELOR.name: (18, 24, 4),
+    GradeOptions.MASTER.name: (22, 32, 2),
+    GradeOptions.DOCTORATE.name: (24, 38, 5),
+}
+
+DROPOUT_RATE = 0.08
+MISSING_ADDRESS_RATE = 0.03
+DAYS_PER_YEAR = 365.25
+
+DEFAULT_UNTIL = date(2026, 9, 1)
+
+
+def zipf_weights(count: int, exponent: float = 1.07) -> List[float]:
+    """Returns the cumulative weights of a Zipf distribution over `count` ranks."""
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+FEMALE_NAME_WEIGHTS = zipf_weights(len(FEMALE_NAMES))
+MALE_NAME_WEIGHTS = zipf_weights(len(MALE_NAMES))
+LAST_NAME_WEIGHTS = zipf_weights(len(LAST_NAMES), exponent=0.9)
+STREET_WEIGHTS = zipf_weights(len(STREETS))
+CITY_WEIGHTS = zipf_weights(len(CITIES), exponent=1.3)
+EDUCATION_CUM_WEIGHTS = list(itertools.accumulate(
+    EDUCATION_WEIGHTS[GradeOptions[name]] for name in EDUCATIONS
+))
+
+
+@lru_cache(maxsize=None)
+def isoformat(ordinal: int) -> str:
+    """Formats a proleptic Gregorian ordinal as an ISO date, memoized."""
+    return date.fromordinal(ordinal).isoformat()
+
+
+class PhoneNumbers:
+    """
+    A bijection from row positions to phone numbers.
+
+    Position `i` maps to number `(a * i + b) mod N` of the `N` numbers under
+    `PHONE_PREFIXES`, with `a` coprime to `N`, so distinct positions always
+    get distinct numbers while consecutive positions look unrelated. `a` and
+    `b` are derived from the seed.
+
+    Parameters
+    ----------
+    seed : int
+        The seed of the dataset.
+    """
+
+    def __init__(self, seed: int) -> None:
+        self.capacity = len(PHONE_PREFIXES) * PHONE_SUFFIXES
+        rng = random.Random(f'{seed}-phones')
+        self.multiplier = rng.randrange(1, self.capacity)
+        while math.gcd(self.multiplier, self.capacity) != 1:
+            self.multiplier = rng.randrange(1, self.capacity)
+        self.offset = rng.randrange(self.capacity)
+
+    def __getitem__(self, position: int) -> str:
+        number = (self.multiplier * position + self.offset) % self.capacity
+        prefix, suffix = divmod(number, PHONE_SUFFIXES)
+        return f'{PHONE_PREFIXES[prefix]}{suffix:07d}'
+
+
+class StudentGenerator:
+    """
+    Generates the chunks of one seed's dataset.
+
+    Parameters
+    ----------
+    seed : int
+        The seed of the dataset.
+    until : date
+        The latest enrollment and graduation date.
+    years : int
+        Over how many years up to `until` students enrolled.
+    """
+
+    def __init__(self, seed: int, until: date, years: int) -> None:
+        self.seed = seed
+        self.until = until.toordinal()
+        self.first_year = until.year - years + 1
+        self.years = years
+        self.phones = PhoneNumbers(seed)
+        # the first day of the autumn and winter terms, and of the year
+        self.terms = {
+            year: (
+                date(year, 9, 23).toordinal(),
+                date(year, 2, 1).toordinal(),
+                date(year, 1, 1).toordinal(),
+            )
+            for year in range(self.first_year, until.year + 1)
+        }
+
+    def chunk(self, index: int, start: int, stop: int) -> bytes:
+        """
+        Generates the rows at positions `start` to `stop` of the dataset.
+
+        Parameters
+        ----------
+        index : int
+            The position of the chunk, which seeds its random stream.
+        start : int
+            The position of its first row.
+        stop : int
+            The position after its last row.
+
+        Returns
+        -------
+        bytes
+            The rows in `COPY` text format, in `COLUMNS` order.
+        """
+        rng = random.Random(f'{self.seed}-{index}')
+        count = stop - start
+        genders = rng.choices(GENDERS, k=count)
+        female_names = rng.choices(FEMALE_NAMES, cum_weights=FEMALE_NAME_WEIGHTS, k=count)
+        male_names = rng.choices(MALE_NAMES, cum_weights=MALE_NAME_WEIGHTS, k=count)
+        last_names = rng.choices(LAST_NAMES, cum_weights=LAST_NAME_WEIGHTS, k=count)
+        educations = rng.choices(EDUCATIONS, cum_weights=EDUCATION_CUM_WEIGHTS, k=count)
+        streets = rng.choices(STREETS, cum_weights=STREET_WEIGHTS, k=count)
+        cities = rng.choices(CITIES, cum_weights=CITY_WEIGHTS, k=count)
+        female = GenderOptions.FEMALE.name
+        phones = self.phones
+        lines = []
+        for offset in range(count):
+            gender = genders[offset]
+            education = educations[offset]
+            enrolled = self.enrollment_day(rng)
+            youngest, oldest, years = EDUCATION_PROFILES[education]
+            age = youngest + (oldest - youngest) * rng.random() ** 2
+            born = enrolled - int(age * DAYS_PER_YEAR) - rng.randrange(365)
+            graduated = enrolled + int(years * DAYS_PER_YEAR * (0.9 + 0.5 * rng.random()))
+            if graduated > self.until or rng.random() < DROPOUT_RATE:
+                graduation_date = '\\N'
+            else:
+                graduation_date = isoformat(graduated)
+            if rng.random() < MISSING_ADDRESS_RATE:
+                address = '\\N'
+            else:
+                address = f'No. {rng.randrange(1, 400)}, {streets[offset]} St., {cities[offset]}'
+            lines.append('\t'.join((
+                female_names[offset] if gender == female else male_names[offset],
+                last_names[offset],
+                phones[start + offset],
+                gender,
+                isoformat(born),
+                education,
+                isoformat(enrolled),
+                graduation_date,
+                address,
+            )))
+        lines.append('')
+        return '\n'.join(lines).encode()
+
+    def enrollment_day(self, rng: random.Random) -> int:
+        """Draws an enrollment date, as an ordinal, most at a term start."""
+        # the density grows linearly over the years, as enrollment did
+        year = self.first_year + int(self.years * math.sqrt(rng.random()))
+        autumn, winter, new_year = self.terms[year]
+        roll = rng.random()
+        if roll < 0.6:
+            day = autumn + rng.randrange(21)
+        elif roll < 0.85:
+            day = winter + rng.randrange(21)
+        else:
+            day = new_year + rng.randrange(365)
+        return day if day <= self.until else day - 365
+
+
+def connect(**kwargs) -> psycopg.Connection:
+    """Connects to the configured database."""
+    return psycopg.connect(
+        host=DB_CONF['DB_HOST'],
+        port=DB_CONF['DB_PORT'],
+        user=DB_CONF['DB_USER'],
+        password=DB_CONF['DB_PASSWORD'],
+        dbname=DB_CONF['DB_NAME'],
+        **kwargs
+    )
+
+
+def chunks(start: int, rows: int, size: int) -> Iterator[Tuple[int, int, int]]:
+    """Splits positions `start` to `start + rows` into aligned chunks."""
+    # chunk boundaries depend on the position alone, so a dataset generated
+    # in several runs is made of the very same chunks
+    stop = start + rows
+    position = start
+    while position < stop:
+        index = position // size
+        end = min((index + 1) * size, stop)
+        yield index, position, end
+        position = end
+
+
+# the generator and connection of a worker process
+_generator: Optional[StudentGenerator] = None
+_connection: Optional[psycopg.Connection] = None
+
+DEADLOCK_RETRIES = 5
+
+
+def _start_worker(seed: int, until: date, years: int) -> None:
+    global _generator, _connection
+    _generator = StudentGenerator(seed, until, years)
+    _connection = connect(autocommit=True)
+
+
+def load_chunk(job: Tuple[int, int, int]) -> Tuple[int, int]:
+    """
+    Generates one chunk in a worker process and loads it.
+
+    The `students` triggers upsert the statistics buckets of the chunk, so
+    two workers committing at once can deadlock; the loser just loads its
+    chunk again.
+
+    Returns
+    -------
+    tuple of int
+        The number of rows inserted and skipped.
+    """
+    payload = _generator.chunk(*job)
+    count = job[2] - job[1]
+    for attempt in range(1, DEADLOCK_RETRIES + 1):
+        try:
+            try:
+                with _connection.transaction(), _connection.cursor() as cursor:
+                    with cursor.copy(COPY) as copy:
+                        copy.write(payload)
+                return count, 0
+            except errors.UniqueViolation:
+                inserted = merge_chunk(payload)
+                return inserted, count - inserted
+        except errors.DeadlockDetected:
+            if attempt == DEADLOCK_RETRIES:
+                raise
+
+
+def merge_chunk(payload: bytes) -> int:
+    """Loads a chunk skipping the rows whose phone number is taken."""
+    columns = sql.SQL(', ').join(map(sql.Identifier, COLUMNS))
+    with _connection.transaction(), _connection.cursor() as cursor:
+        cursor.execute(sql.SQL(
+            'CREATE TEMPORARY TABLE generated ON COMMIT DROP AS '
+            'SELECT {} FROM students WITH NO DATA'
+        ).format(columns))
+        with cursor.copy(sql.SQL('COPY generated ({}) FROM STDIN').format(columns)) as copy:
+            copy.write(payload)
+        cursor.execute(SKIP_CONFLICTS.text)
+        cursor.execute(sql.SQL(
+            'INSERT INTO students ({columns}) SELECT {columns} FROM generated '
+            'ON CONFLICT DO NOTHING'
+        ).format(columns=columns))
+        return cursor.rowcount
+
+
+def secondary_indexes(connection: psycopg.Connection) -> List[Tuple[str, str]]:
+    """
+    Lists the name and definition of the indexes backing no constraint.
+
+    The definitions of the partitioned indexes are made to create the index
+    of every partition too, not of the table alone.
+    """
+    rows = connection.execute("""
+        SELECT index.relname, pg_get_indexdef(pg_index.indexrelid)
+        FROM pg_index
+        JOIN pg_class AS index ON index.oid = pg_index.indexrelid
+        WHERE pg_index.indrelid = 'students'::regclass
+          AND NOT EXISTS (
+              SELECT 1 FROM pg_constraint WHERE conindid = pg_index.indexrelid
+          )
+        ORDER BY index.relname
+    """).fetchall()
+    return [(name, definition.replace(' ON ONLY ', ' ON ')) for name, definition in rows]
+
+
+def build_indexes(definitions: Sequence[Tuple[str, str]], maintenance_work_mem: str) -> None:
+    """Creates the given indexes, one at a time with the given sort memory."""
+    with connect(autocommit=True) as connection:
+        connection.execute(
+            "SELECT set_config('maintenance_work_mem', %s, false)", (maintenance_work_mem,)
+        )
+        for name, definition in definitions:
+            started = time.perf_counter()
+            connection.execute(definition)
+            print(f'built {name} in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+
+
+def generate(args: argparse.Namespace) -> dict:
+    """Generates and loads the requested rows, and returns a summary."""
+    capacity = PhoneNumbers(args.seed).capacity
+    if args.start + args.rows > capacity:
+        raise SystemExit(f'a dataset holds at most {capacity} students')
+
+    deferred: List[Tuple[str, str]] = []
+    with connect(autocommit=True) as connection:
+        if args.truncate:
+            connection.execute('TRUNCATE students RESTART IDENTITY')
+        # a drawn enrollment may fall in the year before the first one
+        connection.execute(
+            'SELECT students_ensure_partitions(%s, %s, %s)',
+            (PARTITION_MONTHS, date(args.until.year - args.years, 1, 1), args.until + timedelta(days=1)),
+        )
+        if args.defer_indexes:
+            deferred = secondary_indexes(connection)
+            for name, definition in deferred:
+                # printed first, so an interrupted run can be repaired by hand
+                print(f'dropping {name}: {definition}', file=sys.stderr)
+                connection.execute(sql.SQL('DROP INDEX {}').format(sql.Identifier(name)))
+
+    inserted = skipped = 0
+    started = time.perf_counter()
+    try:
+        # no connection is open across the fork, each worker opens its own
+        with multiprocessing.Pool(
+            args.workers,
+            initializer=_start_worker,
+            initargs=(args.seed, args.until, args.years),
+        ) as pool:
+            jobs = chunks(args.start, args.rows, args.chunk_size)
+            for chunk_inserted, chunk_skipped in pool.imap_unordered(load_chunk, jobs):
+                inserted += chunk_inserted
+                skipped += chunk_skipped
+                elapsed = time.perf_counter() - started
+                print(
+                    f'\r{inserted + skipped}/{args.rows} rows, '
+                    f'{(inserted + skipped) / elapsed:,.0f} rows/s',
+                    end='', file=sys.stderr,
+                )
+        print(file=sys.stderr)
+        loaded = time.perf_counter()
+    finally:
+        if deferred:
+            build_indexes(deferred, args.maintenance_work_mem)
+    indexed = time.perf_counter()
+    with connect(autocommit=True) as connection:
+        connection.execute('ANALYZE students')
+    return {
+        'rows': args.rows,
+        'inserted': inserted,
+        'skipped': skipped,
+        'workers': args.workers,
+        'load_seconds': round(loaded - started, 2),
+        'index_seconds': round(indexed - loaded, 2),
+        'rows_per_second': round(args.rows / (loaded - started)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help='students to generate')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the dataset')
+    parser.add_argument('--start', type=int, default=0, help='rows of the dataset to skip')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='generating and loading processes')
+    parser.add_argument('--chunk-size', type=int, default=50_000, help='rows per transaction')
+    parser.add_argument('--until', type=date.fromisoformat, default=DEFAULT_UNTIL,
+                        help=f'the latest enrollment date, default {DEFAULT_UNTIL}')
+    parser.add_argument('--years', type=int, default=15, help='years of enrollments up to --until')
+    parser.add_argument('--truncate', action='store_true', help='empty the table first')
+    parser.add_argument('--defer-indexes', action='store_true',
+                        help='drop the secondary indexes for the load and rebuild them after')
+    parser.add_argument('--maintenance-work-mem', default='1GB',
+                        help='sort memory of the index builds')
+    print(json.dumps(generate(parser.parse_args()), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,572 @@
+"""
+Drives a mix of student API traffic at a target rate and reports the
+throughput and latency percentiles of every route.
+
+``run`` starts the app from `main.py` with uvicorn, unless ``--url`` points
+at a running one, seeds the database up to ``--rows`` students and sends
+reads, list pages, creates, updates and deletes at ``--rate`` requests per
+second. With ``--throwaway`` a fresh database is created next to the
+configured one, migrated with alembic, used and dropped again; otherwise
+the database in `settings.toml` is used and the students the run created
+are deleted afterwards.
+
+The load is open-loop: requests are started on a fixed schedule whether
+or not earlier ones have completed, and latency is counted from the
+scheduled start, so a slow server is not hidden by the client slowing
+down with it. ``--concurrency`` bounds the requests in flight; waiting for
+a slot counts as latency too.
+
+``compare`` checks a run against a stored baseline and exits with status 1
+if a route got slower or less reliable beyond ``--tolerance``; ``run``
+does the same when given ``--baseline``.
+
+Usage::
+
+    python -m benchmarks.load run --rows 10000 --rate 200 --duration 30 --output baseline.json
+    python -m benchmarks.load run --throwaway --baseline baseline.json --output current.json
+    python -m benchmarks.load compare baseline.json current.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import httpx
+import psycopg
+from psycopg import sql
+
+from database.partitions import SKIP_CONFLICTS
+from kernel.settings.base import BASE_DIR
+from kernel.settings.database import DB_CONF
+from kernel.settings.partitioning import PARTITION_MONTHS
+from student.helpers.enums import GenderOptions, GradeOptions
+
+DEFAULT_MIX = 'read=50,list=25,create=10,update=10,delete=5'
+
+ROUTES = {
+    'read': 'GET /v1/students/{student_id}',
+    'list': 'GET /v1/students/',
+    'create': 'POST /v1/students/',
+    'update': 'PUT /v1/students/{student_id}',
+    'delete': 'DELETE /v1/students/{student_id}',
+}
+
+PERCENTILES = (50, 95, 99)
+
+# seeded students get 091… phone numbers and the ones created by the load
+# 099…, so the two never collide
+SEED = """
+    INSERT INTO students (
+        first_name, last_name, phone_number, gender, birth_date, education,
+        enrollment_date, graduation_date, address
+    )
+    SELECT 'first' || n,
+           'last' || (n %% 5000),
+           '091' || lpad(floor(random() * 1e8)::bigint::text, 8, '0'),
+           ({genders}::text[])[1 + n %% {gender_count}]::genderoptions,
+           date '1990-01-01' + (n %% 7000),
+           ({grades}::text[])[1 + n %% {grade_count}]::gradeoptions,
+           timestamp '2015-01-01' + (n %% 3000) * interval '1 day',
+           timestamp '2019-01-01' + (n %% 3000) * interval '1 day',
+           'street ' || n
+    FROM generate_series(1, %(rows)s) AS n
+    ON CONFLICT DO NOTHING
+"""
+
+# the partitions of the seeded enrollment dates
+SEED_PARTITIONS = """
+    SELECT students_ensure_partitions(%(months)s, timestamp '2015-01-01', timestamp '2023-04-01')
+"""
+
+
+def connect(dbname: Optional[str] = None, **kwargs) -> psycopg.Connection:
+    """Connects to the configured server, to its database by default."""
+    return psycopg.connect(
+        host=DB_CONF['DB_HOST'],
+        port=DB_CONF['DB_PORT'],
+        user=DB_CONF['DB_USER'],
+        password=DB_CONF['DB_PASSWORD'],
+        dbname=dbname or DB_CONF['DB_NAME'],
+        **kwargs
+    )
+
+
+@contextlib.contextmanager
+def throwaway_database() -> Iterator[Tuple[str, Path]]:
+    """
+    Creates and migrates a database for one run, and drops it afterwards.
+
+    Yields
+    ------
+    tuple
+        The name of the database and a copy of `settings.toml` pointing at
+        it, to be passed to the server and alembic as `SETTINGS_FILE`.
+    """
+    name = f"{DB_CONF['DB_NAME']}_load_{uuid.uuid4().hex[:8]}"
+    settings = (BASE_DIR / 'settings.toml').read_text()
+    settings = re.sub(r'(?m)^(\s*DB_NAME\s*=\s*).*$', rf'\g<1>"{name}"', settings, count=1)
+    with tempfile.TemporaryDirectory() as directory:
+        settings_file = Path(directory) / 'settings.toml'
+        settings_file.write_text(settings)
+        with connect(autocommit=True) as admin:
+            # same encoding and locale as the configured database, whatever
+            # template1 was left with
+            encoding, collate, ctype = admin.execute(
+                'SELECT pg_encoding_to_char(encoding), datcollate, datctype '
+                'FROM pg_database WHERE datname = current_database()'
+            ).fetchone()
+            admin.execute(sql.SQL(
+                'CREATE DATABASE {} TEMPLATE template0 ENCODING {} LC_COLLATE {} LC_CTYPE {}'
+            ).format(
+                sql.Identifier(name), sql.Literal(encoding), sql.Literal(collate), sql.Literal(ctype)
+            ))
+        try:
+            subprocess.run(
+                [sys.executable, '-m', 'alembic', 'upgrade', 'head'],
+                cwd=BASE_DIR,
+                env={**os.environ, 'SETTINGS_FILE': str(settings_file)},
+                check=True,
+                stdout=subprocess.DEVNULL,
+            )
+            yield name, settings_file
+        finally:
+            with connect(autocommit=True) as admin:
+                admin.execute(sql.SQL('DROP DATABASE IF EXISTS {} WITH (FORCE)').format(
+                    sql.Identifier(name)
+                ))
+
+
+def seed(dbname: str, rows: int) -> int:
+    """Inserts synthetic students until the table holds at least `rows`."""
+    statement = sql.SQL(SEED).format(
+        genders=sql.Literal([member.name for member in GenderOptions]),
+        gender_count=len(GenderOptions),
+        grades=sql.Literal([member.name for member in GradeOptions]),
+        grade_count=len(GradeOptions),
+    )
+    with connect(dbname) as connection:
+        connection.execute(SEED_PARTITIONS, {'months': PARTITION_MONTHS})
+        connection.commit()
+        count = connection.execute('SELECT count(*) FROM students').fetchone()[0]
+        while count < rows:
+            connection.execute(SKIP_CONFLICTS.text)
+            connection.execute(statement, {'rows': rows - count})
+            connection.commit()
+            count = connection.execute('SELECT count(*) FROM students').fetchone()[0]
+    return count
+
+
+def prepare_targets(dbname: str, sample: int, creates: int) -> Tuple[Dict[int, dict], List[int]]:
+    """
+    Picks the students to read and update, and reserves ids for creates.
+
+    Updates send a student's own data back, so a run against a shared
+    database rewrites rows without changing them. The create endpoint takes
+    the id from the request body, so ids are drawn from the table's
+    sequence up front and never collide.
+    """
+    with connect(dbname) as connection:
+        rows = connection.execute(
+            "SELECT id, first_name, last_name, phone_number, gender, birth_date, "
+            "education, enrollment_date, graduation_date, address "
+            "FROM students "
+            # a row is NULL-free when the row itself IS NOT NULL
+            "WHERE students IS NOT NULL "
+            "ORDER BY random() LIMIT %s",
+            (sample,)
+        ).fetchall()
+        ids = [row[0] for row in connection.execute(
+            "SELECT nextval(pg_get_serial_sequence('students', 'id')) "
+            "FROM generate_series(1, %s)",
+            (creates,)
+        )]
+    existing = {
+        id: {
+            'first_name': first_name,
+            'last_name': last_name,
+            'phone_number': phone_number,
+            'gender': GenderOptions[gender].value,
+            'birth_date': birth_date.date().isoformat(),
+            'education': GradeOptions[education].value,
+            'enrollment_date': enrollment_date.date().isoformat(),
+            'graduation_date': graduation_date.date().isoformat(),
+            'address': address,
+        }
+        for id, first_name, last_name, phone_number, gender, birth_date,
+            education, enrollment_date, graduation_date, address in rows
+    }
+    return existing, ids
+
+
+def remove_created(dbname: str, ids: List[int]) -> None:
+    """Deletes the students the run created that are still there."""
+    with connect(dbname) as connection:
+        connection.execute('DELETE FROM students WHERE id = ANY(%s)', (ids,))
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+@contextlib.contextmanager
+def serve(settings_file: Optional[Path], log: Optional[Path]) -> Iterator[str]:
+    """
+    Runs the app from `main.py` with uvicorn until the block exits.
+
+    Yields
+    ------
+    str
+        The base URL of the server, once it answers.
+    """
+    port = free_port()
+    env = dict(os.environ)
+    if settings_file is not None:
+        env['SETTINGS_FILE'] = str(settings_file)
+    output = open(log, 'ab') if log else subprocess.DEVNULL
+    server = subprocess.Popen(
+        [
+            sys.executable, '-m', 'uvicorn', 'main:app',
+            '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning',
+        ],
+        cwd=BASE_DIR, env=env, stdout=output, stderr=output,
+    )
+    url = f'http://127.0.0.1:{port}'
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            if server.poll() is not None:
+                raise SystemExit(f'the server exited with status {server.returncode}')
+            try:
+                if httpx.get(f'{url}/metrics').status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise SystemExit('the server did not start within 30 seconds')
+            time.sleep(0.2)
+        yield url
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        if log:
+            output.close()
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ROUTES:
+            raise argparse.ArgumentTypeError(f'unknown operation {name!r}')
+        mix[name] = float(weight)
+    return mix
+
+
+@dataclass
+class Workload:
+    """
+    Builds the requests of the traffic mix and keeps track of the students
+    they can target.
+
+    Attributes
+    ----------
+    mix : dict
+        The relative weight of each operation.
+    existing : dict
+        The data of every student that can be read or updated.
+    reserved : list
+        Ids for the students to create.
+    created : list
+        The students created so far and not deleted yet.
+    """
+    mix: Dict[str, float]
+    existing: Dict[int, dict]
+    reserved: List[int]
+    created: List[int] = field(default_factory=list)
+    rng: random.Random = field(default_factory=random.Random)
+
+    def __post_init__(self) -> None:
+        self.operations = list(self.mix)
+        self.weights = [self.mix[name] for name in self.operations]
+        self.phone_base = self.rng.randrange(10 ** 7)
+        self.targets = list(self.existing)
+
+    def next_request(self) -> Tuple[str, str, str, Optional[dict]]:
+        """Returns the operation, method, path and body of the next request."""
+        operation = self.rng.choices(self.operations, self.weights)[0]
+        if operation == 'create' and not self.reserved:
+            operation = 'read'
+        if operation == 'delete' and not self.created:
+            operation = 'read'
+        if operation == 'read':
+            return operation, 'GET', f'/v1/students/{self.rng.choice(self.targets)}', None
+        if operation == 'list':
+            path = '/v1/students/?limit=20'
+            if self.rng.random() < 0.3:
+                path += f'&education={self.rng.choice(list(GradeOptions)).value}'
+            return operation, 'GET', path, None
+        if operation == 'create':
+            id = self.reserved.pop()
+            phone_number = f'099{(self.phone_base + len(self.reserved)) % 10 ** 8:08d}'
+            return operation, 'POST', '/v1/students/', self.body(phone_number, id=id)
+        if operation == 'update':
+            id = self.rng.choice(self.targets)
+            return operation, 'PUT', f'/v1/students/{id}', self.existing[id]
+        id = self.created.pop(self.rng.randrange(len(self.created)))
+        self.targets.remove(id)
+        del self.existing[id]
+        return operation, 'DELETE', f'/v1/students/{id}', None
+
+    def created_student(self, body: dict) -> None:
+        self.existing[body['id']] = body
+        self.targets.append(body['id'])
+        self.created.append(body['id'])
+
+    def body(self, phone_number: str, **extra) -> dict:
+        enrolled = date(2015, 1, 1) + timedelta(days=self.rng.randrange(3000))
+        return {
+            **extra,
+            'first_name': f'load{self.rng.randrange(10 ** 6)}',
+            'last_name': f'test{self.rng.randrange(5000)}',
+            'phone_number': phone_number,
+            'gender': self.rng.choice(list(GenderOptions)).value,
+            'birth_date': (date(1990, 1, 1) + timedelta(days=self.rng.randrange(7000))).isoformat(),
+            'education': self.rng.choice(list(GradeOptions)).value,
+            'enrollment_date': enrolled.isoformat(),
+            'graduation_date': (enrolled + timedelta(days=1460)).isoformat(),
+            'address': f'street {self.rng.randrange(10 ** 5)}',
+        }
+
+
+async def drive(
+    url: str,
+    workload: Workload,
+    rate: float,
+    duration: float,
+    concurrency: int,
+    samples: Optional[Dict[str, list]] = None
+) -> float:
+    """
+    Sends `rate` requests per second for `duration` seconds.
+
+    The latency in seconds and the status of every request, or None if it
+    failed without a response, are appended to `samples` by operation.
+
+    Returns
+    -------
+    float
+        The time it took until the last response, in seconds.
+    """
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        async def send(scheduled: float) -> None:
+            async with slots:
+                operation, method, path, body = workload.next_request()
+                try:
+                    response = await client.request(method, path, json=body)
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = None
+            latency = loop.time() - scheduled
+            if operation == 'create' and status == 201:
+                workload.created_student(body)
+            if samples is not None:
+                samples.setdefault(operation, []).append((latency, status))
+
+        start = loop.time()
+        pending = set()
+        for index in range(int(rate * duration)):
+            scheduled = start + index / rate
+            delay = scheduled - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.create_task(send(scheduled))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        await asyncio.gather(*pending)
+        return loop.time() - start
+
+
+def percentile(ordered: List[float], rank: float) -> float:
+    """The nearest-rank percentile of an ascending list."""
+    index = max(0, min(len(ordered) - 1, round(rank / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize(samples: Dict[str, list], elapsed: float) -> dict:
+    routes = {}
+    for operation, results in sorted(samples.items()):
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(1 for _, status in results if status is None or status >= 400)
+        route = {
+            'requests': len(results),
+            'errors': errors,
+            'error_rate': errors / len(results),
+            'throughput': len(results) / elapsed,
+            'mean_ms': sum(latencies) / len(latencies) * 1000,
+            'max_ms': latencies[-1] * 1000,
+        }
+        for rank in PERCENTILES:
+            route[f'p{rank}_ms'] = percentile(latencies, rank) * 1000
+        routes[ROUTES[operation]] = route
+    total = sum(route['requests'] for route in routes.values())
+    return {
+        'elapsed': elapsed,
+        'requests': total,
+        'throughput': total / elapsed,
+        'routes': routes,
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> List[str]:
+    """
+    Lists the regressions of a run against a baseline.
+
+    A route regressed when a latency percentile grew, or its throughput
+    shrank, by more than `tolerance`, or when its error rate went up by
+    more than one percentage point.
+    """
+    regressions = []
+    for route, before in baseline['routes'].items():
+        after = current['routes'].get(route)
+        if after is None:
+            continue
+        for rank in PERCENTILES:
+            key = f'p{rank}_ms'
+            if after[key] > before[key] * (1 + tolerance):
+                regressions.append(
+                    f'{route}: p{rank} {before[key]:.1f} -> {after[key]:.1f} ms'
+                )
+        if after['throughput'] < before['throughput'] * (1 - tolerance):
+            regressions.append(
+                f"{route}: throughput {before['throughput']:.1f} -> {after['throughput']:.1f} req/s"
+            )
+        if after['error_rate'] > before['error_rate'] + 0.01:
+            regressions.append(
+                f"{route}: error rate {before['error_rate']:.1%} -> {after['error_rate']:.1%}"
+            )
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"{report['requests']} requests in {report['elapsed']:.1f}s, "
+        f"{report['throughput']:.1f} req/s (target {report['config']['rate']:g})"
+    )
+    print(f"{'route':<34}{'req':>7}{'err':>6}{'req/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for route, row in report['routes'].items():
+        print(
+            f"{route:<34}{row['requests']:>7}{row['errors']:>6}{row['throughput']:>8.1f}"
+            f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['max_ms']:>9.1f}"
+        )
+
+
+def check(baseline_path: Path, report: dict, tolerance: float) -> int:
+    regressions = compare(json.loads(baseline_path.read_text()), report, tolerance)
+    if not regressions:
+        print(f'no regression against {baseline_path} (tolerance {tolerance:.0%})')
+        return 0
+    print(f'regressions against {baseline_path} (tolerance {tolerance:.0%}):')
+    for regression in regressions:
+        print(f'  {regression}')
+    return 1
+
+
+def run(args: argparse.Namespace) -> int:
+    config = {
+        'rows': args.rows,
+        'rate': args.rate,
+        'duration': args.duration,
+        'warmup': args.warmup,
+        'concurrency': args.concurrency,
+        'mix': args.mix,
+        'seed': args.seed,
+    }
+    with contextlib.ExitStack() as stack:
+        dbname, settings_file = DB_CONF['DB_NAME'], None
+        if args.throwaway:
+            dbname, settings_file = stack.enter_context(throwaway_database())
+        rows = seed(dbname, args.rows)
+        creates = int(args.rate * (args.duration + args.warmup) * args.mix.get('create', 0)
+                      / sum(args.mix.values()) * 1.5) + 100
+        existing, reserved = prepare_targets(dbname, args.sample, creates)
+        workload = Workload(args.mix, existing, reserved, rng=random.Random(args.seed))
+        if not args.throwaway:
+            stack.callback(lambda: remove_created(dbname, workload.created))
+        url = args.url or stack.enter_context(serve(settings_file, args.server_log))
+
+        async def measure() -> Tuple[Dict[str, list], float]:
+            if args.warmup:
+                await drive(url, workload, args.rate, args.warmup, args.concurrency)
+            samples: Dict[str, list] = {}
+            elapsed = await drive(
+                url, workload, args.rate, args.duration, args.concurrency, samples
+            )
+            return samples, elapsed
+
+        samples, elapsed = asyncio.run(measure())
+    report = {'config': {**config, 'seeded_rows': rows}, **summarize(samples, elapsed)}
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f'saved to {args.output}')
+    if args.baseline:
+        return check(args.baseline, report, args.tolerance)
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run a load test')
+    run_parser.add_argument('--rows', type=int, default=10000, help='students to seed the database up to')
+    run_parser.add_argument('--rate', type=float, default=100, help='requests per second')
+    run_parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    run_parser.add_argument('--warmup', type=float, default=5, help='unmeasured seconds first')
+    run_parser.add_argument('--concurrency', type=int, default=64, help='requests in flight at most')
+    run_parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                            help=f'operation weights, default {DEFAULT_MIX}')
+    run_parser.add_argument('--sample', type=int, default=10000, help='students to read and update')
+    run_parser.add_argument('--seed', type=int, default=0, help='seed of the request sequence')
+    run_parser.add_argument('--throwaway', action='store_true', help='run against a fresh database')
+    run_parser.add_argument('--url', help='a running server to load instead of starting one')
+    run_parser.add_argument('--server-log', type=Path, help='where to write the server output')
+    run_parser.add_argument('--output', type=Path, help='where to save the results as JSON')
+    run_parser.add_argument('--baseline', type=Path, help='results to check for regressions against')
+    run_parser.add_argument('--tolerance', type=float, default=0.1, help='allowed relative slowdown')
+
+    compare_parser = commands.add_parser('compare', help='compare saved results')
+    compare_parser.add_argument('baseline', type=Path)
+    compare_parser.add_argument('current', type=Path)
+    compare_parser.add_argument('--tolerance', type=float, default=0.1, help='allowed relative slowdown')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        sys.exit(run(args))
+    sys.exit(check(args.baseline, json.loads(args.current.read_text()), args.tolerance))
+
+
+if __name__ == '__main__':
+    main()
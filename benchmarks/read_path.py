@@ -0,0 +1,132 @@
+"""
+Measures the client-side CPU cost per row of serving a page of students.
+
+Two paths are compared on the same page of rows:
+
+- ``orm``: what `GET /v1/students/` did before the read fast path. ORM
+  `Student` instances are loaded through a session, validated through
+  `StudentPageSchema` in `orm_mode`, run through `jsonable_encoder` and
+  encoded with the standard `json` module, as FastAPI does for a
+  `response_model`.
+- ``records``: `AsyncStudentDataAccessLayer.get_page`, which selects plain
+  columns on a Core connection into slotted `StudentRecord`s, encoded with
+  orjson.
+
+CPU time is taken with `time.process_time`, so the time Postgres spends
+executing the query is left out and only the work done in this process
+(driver decoding, object construction, validation, encoding) is counted.
+
+Usage::
+
+    python -m benchmarks.read_path --rows 500 --repeat 50
+"""
+import argparse
+import asyncio
+import json
+from time import process_time
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+
+from student.api.v1.schemas import StudentPageSchema
+from student.models import Student
+from student.repository.dal import AsyncStudentDataAccessLayer
+
+
+async def orm_page(rows: int) -> dict:
+    """Serves one page the way the ORM path did, timing each stage."""
+    start = process_time()
+    async with Student.database.async_session() as session:
+        stmt = select(Student).order_by(Student.id).limit(rows)
+        students = (await session.execute(stmt)).fetchall()
+    fetched = process_time()
+    page = StudentPageSchema(
+        items=[student[0] for student in students], next_cursor=None
+    )
+    validated = process_time()
+    body = json.dumps(
+        jsonable_encoder(page),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(',', ':')
+    ).encode('utf-8')
+    encoded = process_time()
+    return {
+        'body': body,
+        'fetch': fetched - start,
+        'validate': validated - fetched,
+        'encode': encoded - validated,
+    }
+
+
+async def records_page(dal: AsyncStudentDataAccessLayer, rows: int) -> dict:
+    """Serves one page through the read fast path, timing each stage."""
+    start = process_time()
+    students, _ = await dal.get_page(rows)
+    fetched = process_time()
+    body = orjson.dumps({'items': students, 'next_cursor': None})
+    encoded = process_time()
+    return {
+        'body': body,
+        'fetch': fetched - start,
+        'validate': 0.0,
+        'encode': encoded - fetched,
+    }
+
+
+async def run(rows: int, repeat: int) -> dict:
+    dal = AsyncStudentDataAccessLayer()
+    paths = {
+        'orm': lambda: orm_page(rows),
+        'records': lambda: records_page(dal, rows),
+    }
+    # warm up the pool, the statement caches and the encoders
+    bodies = {name: (await page())['body'] for name, page in paths.items()}
+    if json.loads(bodies['orm']) != orjson.loads(bodies['records']):
+        raise SystemExit('the two paths returned different pages')
+    count = len(orjson.loads(bodies['records'])['items'])
+
+    report = {}
+    for name, page in paths.items():
+        totals = {'fetch': 0.0, 'validate': 0.0, 'encode': 0.0}
+        for _ in range(repeat):
+            timings = await page()
+            for stage in totals:
+                totals[stage] += timings[stage]
+        per_row = {
+            stage: seconds / (repeat * count) * 1e6
+            for stage, seconds in totals.items()
+        }
+        per_row['total'] = sum(per_row.values())
+        report[name] = per_row
+    report['speedup'] = report['orm']['total'] / report['records']['total']
+    report['rows'] = count
+    await Student.database.async_engine.dispose()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500, help='rows per page')
+    parser.add_argument('--repeat', type=int, default=50, help='pages per path')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.rows, args.repeat))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"CPU microseconds per row, {report['rows']} rows x {args.repeat} pages")
+    print(f"{'path':<10}{'fetch':>10}{'validate':>10}{'encode':>10}{'total':>10}")
+    for name in ('orm', 'records'):
+        row = report[name]
+        print(
+            f"{name:<10}{row['fetch']:>10.2f}{row['validate']:>10.2f}"
+            f"{row['encode']:>10.2f}{row['total']:>10.2f}"
+        )
+    print(f"speedup: {report['speedup']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+Measures how long a fresh process takes to import the application and to
+serve its first response, and fails when either goes over budget.
+
+Each repetition starts new interpreters, so nothing is cached but the
+compiled bytecode and the operating system's page cache:
+
+- ``import``: a process importing `kernel.application`, timed from
+  within. Importing reads no settings and configures no logging; the
+  command fails if `settings.toml` was parsed by then.
+- ``create_app``: the same process then calling `create_app()`, which
+  reads the settings, configures logging and builds the routes.
+- ``first_response``: `uvicorn main:app` started on a free port, timed
+  from the spawn until `GET /v1/students/?limit=1` first answers 200, so
+  interpreter start, imports, the application lifespan, the first database
+  connection and the first query are all included.
+
+The medians are checked against ``--import-budget`` and
+``--response-budget``, in seconds; the command exits with status 1 if one
+is exceeded, after listing the modules that took longest to import.
+
+Usage::
+
+    python -m benchmarks.startup --repeat 5
+    python -m benchmarks.startup --import-budget 0.5 --response-budget 1.0
+"""
+import argparse
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+import httpx
+
+from kernel.settings.base import BASE_DIR
+
+IMPORT = """
+import time
+start = time.perf_counter()
+import kernel.application
+imported = time.perf_counter()
+from kernel.settings.base import get_config
+lazy = get_config.cache_info().currsize == 0
+kernel.application.create_app()
+print(imported - start, time.perf_counter() - imported, lazy)
+"""
+FIRST_REQUEST = '/v1/students/?limit=1'
+POLL_INTERVAL = 0.005
+RESPONSE_TIMEOUT = 60
+
+
+def time_import() -> Tuple[float, float]:
+    """
+    Imports then creates the application in a new interpreter, in seconds.
+
+    Raises
+    ------
+    RuntimeError
+        If importing the application parsed `settings.toml`.
+    """
+    output = subprocess.run(
+        [sys.executable, '-c', IMPORT],
+        cwd=BASE_DIR, check=True, capture_output=True, text=True,
+    ).stdout
+    imported, created, lazy = output.strip().splitlines()[-1].split()
+    if lazy != 'True':
+        raise RuntimeError('importing the application read settings.toml')
+    return float(imported), float(created)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def time_first_response() -> float:
+    """Starts a server and waits for its first 200, in seconds."""
+    port = free_port()
+    url = f'http://127.0.0.1:{port}{FIRST_REQUEST}'
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=RESPONSE_TIMEOUT) as client:
+            while time.perf_counter() - start < RESPONSE_TIMEOUT:
+                if server.poll() is not None:
+                    raise RuntimeError(f'the server exited with status {server.returncode}')
+                try:
+                    if client.get(url).status_code == 200:
+                        return time.perf_counter() - start
+                except httpx.TransportError:
+                    pass
+                time.sleep(POLL_INTERVAL)
+        raise RuntimeError(f'no 200 from {url} within {RESPONSE_TIMEOUT}s')
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def slowest_imports(limit: int) -> List[Tuple[float, str]]:
+    """Lists the modules with the longest own import time, in seconds."""
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import kernel.application'],
+        cwd=BASE_DIR, check=True, capture_output=True, text=True,
+    ).stderr
+    modules = []
+    for line in output.splitlines():
+        fields = line.removeprefix('import time:').split('|')
+        if len(fields) == 3 and fields[0].strip().isdigit():
+            modules.append((int(fields[0]) / 1e6, fields[2].strip()))
+    return sorted(modules, reverse=True)[:limit]
+
+
+def summarize(samples: List[float]) -> dict:
+    return {
+        'median': statistics.median(samples),
+        'min': min(samples),
+        'max': max(samples),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='measurements of each kind')
+    parser.add_argument('--import-budget', type=float, default=1.0,
+                        help='allowed median import time, in seconds')
+    parser.add_argument('--response-budget', type=float, default=2.0,
+                        help='allowed median time to the first 200, in seconds')
+    parser.add_argument('--output', help='where to save the results as JSON')
+    args = parser.parse_args()
+
+    imports = [time_import() for _ in range(args.repeat)]
+    report = {
+        'import': summarize([imported for imported, _ in imports]),
+        'create_app': summarize([created for _, created in imports]),
+        'first_response': summarize([time_first_response() for _ in range(args.repeat)]),
+    }
+    for name, stats in report.items():
+        print(f"{name:<16} median {stats['median'] * 1000:7.1f} ms  "
+              f"min {stats['min'] * 1000:7.1f} ms  max {stats['max'] * 1000:7.1f} ms")
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+    over = [
+        f"{name} median {report[name]['median']:.3f}s over its {budget}s budget"
+        for name, budget in (('import', args.import_budget), ('first_response', args.response_budget))
+        if report[name]['median'] > budget
+    ]
+    if over:
+        print('\n'.join(over), file=sys.stderr)
+        print('slowest imports:', file=sys.stderr)
+        for seconds, module in slowest_imports(15):
+            print(f'  {seconds * 1000:7.1f} ms  {module}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
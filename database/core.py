@@ -1,52 +1,270 @@
+import os
+from typing import TYPE_CHECKING, Optional, Tuple
+
 from sqlalchemy import Engine
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine
+)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import (
+    Session,
+    sessionmaker
+)
 
 from helpers.designs import Singleton
-from kernel.settings.database import DB_URL
+from kernel.settings import (
+    database as database_settings,
+    sharding as sharding_settings,
+    slow_query as slow_query_settings
+)
+from .pool import (
+    TimedQueuePool,
+    TimedAsyncAdaptedQueuePool,
+    pool_status
+)
+from .replicas import Replica, ReplicaSet
+from .shards import Shard
+
+if TYPE_CHECKING:
+    from .slow_queries import SlowQueryLog
 
 
 class SqlAlchemy(metaclass=Singleton):
     """
-    A singleton class for creating a SQLAlchemy engine and session.
+    A singleton class for creating SQLAlchemy engines and session factories.
 
     This class provides a single instance of a SQLAlchemy engine and session
-    that can be used throughout the application. It uses the Singleton pattern
-    to ensure that only one instance of the class is created.
+    factory that can be used throughout the application. It uses the
+    Singleton pattern to ensure that only one instance of the class is
+    created. Sessions are not shared: every unit of work opens its own
+    session from the factory and closes it when done, so concurrent
+    requests never share a transaction or an identity map.
+
+    The engines are created on first use, or by `connect()` from the
+    application lifespan, never at import, so a server importing the
+    application before forking its workers opens no connection in the
+    parent. Engines a process inherited through `fork()` are dropped in the
+    child without closing the parent's connections, and replaced on next
+    use.
+
+    Reads the data access layer can serve from a streaming replica take
+    their engine or session from `read_engine()` and `read_session()`,
+    which pick one of the replicas configured in `[settings.database]`, or
+    the primary when there is none close enough to it, see `ReplicaSet`.
+    With `[settings.sharding]`, this database is the first shard, and the
+    others are `shards`.
 
     Attributes
     ----------
     engine : Engine
         The SQLAlchemy engine instance.
-    session : Session
-        The SQLAlchemy session instance.
+    session : sessionmaker[Session]
+        A factory producing a new `Session` per unit of work.
+    async_engine : AsyncEngine
+        The SQLAlchemy asyncio engine instance, backed by psycopg's async
+        driver.
+    async_session : async_sessionmaker[AsyncSession]
+        A factory producing a new `AsyncSession` per unit of work.
+    slow_queries : SlowQueryLog or None
+        The slow query log both engines report to, or None unless enabled
+        in `[settings.slow_query]`.
+    replicas : ReplicaSet or None
+        The read replicas, or None if there are none.
+    shards : tuple of Shard
+        The shards other than this database, empty unless sharded.
     base:
         The model declarative base
 
     Methods
     -------
+    connect() -> None:
+        Creates the engines and session factories of this process.
+    dispose() -> None:
+        Closes every pooled connection and drops the engines.
     create_engine() -> Engine:
         Creates a new SQLAlchemy engine instance.
-    create_session() -> Session:
-        Creates a new SQLAlchemy session instance.
+    create_session() -> sessionmaker[Session]:
+        Creates a new factory for SQLAlchemy sessions.
+    create_async_engine() -> AsyncEngine:
+        Creates a new SQLAlchemy asyncio engine instance.
+    create_async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+        Creates a new factory for SQLAlchemy asyncio sessions.
+    create_slow_query_log() -> SlowQueryLog or None:
+        Creates the slow query log, if enabled.
+    create_replica_set() -> ReplicaSet or None:
+        Creates the read replicas, if any.
+    create_shards() -> tuple of Shard:
+        Creates the engines of the other shards, if any.
+    read_engine() -> AsyncEngine:
+        Returns the asyncio engine the next read should use.
+    read_session() -> AsyncSession:
+        Opens an asyncio session for the next read.
+    pool_status() -> dict:
+        Describes the connection pools of every engine.
 
     Examples
     --------
     >>> db = SqlAlchemy()
     >>> engine = db.engine
-    >>> session = db.session
+    >>> with db.session() as session:
+    ...     session.execute(stmt)
+    >>> async with db.async_session() as session:
+    ...     await session.execute(stmt)
     """
 
     def __init__(self) -> None:
         """
         Initializes the SqlAlchemy instance.
 
-        Creates a new SQLAlchemy engine and session instance.
+        Only the declarative base is created; the engines and session
+        factories are created by `connect()`.
         """
-        self.engine = self.create_engine()
-        self.session = self.create_session()
         self.Base = declarative_base()
+        self._connected = False
+        os.register_at_fork(after_in_child=self._forget_inherited)
+
+    def connect(self) -> None:
+        """
+        Creates the engines and session factories of this process.
+
+        Does nothing if they already exist. Creating an engine opens no
+        connection; pools fill up as requests check connections out.
+        """
+        if self._connected:
+            return
+        self._slow_queries = self.create_slow_query_log()
+        self._engine = self.create_engine()
+        self._session = self.create_session()
+        self._async_engine = self.create_async_engine()
+        self._async_session = self.create_async_sessionmaker()
+        self._replicas = self.create_replica_set()
+        self._shards = self.create_shards()
+        self._connected = True
+
+    async def dispose(self) -> None:
+        """
+        Closes every pooled connection and drops the engines.
+
+        Connections checked out at that time are closed when returned. The
+        next use creates new engines.
+        """
+        if not self._connected:
+            return
+        self._connected = False
+        if self._replicas is not None:
+            await self._replicas.dispose()
+        for shard in self._shards:
+            await shard.async_engine.dispose()
+        await self._async_engine.dispose()
+        self._engine.dispose()
+
+    def _forget_inherited(self) -> None:
+        """Drops the engines of the parent in a forked child."""
+        if not self._connected:
+            return
+        self._connected = False
+        # the pooled connections share their sockets with the parent: the
+        # pools are replaced without closing them, and psycopg never closes
+        # a connection from a process other than the one that opened it
+        self._engine.dispose(close=False)
+        self._async_engine.sync_engine.dispose(close=False)
+        if self._replicas is not None:
+            self._replicas.forget()
+        for shard in self._shards:
+            shard.async_engine.sync_engine.dispose(close=False)
+
+    @property
+    def engine(self) -> Engine:
+        self.connect()
+        return self._engine
+
+    @property
+    def session(self) -> sessionmaker[Session]:
+        self.connect()
+        return self._session
+
+    @property
+    def async_engine(self) -> AsyncEngine:
+        self.connect()
+        return self._async_engine
+
+    @property
+    def async_session(self) -> async_sessionmaker[AsyncSession]:
+        self.connect()
+        return self._async_session
+
+    @property
+    def slow_queries(self) -> Optional['SlowQueryLog']:
+        self.connect()
+        return self._slow_queries
+
+    @property
+    def replicas(self) -> Optional[ReplicaSet]:
+        self.connect()
+        return self._replicas
+
+    @property
+    def shards(self) -> Tuple[Shard, ...]:
+        self.connect()
+        return self._shards
+
+    def _route_read(self) -> Optional[Replica]:
+        self.connect()
+        if self._replicas is None:
+            return None
+        return self._replicas.route()
+
+    def read_engine(self) -> AsyncEngine:
+        """
+        Returns the asyncio engine the next read should use.
+
+        Only for reads that may be a few seconds stale; must be called from
+        the event loop.
+
+        Returns
+        -------
+        AsyncEngine
+            The engine of an available replica, or the primary's.
+        """
+        replica = self._route_read()
+        return self._async_engine if replica is None else replica.engine
+
+    def read_session(self) -> AsyncSession:
+        """
+        Opens an asyncio session for the next read.
+
+        Only for reads that may be a few seconds stale; must be called from
+        the event loop.
+
+        Returns
+        -------
+        AsyncSession
+            A new session on an available replica, or on the primary.
+        """
+        replica = self._route_read()
+        return self._async_session() if replica is None else replica.session()
+
+    @staticmethod
+    def pool_options() -> dict:
+        """
+        Returns the pool keyword arguments shared by both engines.
+
+        Returns
+        -------
+        dict
+            The pool settings from `[settings.database]`.
+        """
+        return {
+            'pool_size': database_settings.POOL_SIZE,
+            'max_overflow': database_settings.MAX_OVERFLOW,
+            'pool_timeout': database_settings.POOL_TIMEOUT,
+            'pool_recycle': database_settings.POOL_RECYCLE,
+            'pool_pre_ping': database_settings.POOL_PRE_PING,
+        }
 
     def create_engine(self) -> Engine:
         """
@@ -57,17 +275,150 @@ class SqlAlchemy(metaclass=Singleton):
         Engine
             A new SQLAlchemy engine instance.
         """
-        engine = create_engine(DB_URL)
+        engine = create_engine(
+            database_settings.DB_URL,
+            poolclass=TimedQueuePool,
+            **self.pool_options()
+        )
+        if self._slow_queries is not None:
+            self._slow_queries.attach(engine)
         return engine
 
-    def create_session(self) -> Session:
+    def create_session(self) -> sessionmaker[Session]:
+        """
+        Creates a new factory for SQLAlchemy sessions.
+
+        Returns
+        -------
+        sessionmaker[Session]
+            A new SQLAlchemy session factory.
+        """
+        return sessionmaker(self._engine, expire_on_commit=False)
+
+    def create_async_engine(self) -> AsyncEngine:
+        """
+        Creates a new SQLAlchemy asyncio engine instance.
+
+        The `postgresql+psycopg` URL resolves to psycopg's async driver when
+        used with `create_async_engine`, so the same `DB_URL` serves both
+        engines.
+
+        Returns
+        -------
+        AsyncEngine
+            A new SQLAlchemy asyncio engine instance.
+        """
+        engine = create_async_engine(
+            database_settings.DB_URL,
+            poolclass=TimedAsyncAdaptedQueuePool,
+            **self.pool_options()
+        )
+        if self._slow_queries is not None:
+            # events are dispatched by the sync engine the async one wraps
+            self._slow_queries.attach(engine.sync_engine)
+        return engine
+
+    def create_async_sessionmaker(self) -> async_sessionmaker[AsyncSession]:
+        """
+        Creates a new factory for SQLAlchemy asyncio sessions.
+
+        Objects are not expired on commit, so instances returned from a
+        closed session can still be serialized by the API layer.
+
+        Returns
+        -------
+        async_sessionmaker[AsyncSession]
+            A new SQLAlchemy asyncio session factory.
+        """
+        return async_sessionmaker(self._async_engine, expire_on_commit=False)
+
+    @staticmethod
+    def create_slow_query_log() -> Optional['SlowQueryLog']:
+        """
+        Creates the slow query log, if enabled.
+
+        Returns
+        -------
+        SlowQueryLog or None
+            A slow query log configured from `[settings.slow_query]`, or
+            None if it is disabled.
+        """
+        if not slow_query_settings.SLOW_QUERY_ENABLED:
+            return None
+        # only loaded when enabled, which it is not by default
+        from .slow_queries import SlowQueryLog
+
+        return SlowQueryLog(
+            database_settings.DB_URL,
+            threshold=slow_query_settings.SLOW_QUERY_THRESHOLD,
+            max_statements=slow_query_settings.SLOW_QUERY_MAX_STATEMENTS,
+            explain_sample_rate=slow_query_settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+            explain_timeout=slow_query_settings.SLOW_QUERY_EXPLAIN_TIMEOUT
+        )
+
+    def create_replica_set(self) -> Optional[ReplicaSet]:
+        """
+        Creates the read replicas, if any.
+
+        Their engines share the pool settings of the primary's and report
+        to the same slow query log.
+
+        Returns
+        -------
+        ReplicaSet or None
+            The replicas listed in `REPLICA_URLS`, or None if it is empty.
+        """
+        if not database_settings.REPLICA_URLS:
+            return None
+        replicas = ReplicaSet(
+            database_settings.REPLICA_URLS,
+            database_settings.REPLICA_BALANCING,
+            max_lag=database_settings.REPLICA_MAX_LAG,
+            check_interval=database_settings.REPLICA_CHECK_INTERVAL,
+            **self.pool_options()
+        )
+        if self._slow_queries is not None:
+            for replica in replicas.replicas:
+                self._slow_queries.attach(replica.engine.sync_engine)
+        return replicas
+
+    def create_shards(self) -> Tuple[Shard, ...]:
+        """
+        Creates the engines of the other shards, if any.
+
+        Their engines share the pool settings of this database's and report
+        to the same slow query log.
+
+        Returns
+        -------
+        tuple of Shard
+            A shard for every URL of `SHARD_URLS`, in order.
+        """
+        shards = tuple(Shard(url, **self.pool_options()) for url in sharding_settings.SHARD_URLS)
+        if self._slow_queries is not None:
+            for shard in shards:
+                self._slow_queries.attach(shard.async_engine.sync_engine)
+        return shards
+
+    def pool_status(self) -> dict:
         """
-        Creates a new SQLAlchemy session instance.
+        Describes the connection pools of every engine.
 
         Returns
         -------
-        Session
-            A new SQLAlchemy session instance.
+        dict
+            The pool status of the sync and the asyncio engine, including
+            the connection checkout wait statistics, and that of every
+            replica with its lag and of every other shard, if there are.
         """
-        session = Session(self.engine)
-        return session
+        status = {
+            'sync': pool_status(self.engine.pool),
+            'async': pool_status(self.async_engine.pool),
+        }
+        if self.replicas is not None:
+            status['replicas'] = self.replicas.status()
+        if self.shards:
+            status['shards'] = {
+                shard.name: pool_status(shard.async_engine.pool) for shard in self.shards
+            }
+        return status
@@ -1,3 +1,4 @@
+import re
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
@@ -5,7 +6,7 @@ from sqlalchemy import pool
 
 from alembic import context
 
-from database.core import DB_URL
+from kernel.settings.database import DB_URL
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -28,6 +29,20 @@ target_metadata = models.Student.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+# `alembic -x url=<shard url> upgrade head` migrates a shard of
+# `[settings.sharding]` instead of the main database
+URL = context.get_x_argument(as_dictionary=True).get('url', DB_URL)
+
+# the partitions of `students`, see migration c61f0b8d2a47, are created at
+# run time and follow the model through the partitioned table
+PARTITION = re.compile(r'students_(default|p\d{4}_\d{2})')
+
+
+def include_name(name, type_, parent_names) -> bool:
+    """Leaves the partitions of `students` and their indexes out of autogenerate."""
+    table = name if type_ == 'table' else parent_names.get('table_name')
+    return table is None or PARTITION.fullmatch(table) is None
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -45,7 +60,7 @@ def run_migrations_offline() -> None:
 def run_migrations_offline():
     """Run migrations *without* a SQL connection."""
 
-    url = config.get_section_option("alembic:exclude", "sqlalchemy.url", DB_URL)
+    url = config.get_section_option("alembic:exclude", "sqlalchemy.url", URL)
 
     context.configure(
         url=url,
@@ -65,7 +80,7 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
-    config.set_main_option("sqlalchemy.url", DB_URL)
+    config.set_main_option("sqlalchemy.url", URL)
 
     connectable = engine_from_config(
         config.get_section(config.config_ini_section),
@@ -75,7 +90,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_name=include_name
         )
 
         with context.begin_transaction():
@@ -0,0 +1,28 @@
+"""add student row version
+
+Revision ID: 5b1e07c2d9a4
+Revises: ae15c3d39167
+Create Date: 2026-10-18 10:12:41.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1e07c2d9a4'
+down_revision = 'ae15c3d39167'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # a constant default is stored in the catalog, so existing rows are not
+    # rewritten and the table is only locked briefly
+    op.add_column('students', sa.Column(
+        'version', sa.Integer(), server_default=sa.text('1'), nullable=False
+    ))
+
+
+def downgrade() -> None:
+    op.drop_column('students', 'version')
@@ -0,0 +1,45 @@
+"""add student list indexes
+
+Revision ID: 8c3f41a9e6b2
+Revises: 5b1e07c2d9a4
+Create Date: 2026-10-18 11:40:03.218644
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c3f41a9e6b2'
+down_revision = '5b1e07c2d9a4'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'ix_students_last_name': [sa.text('last_name COLLATE "C"'), 'id'],
+    'ix_students_enrollment_date': ['enrollment_date', 'id'],
+    'ix_students_graduation_date': ['graduation_date', 'id'],
+    'ix_students_birth_date': ['birth_date', 'id'],
+    'ix_students_education_id': ['education', 'id'],
+    'ix_students_education_enrollment_date': ['education', 'enrollment_date', 'id'],
+}
+
+
+def upgrade() -> None:
+    # built concurrently so writes to students are not blocked meanwhile;
+    # CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.create_index(
+                name, 'students', columns,
+                postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(
+                name, table_name='students',
+                postgresql_concurrently=True, if_exists=True
+            )
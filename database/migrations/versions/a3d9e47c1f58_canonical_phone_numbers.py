@@ -0,0 +1,82 @@
+"""canonical phone numbers
+
+Revision ID: a3d9e47c1f58
+Revises: f2c8e5a71d36
+Create Date: 2026-10-18 15:08:41.517203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d9e47c1f58'
+down_revision = 'f2c8e5a71d36'
+branch_labels = None
+depends_on = None
+
+# frozen copies of `RegexPatternEnum`, the migration must not follow later
+# changes to the application
+ACCEPTED = r'^(?:\+?98|0)?(9\d{9})$'
+CANONICAL = r'^09\d{9}$'
+CONSTRAINT = 'ck_students_phone_number_canonical'
+
+# the canonical form of every phone number, the number itself when it is
+# not valid at all
+CANONICAL_FORMS = sa.text("""
+    SELECT id, phone_number,
+           coalesce('0' || substring(phone_number FROM :accepted), phone_number) AS canonical
+    FROM students
+    WHERE phone_number IS NOT NULL
+""")
+
+# rows that would break the unique index or the check constraint once
+# rewritten; which student keeps a number is not ours to decide
+CONFLICTS = sa.text("""
+    WITH forms AS ({forms})
+    SELECT canonical, array_agg(id ORDER BY id) AS ids
+    FROM forms
+    GROUP BY canonical
+    HAVING count(*) > 1 OR canonical !~ :canonical
+    ORDER BY canonical
+    LIMIT 20
+""".format(forms=CANONICAL_FORMS.text))
+
+BACKFILL = sa.text("""
+    WITH forms AS ({forms})
+    UPDATE students
+    SET phone_number = forms.canonical, version = students.version + 1
+    FROM forms
+    WHERE students.id = forms.id AND forms.phone_number <> forms.canonical
+""".format(forms=CANONICAL_FORMS.text))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # writers are held off until the constraint is in place, so no other
+    # spelling slips in after the backfill; readers are not blocked
+    op.execute('LOCK TABLE students IN SHARE ROW EXCLUSIVE MODE')
+    conflicts = bind.execute(
+        CONFLICTS, {'accepted': ACCEPTED, 'canonical': CANONICAL}
+    ).all()
+    if conflicts:
+        raise RuntimeError(
+            "phone numbers that cannot be made canonical, fix these students "
+            "and run the migration again: "
+            + '; '.join(f"{canonical}: {list(ids)}" for canonical, ids in conflicts)
+        )
+    bind.execute(BACKFILL, {'accepted': ACCEPTED})
+    # NOT VALID skips the scan under the exclusive lock, the rows were
+    # just checked; validating afterwards only takes a SHARE UPDATE
+    # EXCLUSIVE lock
+    op.execute(
+        f"ALTER TABLE students ADD CONSTRAINT {CONSTRAINT} "
+        f"CHECK (phone_number ~ '{CANONICAL}') NOT VALID"
+    )
+    with op.get_context().autocommit_block():
+        op.execute(f"ALTER TABLE students VALIDATE CONSTRAINT {CONSTRAINT}")
+
+
+def downgrade() -> None:
+    # the original spellings are not kept, the numbers stay canonical
+    op.drop_constraint(CONSTRAINT, 'students', type_='check')
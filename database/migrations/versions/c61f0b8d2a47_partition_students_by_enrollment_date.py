@@ -0,0 +1,334 @@
+"""partition students by enrollment date
+
+Revision ID: c61f0b8d2a47
+Revises: a3d9e47c1f58
+Create Date: 2026-10-18 17:12:36.408215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.exc import IntegrityError
+
+
+# revision identifiers, used by Alembic.
+revision = 'c61f0b8d2a47'
+down_revision = 'a3d9e47c1f58'
+branch_labels = None
+depends_on = None
+
+# students copied per transaction while the table stays in use
+BACKFILL_BATCH_SIZE = 5000
+
+# keeps NULL enrollment dates out of `students` during the copy
+ENROLLMENT_DATE_NOT_NULL = 'ck_students_enrollment_date_not_null'
+
+# frozen copies of the indexes of `8c3f41a9e6b2` and `d47a9b1c3e05`
+FULL_NAME = "(coalesce(first_name, '') || ' ' || coalesce(last_name, ''))"
+INDEXES = {
+    'ix_students_last_name': 'USING btree (last_name COLLATE "C", id)',
+    'ix_students_enrollment_date': 'USING btree (enrollment_date, id)',
+    'ix_students_graduation_date': 'USING btree (graduation_date, id)',
+    'ix_students_birth_date': 'USING btree (birth_date, id)',
+    'ix_students_education_id': 'USING btree (education, id)',
+    'ix_students_education_enrollment_date': 'USING btree (education, enrollment_date, id)',
+    'ix_students_full_name_trgm': f'USING gin ({FULL_NAME} gin_trgm_ops)',
+    'ix_students_address_trgm': 'USING gin (address gin_trgm_ops)',
+}
+
+# Creates the partitions of `span` months covering `since` to `until`, and
+# those of every student that fell into the default partition, which is then
+# left empty. The default partition
+# is detached while its students move, so no trigger sees them move and
+# their keys and statistics stay as they are. Partitions are aligned on the
+# year, so a partition of another span overlapping an existing one is
+# skipped. Returns the partitions created.
+ENSURE_PARTITIONS = """
+CREATE FUNCTION students_ensure_partitions(
+    span integer,
+    since timestamp DEFAULT NULL,
+    until timestamp DEFAULT NULL,
+    parent text DEFAULT 'students'
+) RETURNS SETOF text
+LANGUAGE plpgsql AS $$
+DECLARE
+    period CONSTANT interval := make_interval(months => span);
+    bound_from timestamp;
+    bound_to timestamp;
+    child text;
+    stray boolean;
+BEGIN
+    IF span IS NULL OR span < 1 OR 12 % span <> 0 THEN
+        RAISE EXCEPTION 'partitions must span a divisor of 12 months, not %', span;
+    END IF;
+    -- one caller at a time, the others find the partitions created
+    PERFORM pg_advisory_xact_lock(hashtext('students_ensure_partitions'));
+    SELECT least(coalesce(since, localtimestamp), min(enrollment_date)),
+           greatest(coalesce(until, localtimestamp), max(enrollment_date))
+    INTO since, until
+    FROM students_default;
+    bound_from := date_trunc('year', since)
+        + make_interval(months => (extract(month FROM since)::integer - 1) / span * span);
+    WHILE bound_from <= until LOOP
+        bound_to := bound_from + period;
+        child := 'students_p' || to_char(bound_from, 'YYYY_MM');
+        IF to_regclass(child) IS NULL THEN
+            BEGIN
+                EXECUTE format(
+                    'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                    child, parent
+                );
+                SELECT EXISTS (
+                    SELECT 1 FROM students_default
+                    WHERE enrollment_date >= bound_from AND enrollment_date < bound_to
+                ) INTO stray;
+                IF stray THEN
+                    EXECUTE format('ALTER TABLE %I DETACH PARTITION students_default', parent);
+                    EXECUTE format(
+                        'WITH moved AS ('
+                        '    DELETE FROM students_default'
+                        '    WHERE enrollment_date >= %L AND enrollment_date < %L'
+                        '    RETURNING *'
+                        ') INSERT INTO %I SELECT * FROM moved',
+                        bound_from, bound_to, child
+                    );
+                END IF;
+                EXECUTE format(
+                    'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                    parent, child, bound_from, bound_to
+                );
+                IF stray THEN
+                    EXECUTE format('ALTER TABLE %I ATTACH PARTITION students_default DEFAULT', parent);
+                END IF;
+                RETURN NEXT child;
+            EXCEPTION WHEN invalid_object_definition THEN
+                -- overlaps a partition of another span, which covers the period
+                NULL;
+            END;
+        END IF;
+        bound_from := bound_to;
+    END LOOP;
+END $$
+"""
+
+# PostgreSQL only enforces a unique key on a partitioned table if it
+# includes the partition key, so the primary key is (id, enrollment_date),
+# and the id and phone number of every student are kept unique in
+# `student_keys` instead, in the same transaction as the
+# write; a duplicate fails with the usual unique violation. Its enrollment
+# date locates the partition of a student looked up by id or phone number.
+# A row moving to another partition is deleted and inserted again, and
+# after triggers see just that.
+SYNC_KEYS = """
+CREATE FUNCTION student_keys_sync() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        TRUNCATE student_keys;
+    ELSIF TG_OP = 'INSERT' THEN
+        -- already claimed by `student_keys_claim()` when skipping conflicts
+        IF current_setting('students.skip_conflicts', true) IS DISTINCT FROM 'on' THEN
+            INSERT INTO student_keys (id, phone_number, enrollment_date)
+            VALUES (NEW.id, NEW.phone_number, NEW.enrollment_date);
+        END IF;
+    ELSIF TG_OP = 'DELETE' THEN
+        DELETE FROM student_keys WHERE id = OLD.id;
+    ELSIF (NEW.id, NEW.phone_number, NEW.enrollment_date)
+            IS DISTINCT FROM (OLD.id, OLD.phone_number, OLD.enrollment_date) THEN
+        UPDATE student_keys
+        SET id = NEW.id, phone_number = NEW.phone_number, enrollment_date = NEW.enrollment_date
+        WHERE id = OLD.id;
+    END IF;
+    RETURN NULL;
+END $$
+"""
+
+# `ON CONFLICT DO NOTHING` only sees the unique indexes of the partition, so
+# the bulk inserts that skip the students already taken set
+# `students.skip_conflicts` for their transaction: the keys are then claimed
+# before the row is inserted, and a row whose keys are taken is skipped.
+CLAIM_KEYS = """
+CREATE FUNCTION student_keys_claim() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF current_setting('students.skip_conflicts', true) = 'on' THEN
+        INSERT INTO student_keys (id, phone_number, enrollment_date)
+        VALUES (NEW.id, NEW.phone_number, NEW.enrollment_date)
+        ON CONFLICT DO NOTHING;
+        IF NOT FOUND THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+    RETURN NEW;
+END $$
+"""
+
+# keeps the new table current while it is backfilled; a row not copied yet
+# is copied by the trigger, and the backfill skips it
+MIRROR = """
+CREATE FUNCTION students_mirror() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM students_partitioned WHERE id = OLD.id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO students_partitioned VALUES (NEW.*);
+    END IF;
+    RETURN NULL;
+END $$
+"""
+
+# the rows are locked until copied, so an update either is copied or waits
+# and is mirrored; a row the mirror copied first is skipped
+BACKFILL = sa.text("""
+    WITH batch AS (
+        SELECT * FROM students
+        WHERE id > :last
+        ORDER BY id
+        LIMIT :size
+        FOR SHARE
+    ), copied AS (
+        INSERT INTO students_partitioned
+        SELECT * FROM batch
+        WHERE NOT EXISTS (SELECT 1 FROM student_keys WHERE student_keys.id = batch.id)
+    )
+    SELECT max(id) FROM batch
+""")
+
+# frozen copy of the triggers of `f2c8e5a71d36`
+STATS_TRIGGERS = {
+    'student_stats_insert': 'AFTER INSERT ON students REFERENCING NEW TABLE AS new_rows',
+    'student_stats_update': 'AFTER UPDATE ON students REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows',
+    'student_stats_delete': 'AFTER DELETE ON students REFERENCING OLD TABLE AS old_rows',
+    'student_stats_truncate': 'AFTER TRUNCATE ON students',
+}
+
+
+def create_stats_triggers() -> None:
+    for name, event in STATS_TRIGGERS.items():
+        op.execute(
+            f'CREATE TRIGGER {name} {event} '
+            'FOR EACH STATEMENT EXECUTE FUNCTION student_stats_apply()'
+        )
+
+
+def upgrade() -> None:
+    # the partition key is part of the primary key, so it may not be NULL;
+    # the check refuses new NULLs at once and is validated without blocking
+    # writes, and the students without an enrollment date are given the
+    # date the column defaults to
+    with op.get_context().autocommit_block():
+        op.execute(
+            f'ALTER TABLE students ADD CONSTRAINT {ENROLLMENT_DATE_NOT_NULL} '
+            'CHECK (enrollment_date IS NOT NULL) NOT VALID'
+        )
+        op.execute('UPDATE students SET enrollment_date = localtimestamp WHERE enrollment_date IS NULL')
+        op.execute(f'ALTER TABLE students VALIDATE CONSTRAINT {ENROLLMENT_DATE_NOT_NULL}')
+
+    # the new table, with a partition per year of the existing students
+    op.execute(
+        'CREATE TABLE students_partitioned '
+        '(LIKE students INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+        'PARTITION BY RANGE (enrollment_date)'
+    )
+    op.execute(f'ALTER TABLE students_partitioned DROP CONSTRAINT {ENROLLMENT_DATE_NOT_NULL}')
+    op.execute('ALTER TABLE students_partitioned ALTER COLUMN enrollment_date SET NOT NULL')
+    op.execute('ALTER TABLE students RENAME CONSTRAINT students_pkey TO students_pkey_unpartitioned')
+    op.execute(
+        'ALTER TABLE students_partitioned '
+        'ADD CONSTRAINT students_pkey PRIMARY KEY (id, enrollment_date)'
+    )
+    op.execute('CREATE TABLE students_default PARTITION OF students_partitioned DEFAULT')
+    op.execute(ENSURE_PARTITIONS)
+    op.execute("""
+        SELECT students_ensure_partitions(
+            12, min(enrollment_date),
+            greatest(max(enrollment_date), localtimestamp) + interval '1 year',
+            'students_partitioned'
+        )
+        FROM students
+    """)
+    for name in INDEXES:
+        op.execute(f'ALTER INDEX IF EXISTS {name} RENAME TO {name}_unpartitioned')
+    for name, definition in INDEXES.items():
+        op.execute(f'CREATE INDEX {name} ON students_partitioned {definition}')
+
+    op.create_table('student_keys',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('phone_number', sa.String(length=15), nullable=True),
+    sa.Column('enrollment_date', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('phone_number')
+    )
+    op.execute(SYNC_KEYS)
+    op.execute(CLAIM_KEYS)
+    op.execute(
+        'CREATE TRIGGER student_keys_sync AFTER INSERT OR UPDATE OR DELETE ON students_partitioned '
+        'FOR EACH ROW EXECUTE FUNCTION student_keys_sync()'
+    )
+    op.execute(
+        'CREATE TRIGGER student_keys_truncate AFTER TRUNCATE ON students_partitioned '
+        'FOR EACH STATEMENT EXECUTE FUNCTION student_keys_sync()'
+    )
+    op.execute(
+        'CREATE TRIGGER student_keys_claim BEFORE INSERT ON students_partitioned '
+        'FOR EACH ROW EXECUTE FUNCTION student_keys_claim()'
+    )
+    op.execute(MIRROR)
+    op.execute(
+        'CREATE TRIGGER students_mirror AFTER INSERT OR UPDATE OR DELETE ON students '
+        'FOR EACH ROW EXECUTE FUNCTION students_mirror()'
+    )
+
+    # the mirror is committed before the copy starts; each batch commits on
+    # its own, so writes only ever wait for the rows of one batch
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        last = bind.execute(sa.text('SELECT min(id) - 1 FROM students')).scalar()
+        while last is not None:
+            try:
+                last = bind.execute(BACKFILL, {'last': last, 'size': BACKFILL_BATCH_SIZE}).scalar()
+            except IntegrityError:
+                # a mirrored row committed after the batch started; try again
+                continue
+
+    # the swap itself holds the lock for a few catalog updates only
+    op.execute('LOCK TABLE students IN ACCESS EXCLUSIVE MODE')
+    op.execute('ALTER SEQUENCE students_id_seq OWNED BY students_partitioned.id')
+    op.execute('DROP TABLE students')
+    op.execute('DROP FUNCTION students_mirror()')
+    op.execute('ALTER TABLE students_partitioned RENAME TO students')
+    create_stats_triggers()
+
+    # the planner has no statistics of a partitioned table until analyzed,
+    # and autovacuum never analyzes one; it does not block writes
+    with op.get_context().autocommit_block():
+        op.execute('ANALYZE students')
+
+
+def downgrade() -> None:
+    # offline: the students are copied back under an exclusive lock; the
+    # enrollment dates the upgrade filled in are kept
+    op.execute('LOCK TABLE students IN ACCESS EXCLUSIVE MODE')
+    op.execute(
+        'CREATE TABLE students_unpartitioned '
+        '(LIKE students INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+    )
+    op.execute('INSERT INTO students_unpartitioned SELECT * FROM students')
+    op.execute('ALTER TABLE students_unpartitioned ALTER COLUMN enrollment_date DROP NOT NULL')
+    op.execute('ALTER TABLE students DROP CONSTRAINT students_pkey')
+    op.execute('ALTER TABLE students_unpartitioned ADD CONSTRAINT students_pkey PRIMARY KEY (id)')
+    op.execute(
+        'ALTER TABLE students_unpartitioned '
+        'ADD CONSTRAINT students_phone_number_key UNIQUE (phone_number)'
+    )
+    op.execute('ALTER SEQUENCE students_id_seq OWNED BY students_unpartitioned.id')
+    op.execute('DROP TABLE students')
+    op.execute('ALTER TABLE students_unpartitioned RENAME TO students')
+    for name, definition in INDEXES.items():
+        op.execute(f'CREATE INDEX {name} ON students {definition}')
+    create_stats_triggers()
+    op.drop_table('student_keys')
+    op.execute('DROP FUNCTION student_keys_claim()')
+    op.execute('DROP FUNCTION student_keys_sync()')
+    op.execute('DROP FUNCTION students_ensure_partitions(integer, timestamp, timestamp, text)')
@@ -0,0 +1,46 @@
+"""add student trigram indexes
+
+Revision ID: d47a9b1c3e05
+Revises: 8c3f41a9e6b2
+Create Date: 2026-10-18 13:05:52.771930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd47a9b1c3e05'
+down_revision = '8c3f41a9e6b2'
+branch_labels = None
+depends_on = None
+
+# must stay identical to `student.models.student.full_name`, or searches
+# will not use the index
+FULL_NAME = "(coalesce(first_name, '') || ' ' || coalesce(last_name, ''))"
+
+
+def upgrade() -> None:
+    # pg_trgm is a trusted extension, so the database owner may create it
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_students_full_name_trgm', 'students',
+            [sa.text(f'{FULL_NAME} gin_trgm_ops')],
+            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_students_address_trgm', 'students',
+            [sa.text('address gin_trgm_ops')],
+            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    # the extension is left in place, other objects may depend on it
+    with op.get_context().autocommit_block():
+        for name in ('ix_students_address_trgm', 'ix_students_full_name_trgm'):
+            op.drop_index(
+                name, table_name='students',
+                postgresql_concurrently=True, if_exists=True
+            )
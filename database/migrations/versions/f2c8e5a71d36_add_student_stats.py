@@ -0,0 +1,95 @@
+"""add student stats
+
+Revision ID: f2c8e5a71d36
+Revises: d47a9b1c3e05
+Create Date: 2026-10-18 14:22:10.092417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c8e5a71d36'
+down_revision = 'd47a9b1c3e05'
+branch_labels = None
+depends_on = None
+
+# One function serves every trigger: the rows a statement removed count -1
+# and the rows it added +1 in their bucket, netted per bucket. An update
+# that moves no student to another bucket therefore writes nothing. The
+# source is chosen with dynamic SQL since a transition table the trigger
+# does not declare cannot even be planned.
+APPLY_DELTAS = """
+CREATE FUNCTION student_stats_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    added CONSTANT text := 'SELECT education, gender, enrollment_date, 1 AS delta FROM new_rows';
+    removed CONSTANT text := 'SELECT education, gender, enrollment_date, -1 AS delta FROM old_rows';
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM student_stats;
+        RETURN NULL;
+    END IF;
+    EXECUTE format($sql$
+        INSERT INTO student_stats AS stats (education, gender, month, count)
+        SELECT coalesce(education::text, ''),
+               coalesce(gender::text, ''),
+               coalesce(to_char(enrollment_date, 'YYYY-MM'), ''),
+               sum(delta)
+        FROM (%s) AS changed
+        GROUP BY 1, 2, 3
+        HAVING sum(delta) <> 0
+        ON CONFLICT (education, gender, month)
+        DO UPDATE SET count = stats.count + excluded.count
+    $sql$, CASE TG_OP
+        WHEN 'INSERT' THEN added
+        WHEN 'DELETE' THEN removed
+        ELSE added || ' UNION ALL ' || removed
+    END);
+    RETURN NULL;
+END $$
+"""
+
+# transition tables are only allowed on single event triggers
+TRIGGERS = {
+    'student_stats_insert': 'AFTER INSERT ON students REFERENCING NEW TABLE AS new_rows',
+    'student_stats_update': 'AFTER UPDATE ON students REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows',
+    'student_stats_delete': 'AFTER DELETE ON students REFERENCING OLD TABLE AS old_rows',
+}
+
+
+def upgrade() -> None:
+    op.create_table('student_stats',
+    sa.Column('education', sa.String(length=20), nullable=False),
+    sa.Column('gender', sa.String(length=10), nullable=False),
+    sa.Column('month', sa.String(length=7), nullable=False),
+    sa.Column('count', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('education', 'gender', 'month')
+    )
+    # no write may slip in between the backfill and the triggers
+    op.execute('LOCK TABLE students IN SHARE ROW EXCLUSIVE MODE')
+    op.execute(APPLY_DELTAS)
+    for name, event in TRIGGERS.items():
+        op.execute(
+            f'CREATE TRIGGER {name} {event} '
+            'FOR EACH STATEMENT EXECUTE FUNCTION student_stats_apply()'
+        )
+    op.execute(
+        'CREATE TRIGGER student_stats_truncate AFTER TRUNCATE ON students '
+        'FOR EACH STATEMENT EXECUTE FUNCTION student_stats_apply()'
+    )
+    op.execute("""
+        INSERT INTO student_stats (education, gender, month, count)
+        SELECT coalesce(education::text, ''), coalesce(gender::text, ''),
+               coalesce(to_char(enrollment_date, 'YYYY-MM'), ''), count(*)
+        FROM students
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade() -> None:
+    for name in [*TRIGGERS, 'student_stats_truncate']:
+        op.execute(f'DROP TRIGGER IF EXISTS {name} ON students')
+    op.execute('DROP FUNCTION IF EXISTS student_stats_apply()')
+    op.drop_table('student_stats')
@@ -0,0 +1,109 @@
+import asyncio
+from contextlib import suppress
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from kernel.settings.logging import coreLogger
+
+# the function of migration `c61f0b8d2a47`, which also gives the students of
+# the default partition a partition of their own
+ENSURE_PARTITIONS = text("""
+    SELECT students_ensure_partitions(
+        :months, until => localtimestamp + make_interval(months => :months * :ahead)
+    )
+""")
+
+# `students` has no unique index to find conflicts on, the keys are unique in
+# `student_keys` instead; for the rest of the transaction, an insert of a
+# taken key is skipped there, as by `ON CONFLICT DO NOTHING`, not refused
+SKIP_CONFLICTS = text("SELECT set_config('students.skip_conflicts', 'on', true)")
+
+
+async def ensure_partitions(
+    engine: AsyncEngine,
+    months: int,
+    ahead: int,
+    lock_timeout: float
+) -> List[str]:
+    """
+    Creates the partitions of `students` for the current and coming periods.
+
+    Creating a partition briefly locks the table against writes, and the
+    default partition against reads, while attaching it; a lock not granted
+    within `lock_timeout` fails the call rather than queue every query of
+    the table behind it.
+
+    Parameters
+    ----------
+    engine : AsyncEngine
+        The engine of the database.
+    months : int
+        The months each partition spans, a divisor of 12.
+    ahead : int
+        The partitions to create beyond the current one.
+    lock_timeout : float
+        Seconds to wait for each lock.
+
+    Returns
+    -------
+    list of str
+        The partitions created.
+    """
+    async with engine.begin() as connection:
+        await connection.execute(
+            text("SELECT set_config('lock_timeout', :timeout, true)"),
+            {'timeout': f'{round(lock_timeout * 1000)}ms'}
+        )
+        result = await connection.execute(ENSURE_PARTITIONS, {'months': months, 'ahead': ahead})
+        created = list(result.scalars())
+    for name in created:
+        coreLogger.info("Created partition %s", name)
+    return created
+
+
+async def maintain_partitions(
+    database,
+    months: int,
+    ahead: int,
+    interval: float,
+    lock_timeout: float,
+    stop: asyncio.Event
+) -> None:
+    """
+    Keeps the partitions of the coming periods created, until stopped.
+
+    Runs `ensure_partitions()` on the database and every shard of a
+    `SqlAlchemy` right away, then every `interval` seconds. Every worker
+    process may run it, the database lets one create the partitions at a
+    time. A failure is logged and retried at the next round.
+
+    It is stopped by `stop` rather than cancelled: a cancellation arriving
+    while a connection is being opened may be lost, and the round in
+    progress is short, bounded by `lock_timeout`.
+
+    Parameters
+    ----------
+    database : SqlAlchemy
+        The database whose engines are used, as they are at every round.
+    months : int
+        The months each partition spans, a divisor of 12.
+    ahead : int
+        The partitions to create beyond the current one.
+    interval : float
+        Seconds between two rounds.
+    lock_timeout : float
+        Seconds to wait for each lock.
+    stop : asyncio.Event
+        Set to return after the round in progress.
+    """
+    while not stop.is_set():
+        for engine in (database.async_engine, *(shard.async_engine for shard in database.shards)):
+            try:
+                await ensure_partitions(engine, months, ahead, lock_timeout)
+            except SQLAlchemyError as e:
+                coreLogger.error("Failed to create the partitions of students: %s", e)
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(stop.wait(), interval)
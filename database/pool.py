@@ -0,0 +1,176 @@
+import threading
+from time import perf_counter
+
+from sqlalchemy.pool import (
+    AsyncAdaptedQueuePool,
+    QueuePool
+)
+
+from kernel.metrics import (
+    POOL_CHECKED_OUT,
+    POOL_OVERFLOW,
+    POOL_WAIT
+)
+
+
+class PoolWaitStats:
+    """
+    Accumulates how long callers waited to check a connection out of a pool.
+
+    The wait covers everything `Pool._do_get()` does: taking an idle
+    connection, opening a new one inside the overflow budget, or blocking
+    until another caller returns one.
+
+    Attributes
+    ----------
+    checkouts : int
+        The number of completed checkouts.
+    total_wait : float
+        The summed wait of all checkouts, in seconds.
+    max_wait : float
+        The longest single wait, in seconds.
+
+    Examples
+    --------
+    >>> stats = PoolWaitStats()
+    >>> stats.record(0.002)
+    >>> stats.snapshot()['checkouts']
+    1
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, seconds: float) -> None:
+        """
+        Records the wait of a single checkout.
+
+        Parameters
+        ----------
+        seconds : float
+            The time the checkout took, in seconds.
+        """
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            if seconds > self.max_wait:
+                self.max_wait = seconds
+
+    def snapshot(self) -> dict:
+        """
+        Returns the accumulated wait statistics.
+
+        Returns
+        -------
+        dict
+            The checkout count and the total, average and maximum wait in
+            seconds.
+        """
+        with self._lock:
+            average = self.total_wait / self.checkouts if self.checkouts else 0.0
+            return {
+                'checkouts': self.checkouts,
+                'total_wait': self.total_wait,
+                'average_wait': average,
+                'max_wait': self.max_wait,
+            }
+
+
+class TimedPoolMixin:
+    """
+    Times every connection checkout of the pool it is mixed into.
+
+    The wait is also observed in the `db_pool_checkout_wait_seconds`
+    histogram, and the checked out and overflow gauges are refreshed on
+    every checkout and checkin, labeled with the pool's `metrics_label`.
+    `Pool.recreate()` builds the replacement through `self.__class__`, so a
+    recreated pool starts with fresh statistics.
+    """
+    metrics_label = 'sync'
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+        self._wait_metric = POOL_WAIT.labels(self.metrics_label)
+        self._checked_out_metric = POOL_CHECKED_OUT.labels(self.metrics_label)
+        self._overflow_metric = POOL_OVERFLOW.labels(self.metrics_label)
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            wait = perf_counter() - start
+            self.wait_stats.record(wait)
+            self._wait_metric.observe(wait)
+            self._update_gauges()
+
+    def _do_return_conn(self, record) -> None:
+        super()._do_return_conn(record)
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        self._checked_out_metric.set(self.checkedout())
+        self._overflow_metric.set(self.overflow())
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    """A `QueuePool` that records connection checkout wait time."""
+
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    """An `AsyncAdaptedQueuePool` that records connection checkout wait time."""
+    metrics_label = 'async'
+
+
+def labeled(pool_class: type, label: str) -> type:
+    """
+    Derives a timed pool class reporting its metrics under another label.
+
+    Parameters
+    ----------
+    pool_class : type
+        A timed pool class, e.g. `TimedAsyncAdaptedQueuePool`.
+    label : str
+        The `engine` label of its metrics.
+
+    Returns
+    -------
+    type
+        A subclass of `pool_class` with `label` as its `metrics_label`.
+
+    Examples
+    --------
+    >>> create_async_engine(url, poolclass=labeled(TimedAsyncAdaptedQueuePool, 'replica'))
+    """
+    return type(pool_class.__name__, (pool_class,), {'metrics_label': label})
+
+
+def pool_status(pool) -> dict:
+    """
+    Describes the current state of a connection pool.
+
+    Parameters
+    ----------
+    pool : Pool
+        A pool created by `SqlAlchemy`.
+
+    Returns
+    -------
+    dict
+        The configured size, the checked in, checked out and overflow
+        connection counts and, for timed pools, the checkout wait statistics.
+    """
+    status = {
+        'size': pool.size(),
+        'checked_in': pool.checkedin(),
+        'checked_out': pool.checkedout(),
+        'overflow': pool.overflow(),
+    }
+    wait_stats = getattr(pool, 'wait_stats', None)
+    if wait_stats is not None:
+        status['wait'] = wait_stats.snapshot()
+    return status
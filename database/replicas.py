@@ -0,0 +1,298 @@
+import asyncio
+import itertools
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from enum import StrEnum
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine
+)
+
+from kernel.metrics import READS, REPLICA_LAG
+from kernel.settings.logging import coreLogger
+from .pool import (
+    TimedAsyncAdaptedQueuePool,
+    labeled,
+    pool_status
+)
+
+# Seconds since the last transaction the replica replayed was committed on
+# the primary, or 0 once it replayed everything it received, since an idle
+# primary commits nothing to measure against; after a restart the receive
+# position starts back at its segment, behind the replay one. The first
+# write after the primary was idle thus briefly reads as a long lag, which
+# only sends reads to the primary. NULL while nothing was replayed yet; a
+# server that is not a standby is never behind.
+LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() <= pg_last_wal_replay_lsn() THEN 0
+        ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+_primary_reads: ContextVar[bool] = ContextVar('primary_reads', default=False)
+
+
+@contextmanager
+def primary_reads() -> Iterator[None]:
+    """
+    Sends every read made within the block to the primary.
+
+    The choice follows the current context, so it holds for the request
+    or task that entered the block and nothing else.
+
+    Examples
+    --------
+    >>> with primary_reads():
+    ...     await dal.get_one(id)
+    """
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+class ReplicaBalancing(StrEnum):
+    """How reads are spread over the available replicas."""
+    ROUND_ROBIN = 'round_robin'
+    LEAST_CONNECTIONS = 'least_connections'
+
+
+class Replica:
+    """
+    A read replica, with its engine, session factory and last known lag.
+
+    A replica is unavailable until its lag was first checked, and again as
+    soon as a check or a query fails to reach it.
+
+    Parameters
+    ----------
+    url : str
+        The database URL of the replica.
+    **engine_options : dict
+        Keyword arguments for `create_async_engine`.
+
+    Attributes
+    ----------
+    name : str
+        The replica's host, port and database, labeling its metrics.
+    engine : AsyncEngine
+        The asyncio engine of the replica.
+    session : async_sessionmaker[AsyncSession]
+        A factory producing a new `AsyncSession` on the replica.
+    lag : float or None
+        The replication lag in seconds as last checked, or None while the
+        replica is unavailable.
+    error : str or None
+        Why the replica is unavailable, if it is.
+    """
+
+    def __init__(self, url: str, **engine_options) -> None:
+        parsed = make_url(url)
+        self.name = f'{parsed.host}:{parsed.port or 5432}/{parsed.database}'
+        self.engine = create_async_engine(
+            url,
+            poolclass=labeled(TimedAsyncAdaptedQueuePool, f'replica {self.name}'),
+            **engine_options
+        )
+        self.session: async_sessionmaker[AsyncSession] = \
+            async_sessionmaker(self.engine, expire_on_commit=False)
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = 'not checked yet'
+        self.reads = READS.labels(self.name)
+        self._lag_metric = REPLICA_LAG.labels(self.name)
+        self._lag_metric.set(float('nan'))
+        event.listen(self.engine.sync_engine, 'handle_error', self._handle_error)
+
+    def _handle_error(self, context) -> None:
+        # connection failures and server shutdowns, not bad statements
+        if isinstance(context.sqlalchemy_exception, OperationalError):
+            self.mark_unavailable(str(context.original_exception).strip())
+
+    def mark_unavailable(self, error: str) -> None:
+        """
+        Stops routing reads to the replica until its next successful check.
+
+        Parameters
+        ----------
+        error : str
+            Why the replica is unavailable.
+        """
+        if self.lag is not None:
+            coreLogger.warning("Replica %s is unavailable: %s", self.name, error)
+        self.lag = None
+        self.error = error
+        self._lag_metric.set(float('nan'))
+
+    async def check(self, timeout: float) -> None:
+        """
+        Measures the replication lag of the replica.
+
+        Parameters
+        ----------
+        timeout : float
+            Seconds the replica has to answer before it is considered
+            unavailable.
+        """
+        try:
+            async with asyncio.timeout(timeout):
+                async with self.engine.connect() as connection:
+                    lag = (await connection.execute(LAG_QUERY)).scalar()
+        except TimeoutError:
+            self.mark_unavailable(f"no answer within {timeout}s")
+            return
+        except SQLAlchemyError as e:
+            self.mark_unavailable(str(e.orig or e).strip())
+            return
+        except Exception as e:
+            # anything else would end the checks of every replica
+            coreLogger.exception("Failed to check replica %s", self.name)
+            self.mark_unavailable(repr(e))
+            return
+        if lag is None:
+            self.mark_unavailable("no transaction replayed yet")
+            return
+        if self.lag is None:
+            coreLogger.info("Replica %s is available, %.3fs behind", self.name, lag)
+        self.lag = float(lag)
+        self.error = None
+        self._lag_metric.set(self.lag)
+
+
+class ReplicaSet:
+    """
+    Routes reads over the replicas that are close enough to the primary.
+
+    The lag of every replica is checked every `check_interval` seconds by
+    a task of the event loop, started by the first read. A replica more
+    than `max_lag` seconds behind, or unavailable, is skipped; when every
+    replica is, reads go to the primary.
+
+    Parameters
+    ----------
+    urls : list of str
+        The database URLs of the replicas.
+    balancing : str
+        A `ReplicaBalancing`: `round_robin` takes the available replicas in
+        turn, `least_connections` the one with the fewest connections
+        checked out by this process, in turn among equals.
+    max_lag : float
+        The replication lag, in seconds, beyond which a replica is skipped.
+    check_interval : float
+        Seconds between two lag checks.
+    **engine_options : dict
+        Keyword arguments for the `create_async_engine` of each replica.
+
+    Examples
+    --------
+    >>> replicas = ReplicaSet(urls, 'round_robin', max_lag=5, check_interval=1)
+    >>> replica = replicas.route()
+    >>> engine = primary_engine if replica is None else replica.engine
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        balancing: str,
+        max_lag: float,
+        check_interval: float,
+        **engine_options
+    ) -> None:
+        self.balancing = ReplicaBalancing(balancing)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.replicas = [Replica(url, **engine_options) for url in urls]
+        self._turn = itertools.count()
+        self._monitor: Optional[asyncio.Task] = None
+        self._primary_reads = READS.labels('primary')
+
+    def is_available(self, replica: Replica) -> bool:
+        """Tells whether reads may go to a replica."""
+        return replica.lag is not None and replica.lag <= self.max_lag
+
+    def route(self) -> Optional[Replica]:
+        """
+        Chooses where the next read goes.
+
+        Must be called from the event loop.
+
+        Returns
+        -------
+        Replica or None
+            The replica to read from, or None for the primary, which is
+            also chosen within `primary_reads()`.
+        """
+        self._watch()
+        replica = None
+        if not _primary_reads.get():
+            replica = self._pick()
+        (self._primary_reads if replica is None else replica.reads).inc()
+        return replica
+
+    def _pick(self) -> Optional[Replica]:
+        available = [replica for replica in self.replicas if self.is_available(replica)]
+        if not available:
+            return None
+        start = next(self._turn) % len(available)
+        if self.balancing is ReplicaBalancing.ROUND_ROBIN:
+            return available[start]
+        # min() keeps the first of equals, which is rotated every time
+        rotated = available[start:] + available[:start]
+        return min(rotated, key=lambda replica: replica.engine.pool.checkedout())
+
+    def _watch(self) -> None:
+        """Starts checking the replicas, if not done in this event loop yet."""
+        loop = asyncio.get_running_loop()
+        if self._monitor is None or self._monitor.done() or self._monitor.get_loop() is not loop:
+            self._monitor = loop.create_task(self._check_forever())
+
+    async def _check_forever(self) -> None:
+        # a replica slower to answer than the lag allowed is behind anyway
+        timeout = max(self.max_lag, self.check_interval)
+        while True:
+            await asyncio.gather(*(replica.check(timeout) for replica in self.replicas))
+            await asyncio.sleep(self.check_interval)
+
+    async def dispose(self) -> None:
+        """Stops the lag checks and closes every pooled connection."""
+        if self._monitor is not None:
+            self._monitor.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._monitor
+            self._monitor = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def forget(self) -> None:
+        """Drops the pools inherited through `fork()` without closing them."""
+        self._monitor = None
+        for replica in self.replicas:
+            replica.engine.sync_engine.dispose(close=False)
+
+    def status(self) -> dict:
+        """
+        Describes every replica.
+
+        Returns
+        -------
+        dict
+            By replica name, its availability, lag, the reason it is
+            unavailable and the status of its connection pool.
+        """
+        return {
+            replica.name: {
+                'available': self.is_available(replica),
+                'lag': replica.lag,
+                'error': replica.error,
+                **pool_status(replica.engine.pool),
+            }
+            for replica in self.replicas
+        }
@@ -0,0 +1,136 @@
+import hashlib
+from typing import Any
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine
+)
+
+from .pool import (
+    TimedAsyncAdaptedQueuePool,
+    labeled
+)
+
+# the multiplier of the linear congruential generator of the jump hash
+JUMP_MULTIPLIER = 2862933555777941757
+UINT64 = (1 << 64) - 1
+
+
+def shard_hash(value: Any) -> int:
+    """
+    Hashes a shard key value to 64 bits, the same in every process.
+
+    Python's own `hash()` of a string changes from one interpreter to the
+    next, so the placement could not be shared by workers nor survive a
+    restart.
+
+    Parameters
+    ----------
+    value : Any
+        The shard key value, hashed by its string form.
+
+    Returns
+    -------
+    int
+        An unsigned 64 bit hash.
+    """
+    digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """
+    Maps a 64 bit key to one of `buckets` buckets with a jump consistent hash.
+
+    Keys spread evenly, and going from n to n + 1 buckets only moves the
+    keys that land in the new bucket, about one in n + 1 of them: a shard
+    appended to the list takes its share from every other shard, and no
+    student moves between the shards that were already there.
+
+    Parameters
+    ----------
+    key : int
+        An unsigned 64 bit key, see `shard_hash()`.
+    buckets : int
+        The number of buckets, at least 1.
+
+    Returns
+    -------
+    int
+        The bucket, from 0 to `buckets - 1`.
+
+    Examples
+    --------
+    >>> jump_hash(shard_hash(42), 4)
+    """
+    bucket, jump = -1, 0
+    while jump < buckets:
+        bucket = jump
+        key = (key * JUMP_MULTIPLIER + 1) & UINT64
+        jump = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def place(value: Any, shards: int) -> int:
+    """
+    Returns the shard a shard key value belongs to.
+
+    Parameters
+    ----------
+    value : Any
+        The shard key value.
+    shards : int
+        The number of shards.
+
+    Returns
+    -------
+    int
+        The index of the shard.
+    """
+    return jump_hash(shard_hash(value), shards)
+
+
+class Shard:
+    """
+    A database of a sharded deployment other than the primary one.
+
+    It offers the engine and session factories the asyncio data access
+    layer uses on `SqlAlchemy`, reads included, so a layer can be bound to
+    either. Its reads are not routed to replicas.
+
+    Parameters
+    ----------
+    url : str
+        The database URL of the shard.
+    **engine_options : dict
+        Keyword arguments for `create_async_engine`.
+
+    Attributes
+    ----------
+    name : str
+        The shard's host, port and database, labeling its pool metrics.
+    async_engine : AsyncEngine
+        The asyncio engine of the shard.
+    async_session : async_sessionmaker[AsyncSession]
+        A factory producing a new `AsyncSession` on the shard.
+    """
+
+    def __init__(self, url: str, **engine_options) -> None:
+        parsed = make_url(url)
+        self.name = f'{parsed.host}:{parsed.port or 5432}/{parsed.database}'
+        self.async_engine = create_async_engine(
+            url,
+            poolclass=labeled(TimedAsyncAdaptedQueuePool, f'shard {self.name}'),
+            **engine_options
+        )
+        self.async_session: async_sessionmaker[AsyncSession] = \
+            async_sessionmaker(self.async_engine, expire_on_commit=False)
+
+    def read_engine(self) -> AsyncEngine:
+        return self.async_engine
+
+    def read_session(self) -> AsyncSession:
+        return self.async_session()
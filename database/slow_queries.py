@@ -0,0 +1,298 @@
+import queue
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Engine, create_engine, event, text
+
+from kernel.settings.logging import slowQueryLogger
+
+# statements worth a plan; anything but a plain SELECT is only planned,
+# never run, since ANALYZE executes the statement
+EXPLAINABLE = re.compile(r'^\s*(select|with|insert|update|delete)\b', re.IGNORECASE)
+ANALYZABLE = re.compile(r'^\s*select\b', re.IGNORECASE)
+
+# normalization, so every execution of a statement shares one entry
+_WHITESPACE = re.compile(r'\s+')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'%\(\w+\)s(?:\s*,\s*%\(\w+\)s)+')
+_PLACEHOLDER = re.compile(r'%\((\w+?)(?:_\d+)*\)s')
+
+MAX_PARAMETERS_LENGTH = 500
+
+
+def normalize_statement(statement: str) -> str:
+    """
+    Reduces a statement to the shape shared by all its executions.
+
+    Whitespace is collapsed, literals become `?`, an expanded `IN` list
+    becomes a single `...` and the numbered suffixes SQLAlchemy gives
+    repeated bound parameters are dropped.
+
+    Parameters
+    ----------
+    statement : str
+        The statement as sent to the driver.
+
+    Returns
+    -------
+    str
+        The normalized statement.
+
+    Examples
+    --------
+    >>> normalize_statement("SELECT * FROM students WHERE id IN (%(id_1_1)s, %(id_1_2)s)")
+    'SELECT * FROM students WHERE id IN (...)'
+    """
+    statement = _WHITESPACE.sub(' ', statement).strip()
+    statement = _STRING.sub('?', statement)
+    statement = _NUMBER.sub('?', statement)
+    statement = _PLACEHOLDER_LIST.sub('...', statement)
+    return _PLACEHOLDER.sub(r'%(\1)s', statement)
+
+
+@dataclass
+class SlowStatement:
+    """
+    The accumulated timings of one normalized statement.
+
+    Attributes
+    ----------
+    statement : str
+        The normalized statement.
+    calls : int
+        How many executions crossed the threshold.
+    total_time : float
+        Their summed duration, in seconds.
+    max_time : float
+        The longest of them, in seconds.
+    last_parameters : str
+        The parameters of the latest slow execution, truncated.
+    last_seen : float
+        When it last ran slowly, as a UNIX timestamp.
+    plan : str, optional
+        The latest plan captured for it, if any.
+    """
+    statement: str
+    calls: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    last_parameters: str = ''
+    last_seen: float = 0.0
+    plan: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {
+            'statement': self.statement,
+            'calls': self.calls,
+            'total_ms': self.total_time * 1000,
+            'mean_ms': self.total_time / self.calls * 1000,
+            'max_ms': self.max_time * 1000,
+            'last_parameters': self.last_parameters,
+            'last_seen': self.last_seen,
+            'plan': self.plan,
+        }
+
+
+class SlowQueryLog:
+    """
+    Times every statement of the engines it is attached to and keeps the
+    slow ones.
+
+    `before_cursor_execute` and `after_cursor_execute` listeners time each
+    statement; below the threshold that is all they do. A slow statement is
+    logged to the `slow_query` logger and accumulated under its normalized
+    form. A sample of them is handed to a background thread that re-runs
+    them under `EXPLAIN (ANALYZE, BUFFERS)` on its own connection, inside a
+    transaction that is always rolled back, so plans are captured off the
+    request path.
+
+    Parameters
+    ----------
+    url : str
+        The database URL the EXPLAIN connection is opened with.
+    threshold : float
+        The duration, in seconds, from which a statement is slow.
+    max_statements : int
+        How many distinct statements are tracked.
+    explain_sample_rate : float
+        The share of slow executions that are explained, from 0 to 1.
+    explain_timeout : float
+        The `statement_timeout` of an EXPLAIN, in seconds.
+
+    Examples
+    --------
+    >>> slow_queries = SlowQueryLog(DB_URL, threshold=0.1)
+    >>> slow_queries.attach(engine)
+    >>> slow_queries.top(10)
+    """
+
+    def __init__(
+        self,
+        url: str,
+        threshold: float,
+        max_statements: int = 1000,
+        explain_sample_rate: float = 0.1,
+        explain_timeout: float = 10
+    ) -> None:
+        self.url = url
+        self.threshold = threshold
+        self.max_statements = max_statements
+        self.explain_sample_rate = explain_sample_rate
+        self.explain_timeout = explain_timeout
+        self._statements: Dict[str, SlowStatement] = {}
+        self._lock = threading.Lock()
+        self._explain_queue: queue.Queue = queue.Queue(maxsize=100)
+        self._explainer: Optional[threading.Thread] = None
+
+    def attach(self, engine: Engine) -> None:
+        """
+        Times the statements of an engine.
+
+        Parameters
+        ----------
+        engine : Engine
+            A sync engine, or the `sync_engine` of an asyncio one.
+        """
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slow_query_start', []).append(perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - conn.info['slow_query_start'].pop()
+        if elapsed >= self.threshold:
+            self.record(statement, parameters, elapsed, executemany)
+
+    def record(self, statement: str, parameters: Any, elapsed: float, executemany: bool = False) -> None:
+        """
+        Accounts one slow execution, and maybe queues it to be explained.
+
+        Parameters
+        ----------
+        statement : str
+            The statement as sent to the driver.
+        parameters : Any
+            Its parameters.
+        elapsed : float
+            How long it took, in seconds.
+        executemany : bool, optional
+            Whether it ran once per parameter set; those are not explained.
+        """
+        normalized = normalize_statement(statement)
+        shown = repr(parameters)[:MAX_PARAMETERS_LENGTH]
+        with self._lock:
+            entry = self._statements.get(normalized)
+            if entry is None:
+                if len(self._statements) >= self.max_statements:
+                    del self._statements[min(
+                        self._statements, key=lambda key: self._statements[key].total_time
+                    )]
+                entry = self._statements[normalized] = SlowStatement(normalized)
+            entry.calls += 1
+            entry.total_time += elapsed
+            entry.max_time = max(entry.max_time, elapsed)
+            entry.last_parameters = shown
+            entry.last_seen = time.time()
+        slowQueryLogger.info("%.1f ms: %s; parameters: %s", elapsed * 1000, normalized, shown)
+        if (
+            not executemany
+            and EXPLAINABLE.match(statement)
+            and random.random() < self.explain_sample_rate
+        ):
+            self._queue_explain(normalized, statement, parameters)
+
+    def _queue_explain(self, normalized: str, statement: str, parameters: Any) -> None:
+        if self._explainer is None or not self._explainer.is_alive():
+            with self._lock:
+                if self._explainer is None or not self._explainer.is_alive():
+                    self._explainer = threading.Thread(
+                        target=self._explain_forever, name='slow-query-explain', daemon=True
+                    )
+                    self._explainer.start()
+        try:
+            self._explain_queue.put_nowait((normalized, statement, parameters))
+        except queue.Full:
+            pass
+
+    def _explain_forever(self) -> None:
+        # a private engine, without the listeners, so explaining is neither
+        # timed nor competes with requests for pooled connections
+        engine = create_engine(self.url, pool_size=1, max_overflow=0, pool_pre_ping=True)
+        while True:
+            normalized, statement, parameters = self._explain_queue.get()
+            try:
+                plan = self.explain(engine, statement, parameters)
+            except Exception as e:
+                slowQueryLogger.warning("EXPLAIN failed for %s: %s", normalized, e)
+                continue
+            with self._lock:
+                entry = self._statements.get(normalized)
+                if entry is not None:
+                    entry.plan = plan
+            slowQueryLogger.info("plan of %s:\n%s", normalized, plan)
+
+    def explain(self, engine: Engine, statement: str, parameters: Any) -> str:
+        """
+        Captures the plan of a statement.
+
+        Parameters
+        ----------
+        engine : Engine
+            The engine to run the EXPLAIN on.
+        statement : str
+            The statement as sent to the driver.
+        parameters : Any
+            Its parameters.
+
+        Returns
+        -------
+        str
+            The plan, one line per node.
+        """
+        options = 'ANALYZE, BUFFERS' if ANALYZABLE.match(statement) else 'COSTS'
+        with engine.connect() as connection:
+            try:
+                connection.execute(
+                    text("SELECT set_config('statement_timeout', :timeout, true)"),
+                    {'timeout': f'{int(self.explain_timeout * 1000)}ms'}
+                )
+                rows = connection.exec_driver_sql(
+                    f'EXPLAIN ({options}) {statement}', parameters
+                ).scalars().all()
+            finally:
+                connection.rollback()
+        return '\n'.join(rows)
+
+    def top(self, limit: int) -> List[dict]:
+        """
+        Lists the statements that took the most time.
+
+        Parameters
+        ----------
+        limit : int
+            How many statements to list.
+
+        Returns
+        -------
+        list of dict
+            The statements by descending total time, with their call count,
+            total, mean and maximum duration in milliseconds, latest
+            parameters and captured plan.
+        """
+        with self._lock:
+            entries = sorted(
+                self._statements.values(), key=lambda entry: entry.total_time, reverse=True
+            )[:limit]
+            return [entry.as_dict() for entry in entries]
+
+    def clear(self) -> None:
+        """Forgets every tracked statement."""
+        with self._lock:
+            self._statements.clear()
@@ -0,0 +1,91 @@
+"""
+Gunicorn configuration: serves `main:app` from several uvicorn workers
+forked from one master that imported it first.
+
+    gunicorn main:app
+
+The master imports and builds the application (`preload_app`) and forks
+the workers, which all accept on its listening socket. Code and data
+loaded before the fork are shared by every worker through copy-on-write
+instead of being loaded once per worker; the cyclic garbage collector is
+kept off those objects with `gc.freeze()`, since collecting would write to,
+and so copy, every page they live on. Nothing opens a database connection
+before the fork: each worker creates its engines in the application
+lifespan and disposes of them when it stops, the database driver they use
+being imported by the master.
+
+Gunicorn restarts a worker that dies, and stops if one cannot boot.
+SIGTERM or SIGINT stop every worker gracefully, then the master.
+
+The Prometheus metrics of every worker are aggregated in
+`PROMETHEUS_MULTIPROC_DIR`, or in a temporary directory removed on exit if
+it is not set. It is set up here rather than in a server hook, since the
+application is preloaded before any hook runs, and whatever the number of
+workers, which `--workers` may still change.
+
+The defaults come from `[settings.server]`; command line options such as
+`--workers` or `--bind` override them.
+"""
+import gc
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from kernel.settings import server as server_settings
+
+
+def available_cpus() -> int:
+    """Returns how many CPUs this process may run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+wsgi_app = 'main:app'
+worker_class = 'uvicorn.workers.UvicornWorker'
+preload_app = True
+bind = f'{server_settings.SERVER_HOST}:{server_settings.SERVER_PORT}'
+workers = server_settings.SERVER_WORKERS or available_cpus()
+graceful_timeout = server_settings.SERVER_GRACEFUL_TIMEOUT
+
+# no collection may leave holes in the pages the workers will share
+gc.disable()
+
+metrics_dir = None
+if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+    metrics_dir = tempfile.mkdtemp(prefix='prometheus-')
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = metrics_dir
+# the files of a previous run would be added to this one's
+for path in Path(os.environ['PROMETHEUS_MULTIPROC_DIR']).glob('*.db'):
+    path.unlink()
+
+
+def when_ready(server) -> None:
+    # the database driver is only imported with the engines, in each
+    # worker; imported here, it is shared by all of them
+    from sqlalchemy.engine import make_url
+
+    from kernel.settings.database import DB_URL
+
+    make_url(DB_URL).get_dialect().import_dbapi()
+
+
+def pre_fork(server, worker) -> None:
+    gc.freeze()
+
+
+def post_fork(server, worker) -> None:
+    gc.enable()
+
+
+def child_exit(server, worker) -> None:
+    # the application, and the metrics with it, are loaded by now
+    from kernel.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
+
+
+def on_exit(server) -> None:
+    if metrics_dir is not None:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
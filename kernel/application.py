@@ -1,6 +1,78 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+
+from database import db
+from database.partitions import maintain_partitions
+from kernel.consistency import ReadYourWritesMiddleware
+from kernel.settings import (
+    database as database_settings,
+    partitioning as partitioning_settings
+)
+from kernel.settings.logging import configure_logging
 from student.api.v1 import router
+from kernel.routers import router as admin_router
+from kernel.metrics import (
+    RequestMetricsMiddleware,
+    mark_process_dead,
+    read_metrics
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Owns the database engines of a worker process.
+
+    The engines are created when the worker starts serving, i.e. after any
+    fork, and every pooled connection is closed when it shuts down. Meanwhile
+    the worker keeps the partitions of the coming periods created.
+    """
+    db.connect()
+    stop_partitions = asyncio.Event()
+    partitions = asyncio.create_task(maintain_partitions(
+        db,
+        partitioning_settings.PARTITION_MONTHS,
+        partitioning_settings.PARTITIONS_AHEAD,
+        partitioning_settings.PARTITION_CHECK_INTERVAL,
+        partitioning_settings.PARTITION_LOCK_TIMEOUT,
+        stop_partitions
+    ))
+    try:
+        yield
+    finally:
+        stop_partitions.set()
+        await partitions
+        await db.dispose()
+        mark_process_dead()
+
+
+def create_app() -> FastAPI:
+    """
+    Creates the application.
+
+    Importing and creating it opens no database connection, so a server can
+    build it once before forking its workers, see `gunicorn.conf.py`. Importing
+    this module does not create it: `main.app` is the application of
+    `uvicorn main:app`. Importing it does not read `settings.toml` or
+    configure logging either; creating the application does both.
 
-app = FastAPI()
+    Returns
+    -------
+    FastAPI
+        The student API with its admin routes and metrics.
+    """
+    configure_logging()
+    app = FastAPI(lifespan=lifespan)
+    if database_settings.REPLICA_URLS:
+        app.add_middleware(
+            ReadYourWritesMiddleware,
+            window=database_settings.REPLICA_MAX_LAG + database_settings.REPLICA_CHECK_INTERVAL
+        )
+    app.add_middleware(RequestMetricsMiddleware)
+    app.include_router(router, prefix="/v1/students")
+    app.include_router(admin_router, prefix="/admin")
+    app.add_api_route("/metrics", read_metrics, include_in_schema=False)
+    return app
 
-app.include_router(router, prefix="/v1/students")
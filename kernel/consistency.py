@@ -0,0 +1,78 @@
+import math
+import time
+
+from starlette.requests import cookie_parser
+
+from database.replicas import primary_reads
+
+SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+COOKIE = 'primary_reads_until'
+
+
+class ReadYourWritesMiddleware:
+    """
+    An ASGI middleware sending the reads of a recent writer to the primary.
+
+    A request that may write, i.e. any but GET, HEAD and OPTIONS, reads
+    from the primary, and its response sets a cookie sending every request
+    of the client to the primary for the next `window` seconds, after which
+    any replica still in use has its writes. Other clients keep reading from
+    the replicas, and may not see the writes for up to that long.
+
+    Parameters
+    ----------
+    app : ASGIApp
+        The application to wrap.
+    window : float
+        Seconds after a write during which the writer reads from the
+        primary: the replication lag allowed plus the interval between two
+        lag checks, since a replica is only skipped once a check saw it
+        behind.
+
+    Examples
+    --------
+    >>> app.add_middleware(ReadYourWritesMiddleware, window=6)
+    """
+
+    def __init__(self, app, window: float) -> None:
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        if scope['method'] in SAFE_METHODS:
+            if self._wrote_recently(scope):
+                with primary_reads():
+                    await self.app(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message) -> None:
+            if message['type'] == 'http.response.start':
+                until = time.time() + self.window
+                cookie = (
+                    f'{COOKIE}={until:.3f}; Max-Age={math.ceil(self.window)}; '
+                    'Path=/; HttpOnly; SameSite=Lax'
+                )
+                headers = list(message.get('headers', []))
+                headers.append((b'set-cookie', cookie.encode('latin-1')))
+                message['headers'] = headers
+            await send(message)
+
+        with primary_reads():
+            await self.app(scope, receive, send_with_cookie)
+
+    @staticmethod
+    def _wrote_recently(scope) -> bool:
+        """Tells whether the request carries an unexpired write cookie."""
+        for name, value in scope['headers']:
+            if name == b'cookie':
+                until = cookie_parser(value.decode('latin-1')).get(COOKIE)
+                try:
+                    return until is not None and float(until) > time.time()
+                except ValueError:
+                    return False
+        return False
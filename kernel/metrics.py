@@ -0,0 +1,168 @@
+import os
+from time import perf_counter
+from typing import Dict, Optional
+
+from fastapi import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+
+# With several workers every process writes its samples to memory mapped
+# files in this directory, which must be empty when the server starts, and
+# a scrape of any worker aggregates all of them.
+MULTIPROCESS = 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Time to serve a request, until the last byte of the response was sent.',
+    ['method', 'route', 'status'],
+)
+
+QUERY_DURATION = Histogram(
+    'dal_query_duration_seconds',
+    'Time spent in a data access layer method, by method.',
+    ['dal', 'method'],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10),
+)
+
+QUERY_ERRORS = Counter(
+    'dal_errors_total',
+    'Data access layer failures, by method and DataAccessError subclass.',
+    ['dal', 'method', 'error'],
+)
+
+POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out_connections',
+    'Connections currently checked out of the pool.',
+    ['engine'],
+    multiprocess_mode='livesum',
+)
+
+POOL_OVERFLOW = Gauge(
+    'db_pool_overflow_connections',
+    'Connections open beyond the pool size; negative while the pool is not full.',
+    ['engine'],
+    multiprocess_mode='livesum',
+)
+
+POOL_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Time to check a connection out of the pool.',
+    ['engine'],
+    buckets=(.0001, .0005, .001, .005, .01, .05, .1, .5, 1, 5, 30),
+)
+
+REPLICA_LAG = Gauge(
+    'db_replica_lag_seconds',
+    'Replication lag of a read replica as last checked; NaN while it is unavailable.',
+    ['replica'],
+    multiprocess_mode='livemax',
+)
+
+READS = Counter(
+    'db_reads_total',
+    'Reads routed by the data access layer, by target database.',
+    ['target'],
+)
+
+UNMATCHED_ROUTE = 'unmatched'
+
+
+class RequestMetricsMiddleware:
+    """
+    An ASGI middleware observing the latency of every HTTP request.
+
+    Requests are labeled with the path template of the route that served
+    them, e.g. `/v1/students/{student_id}`, so the number of series stays
+    bounded whatever the ids requested. Being plain ASGI, it adds no task
+    or body buffering to streamed responses.
+
+    Parameters
+    ----------
+    app : ASGIApp
+        The application to wrap.
+
+    Examples
+    --------
+    >>> app.add_middleware(RequestMetricsMiddleware)
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._routes: Optional[Dict] = None
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        start = perf_counter()
+        status = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_DURATION.labels(
+                scope['method'], self._route(scope), str(status)
+            ).observe(perf_counter() - start)
+
+    def _route(self, scope) -> str:
+        """Returns the path template of the route the router matched."""
+        endpoint = scope.get('endpoint')
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if self._routes is None:
+            # routes are all registered once the first request comes in
+            self._routes = {
+                route.endpoint: route.path
+                for route in reversed(scope['app'].routes)
+                if hasattr(route, 'endpoint')
+            }
+        return self._routes.get(endpoint, UNMATCHED_ROUTE)
+
+
+def read_metrics() -> Response:
+    """
+    Renders every metric in the Prometheus text format.
+
+    A plain function, so the multiprocess file reads run in the threadpool
+    rather than the event loop.
+
+    Returns
+    -------
+    Response
+        The metrics of this process, or of all worker processes when
+        `PROMETHEUS_MULTIPROC_DIR` is set.
+    """
+    registry = REGISTRY
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(
+        generate_latest(registry), headers={'Content-Type': CONTENT_TYPE_LATEST}
+    )
+
+
+def mark_process_dead(pid: Optional[int] = None) -> None:
+    """
+    Drops the live gauges of a worker from the multiprocess files.
+
+    Parameters
+    ----------
+    pid : int, optional
+        The process id of the worker, by default this process.
+    """
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,99 @@
+from fastapi import APIRouter, HTTPException, Query, status
+
+from database import db
+from student.api.v1.routers import service_layer
+
+router = APIRouter()
+
+
+@router.get("/pool")
+async def read_pool_status():
+    """
+    Reports the state of the database connection pools of this worker.
+
+    Returns
+    -------
+    dict
+        The size, checked in, checked out and overflow connection counts of
+        the sync and asyncio engines, and how long checkouts waited for a
+        connection.
+    """
+    return db.pool_status()
+
+
+@router.get("/cache")
+async def read_cache_stats():
+    """
+    Reports the counters of the student entity cache of this worker.
+
+    Returns
+    -------
+    dict
+        The hit, miss and coalesced lookup counts, the hit ratio and the
+        number of cached entries.
+    """
+    return service_layer.cache.stats()
+
+
+@router.post("/stats/rebuild")
+async def rebuild_student_stats():
+    """
+    Recomputes the student statistics summary table from scratch.
+
+    Writes to students are blocked while it runs, so it is meant for
+    repairs, e.g. after the table was changed with triggers disabled.
+
+    Returns
+    -------
+    dict
+        The number of students counted.
+    """
+    return {'total': await service_layer.rebuild_stats()}
+
+
+@router.get("/slow-queries")
+async def read_slow_queries(limit: int = Query(20, ge=1, le=1000)):
+    """
+    Lists the statements of this worker that spent the most time being slow.
+
+    Parameters
+    ----------
+    limit : int, optional
+        How many statements to list, 20 by default.
+
+    Returns
+    -------
+    list of dict
+        The normalized statements by descending total time, with their
+        call count, total, mean and maximum duration in milliseconds,
+        latest parameters and sampled `EXPLAIN` plan.
+
+    Raises
+    ------
+    HTTPException
+        If the slow query log is disabled.
+    """
+    if db.slow_queries is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="The slow query log is disabled"
+        )
+    return db.slow_queries.top(limit)
+
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_slow_queries():
+    """
+    Forgets the slow statements of this worker, e.g. after a fix shipped.
+
+    Raises
+    ------
+    HTTPException
+        If the slow query log is disabled.
+    """
+    if db.slow_queries is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="The slow query log is disabled"
+        )
+    db.slow_queries.clear()
@@ -1,6 +1,47 @@
+from functools import cache
 from pathlib import Path
+from typing import Any, Callable, Dict
 
 from utils import get_settings
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
-config = get_settings()
+
+
+@cache
+def get_config() -> Dict[str, Any]:
+    """
+    Returns the `[settings]` of `settings.toml`, parsed on the first call.
+
+    The file is found at the project root whatever the working directory,
+    e.g. of a server started elsewhere.
+    """
+    return get_settings(str(BASE_DIR / 'settings.toml'))
+
+
+def lazy_settings(load: Callable[[dict], Dict[str, Any]]) -> Callable[[str], Any]:
+    """
+    Makes a module `__getattr__` that reads its settings on first access.
+
+    Importing a settings module then parses nothing: `settings.toml` is
+    read when one of its names is first looked up, e.g. by `create_app()`
+    or a command line entry point, not by whatever imported it.
+
+    Parameters
+    ----------
+    load : Callable[[dict], dict]
+        Computes the module's settings by name from the `[settings]`.
+
+    Returns
+    -------
+    Callable[[str], Any]
+        The `__getattr__` of the settings module.
+    """
+    values = cache(lambda: load(get_config()))
+
+    def __getattr__(name: str) -> Any:
+        try:
+            return values()[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    return __getattr__
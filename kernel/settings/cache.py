@@ -0,0 +1,22 @@
+from .base import lazy_settings
+
+# Entity cache, per worker process
+CACHE_CONF: dict
+CACHE_ENABLED: bool
+CACHE_MAX_SIZE: int
+CACHE_TTL: float
+CACHE_NEGATIVE_TTL: float
+
+
+def _load(config: dict) -> dict:
+    conf = config.get('cache', {})
+    return {
+        'CACHE_CONF': conf,
+        'CACHE_ENABLED': conf.get('ENABLED', True),
+        'CACHE_MAX_SIZE': conf.get('MAX_SIZE', 10000),
+        'CACHE_TTL': conf.get('TTL', 60),
+        'CACHE_NEGATIVE_TTL': conf.get('NEGATIVE_TTL', 5),
+    }
+
+
+__getattr__ = lazy_settings(_load)
@@ -1,12 +1,50 @@
-from .base import config
+from .base import lazy_settings
 
 # DB info
-DB_CONF: dict = config['database']
-DB_NAME: str = DB_CONF['DB_NAME']
-DB_USER: str = DB_CONF['DB_USER']
-DB_PASSWORD: str = DB_CONF['DB_PASSWORD']
-DB_PORT: int = DB_CONF['DB_PORT']
-DB_HOST: str =  DB_CONF['DB_HOST']
-
-DB_URL: str = \
-f"postgresql+psycopg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+DB_CONF: dict
+DB_NAME: str
+DB_USER: str
+DB_PASSWORD: str
+DB_PORT: int
+DB_HOST: str
+DB_URL: str
+
+# Connection pool
+POOL_SIZE: int
+MAX_OVERFLOW: int
+POOL_TIMEOUT: float
+POOL_RECYCLE: int
+POOL_PRE_PING: bool
+
+# Read replicas
+REPLICA_URLS: list
+REPLICA_BALANCING: str
+REPLICA_MAX_LAG: float
+REPLICA_CHECK_INTERVAL: float
+
+
+def _load(config: dict) -> dict:
+    conf = config['database']
+    return {
+        'DB_CONF': conf,
+        'DB_NAME': conf['DB_NAME'],
+        'DB_USER': conf['DB_USER'],
+        'DB_PASSWORD': conf['DB_PASSWORD'],
+        'DB_PORT': conf['DB_PORT'],
+        'DB_HOST': conf['DB_HOST'],
+        'DB_URL':
+            f"postgresql+psycopg://{conf['DB_USER']}:{conf['DB_PASSWORD']}"
+            f"@{conf['DB_HOST']}:{conf['DB_PORT']}/{conf['DB_NAME']}",
+        'POOL_SIZE': conf.get('POOL_SIZE', 5),
+        'MAX_OVERFLOW': conf.get('MAX_OVERFLOW', 10),
+        'POOL_TIMEOUT': conf.get('POOL_TIMEOUT', 30),
+        'POOL_RECYCLE': conf.get('POOL_RECYCLE', -1),
+        'POOL_PRE_PING': conf.get('POOL_PRE_PING', False),
+        'REPLICA_URLS': conf.get('REPLICA_URLS', []),
+        'REPLICA_BALANCING': conf.get('REPLICA_BALANCING', 'round_robin'),
+        'REPLICA_MAX_LAG': conf.get('REPLICA_MAX_LAG', 5),
+        'REPLICA_CHECK_INTERVAL': conf.get('REPLICA_CHECK_INTERVAL', 1),
+    }
+
+
+__getattr__ = lazy_settings(_load)
@@ -0,0 +1,30 @@
+import tempfile
+from pathlib import Path
+
+from .base import (
+    BASE_DIR,
+    lazy_settings
+)
+
+# CSV import
+IMPORTER_CONF: dict
+REJECTS_DIR: Path
+COPY_BUFFER_SIZE: int
+WORK_MEM: str
+
+
+def _load(config: dict) -> dict:
+    conf = config.get('importer', {})
+    # outside the project unless configured, so no run leaves files in it
+    rejects_dir = Path(tempfile.gettempdir()) / 'student-rejects'
+    if 'REJECTS_DIR' in conf:
+        rejects_dir = BASE_DIR / conf['REJECTS_DIR']
+    return {
+        'IMPORTER_CONF': conf,
+        'REJECTS_DIR': rejects_dir,
+        'COPY_BUFFER_SIZE': conf.get('COPY_BUFFER_SIZE', 1 << 20),
+        'WORK_MEM': conf.get('WORK_MEM', '256MB'),
+    }
+
+
+__getattr__ = lazy_settings(_load)
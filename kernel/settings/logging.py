@@ -1,18 +1,35 @@
 import tomllib
 import logging.config
 import logging
+from functools import cache
+
 from .base import (
     BASE_DIR,
-    config
+    get_config
 )
 from utils.funcs import create_directories
 
-DIRECTORIES = config['log']['LOG_DIRS']
+LOG_CONFIG_FILE = BASE_DIR / 'config' / 'log' / 'logging.toml'
+
 
-create_directories(BASE_DIR, DIRECTORIES)
+@cache
+def configure_logging() -> None:
+    """
+    Configures logging from `config/log/logging.toml`, once per process.
 
-with open('config/log/logging.toml', mode='rb') as config_file:
-    log_conf_dict = tomllib.load(config_file)
+    Nothing is configured on import: `create_app()` and the command line
+    entry points call this before they log. The log directories are
+    created first, and relative log file names are taken from the project
+    root, so the configuration does not depend on the working directory.
+    """
+    create_directories(BASE_DIR, get_config()['log']['LOG_DIRS'])
+    with open(LOG_CONFIG_FILE, mode='rb') as config_file:
+        log_conf_dict = tomllib.load(config_file)
+    for handler in log_conf_dict.get('handlers', {}).values():
+        if 'filename' in handler:
+            handler['filename'] = str(BASE_DIR / handler['filename'])
     logging.config.dictConfig(log_conf_dict)
 
+
 coreLogger = logging.getLogger('core')
+slowQueryLogger = logging.getLogger('slow_query')
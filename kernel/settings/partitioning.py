@@ -0,0 +1,22 @@
+from .base import lazy_settings
+
+# Partitions of students by enrollment date
+PARTITIONING_CONF: dict
+PARTITION_MONTHS: int
+PARTITIONS_AHEAD: int
+PARTITION_CHECK_INTERVAL: float
+PARTITION_LOCK_TIMEOUT: float
+
+
+def _load(config: dict) -> dict:
+    conf = config.get('partitioning', {})
+    return {
+        'PARTITIONING_CONF': conf,
+        'PARTITION_MONTHS': conf.get('MONTHS', 12),
+        'PARTITIONS_AHEAD': conf.get('AHEAD', 2),
+        'PARTITION_CHECK_INTERVAL': conf.get('CHECK_INTERVAL', 3600),
+        'PARTITION_LOCK_TIMEOUT': conf.get('LOCK_TIMEOUT', 5),
+    }
+
+
+__getattr__ = lazy_settings(_load)
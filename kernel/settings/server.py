@@ -0,0 +1,22 @@
+from .base import lazy_settings
+
+# Gunicorn, see gunicorn.conf.py
+SERVER_CONF: dict
+SERVER_HOST: str
+SERVER_PORT: int
+SERVER_WORKERS: int
+SERVER_GRACEFUL_TIMEOUT: float
+
+
+def _load(config: dict) -> dict:
+    conf = config.get('server', {})
+    return {
+        'SERVER_CONF': conf,
+        'SERVER_HOST': conf.get('HOST', '127.0.0.1'),
+        'SERVER_PORT': conf.get('PORT', 8000),
+        'SERVER_WORKERS': conf.get('WORKERS', 0),
+        'SERVER_GRACEFUL_TIMEOUT': conf.get('GRACEFUL_TIMEOUT', 30),
+    }
+
+
+__getattr__ = lazy_settings(_load)
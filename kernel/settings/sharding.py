@@ -0,0 +1,22 @@
+from .base import lazy_settings
+
+# Sharding, off unless shards are listed
+SHARDING_CONF: dict
+SHARD_URLS: list
+SHARD_KEY: str
+ID_BLOCK_SIZE: int
+REBALANCE_BATCH_SIZE: int
+
+
+def _load(config: dict) -> dict:
+    conf = config.get('sharding', {})
+    return {
+        'SHARDING_CONF': conf,
+        'SHARD_URLS': conf.get('SHARD_URLS', []),
+        'SHARD_KEY': conf.get('SHARD_KEY', 'id'),
+        'ID_BLOCK_SIZE': conf.get('ID_BLOCK_SIZE', 100),
+        'REBALANCE_BATCH_SIZE': conf.get('REBALANCE_BATCH_SIZE', 1000),
+    }
+
+
+__getattr__ = lazy_settings(_load)
@@ -0,0 +1,24 @@
+from .base import lazy_settings
+
+# Slow query log, per worker process
+SLOW_QUERY_CONF: dict
+SLOW_QUERY_ENABLED: bool
+SLOW_QUERY_THRESHOLD: float
+SLOW_QUERY_MAX_STATEMENTS: int
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float
+SLOW_QUERY_EXPLAIN_TIMEOUT: float
+
+
+def _load(config: dict) -> dict:
+    conf = config.get('slow_query', {})
+    return {
+        'SLOW_QUERY_CONF': conf,
+        'SLOW_QUERY_ENABLED': conf.get('ENABLED', False),
+        'SLOW_QUERY_THRESHOLD': conf.get('THRESHOLD', 0.1),
+        'SLOW_QUERY_MAX_STATEMENTS': conf.get('MAX_STATEMENTS', 1000),
+        'SLOW_QUERY_EXPLAIN_SAMPLE_RATE': conf.get('EXPLAIN_SAMPLE_RATE', 0.1),
+        'SLOW_QUERY_EXPLAIN_TIMEOUT': conf.get('EXPLAIN_TIMEOUT', 10),
+    }
+
+
+__getattr__ = lazy_settings(_load)
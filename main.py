@@ -1 +1,3 @@
-from kernel.application import app
+from kernel.application import create_app
+
+app = create_app()
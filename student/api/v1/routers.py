@@ -1,38 +1,83 @@
-from typing import List
+from typing import Optional
 
+import orjson
 from fastapi import (
     APIRouter,
+    Depends,
+    Header,
     HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
     status
 )
+from fastapi.responses import (
+    ORJSONResponse,
+    StreamingResponse
+)
 from pydantic import ValidationError
 
 from .schemas import (
     StudentResponseSchema,
+    StudentPageSchema,
+    StudentSearchSchema,
+    StudentStatsSchema,
     UpdateResponseSchema,
     DeleteResponseSchema,
+    BulkCreateResponseSchema,
+    ImportResponseSchema,
+    BatchRequestSchema,
+    BatchResponseSchema
+)
+from student.repository.bll import AsyncStudentService
+from student.repository.bll.types import (
+    StudentFilterSchema,
     StudentUpdateSchema
 )
-from student.repository.bll import StudentService
+from student.helpers.enums import (
+    ExportFormat,
+    StudentSortOptions
+)
+from student.helpers.etags import (
+    make_etag,
+    etag_matches,
+    if_match_versions
+)
+from student.helpers.serializers import (
+    MEDIA_TYPES,
+    iter_ndjson
+)
 from student.helpers.exceptions import (
+    BatchError,
     CreationError,
-    InvalidPhoneNumberError
+    InvalidCursorError,
+    InvalidFieldsError,
+    InvalidImportFileError,
+    InvalidPhoneNumberError,
+    ShardedImportError,
+    VersionConflictError
 )
 from kernel.settings.logging import coreLogger
 
 router = APIRouter()
-service_layer = StudentService()
+service_layer = AsyncStudentService()
 
 
 @router.post("/", response_model=StudentResponseSchema, status_code=status.HTTP_201_CREATED)
-async def create_student(student: StudentResponseSchema):
+async def create_student(student: StudentResponseSchema, response: Response):
     """
     Creates a new student in the database.
 
+    The ETag of the new student is sent along, so it can be used in
+    `If-Match` right away.
+
     Parameters
     ----------
     student : StudentResponseSchema
         The student data to create.
+    response : Response
+        The response, used to set the ETag header.
 
     Returns
     -------
@@ -45,15 +90,15 @@ async def create_student(student: StudentResponseSchema):
         If there is an error creating the student.
     """
     try:
-        new_student = service_layer.create(**student.dict())
+        new_student = await service_layer.create(**student.dict())
     except ValidationError as e:
-        coreLogger.error(f"ValidationError: {e}")
+        coreLogger.error("ValidationError: %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect data was provided"
         )
     except InvalidPhoneNumberError as e:
-        coreLogger.error(f"{e}, phone number: {student.phone_number}")
+        coreLogger.error("%s, phone number: %s", e, student.phone_number)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
@@ -68,42 +113,375 @@ async def create_student(student: StudentResponseSchema):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Error creating student"
         )
+    response.headers['ETag'] = make_etag(new_student.version)
     return new_student
 
 
-@router.get("/", response_model=List[StudentResponseSchema])
-async def read_students():
+@router.post("/bulk", response_model=BulkCreateResponseSchema, response_class=ORJSONResponse)
+async def create_students_bulk(request: Request):
+    """
+    Creates many students in one request.
+
+    The body is either a JSON array of students or, with the
+    `application/x-ndjson` content type, one student per line streamed
+    from the client. Rows are validated and inserted in chunks with a
+    single multi-row INSERT each; invalid and duplicate rows are reported
+    without aborting the batch.
+
+    Parameters
+    ----------
+    request : Request
+        The incoming request carrying the students.
+
+    Returns
+    -------
+    BulkCreateResponseSchema
+        The number of created and failed rows, and one result per row.
+
+    Raises
+    ------
+    HTTPException
+        If a JSON body is not an array.
+    """
+    if request.headers.get('content-type', '').startswith(MEDIA_TYPES['ndjson']):
+        items = iter_ndjson(request.stream())
+    else:
+        try:
+            items = orjson.loads(await request.body())
+        except orjson.JSONDecodeError:
+            items = None
+        if not isinstance(items, list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Expected a JSON array of students"
+            )
+    result = await service_layer.bulk_create(items)
+    return ORJSONResponse(result)
+
+
+@router.post("/batch", response_model=BatchResponseSchema, response_class=ORJSONResponse)
+async def run_batch(batch: BatchRequestSchema):
+    """
+    Runs an ordered list of create, update and delete operations in one
+    transaction.
+
+    Consecutive operations of the same kind are sent to the database as a
+    single statement. Without `atomic`, failed operations are reported and
+    the rest is committed; with `atomic`, any failure rolls back the batch.
+
+    Parameters
+    ----------
+    batch : BatchRequestSchema
+        The operations and whether the batch is all-or-nothing.
+
+    Returns
+    -------
+    BatchResponseSchema
+        Whether the batch was committed, and one result per operation.
+
+    Raises
+    ------
+    HTTPException
+        If the transaction fails for a reason other than an operation.
+    """
+    try:
+        result = await service_layer.batch(batch.operations, batch.atomic)
+    except BatchError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    return ORJSONResponse(result)
+
+
+@router.post("/import", response_model=ImportResponseSchema)
+async def import_students_csv(file: UploadFile):
     """
-    Retrieves all students from the database.
+    Imports students from an uploaded CSV file.
+
+    The file is loaded with `COPY FROM STDIN`, validated and normalized in a
+    staging table and merged into the students table in one statement.
+    Rejected rows are written to a file together with their reason.
+
+    Parameters
+    ----------
+    file : UploadFile
+        The CSV file, with a header row naming the columns.
 
     Returns
     -------
-    List[StudentResponseSchema]
-        A list of student data.
+    ImportResponseSchema
+        The number of rows read, imported and rejected, and the path of the
+        rejects file.
 
     Raises
     ------
     HTTPException
-        If there are no students found.
+        If the header row of the file is not valid, or if students are
+        sharded.
     """
-    students = service_layer.get_all()
+    try:
+        return await service_layer.import_csv(file.file)
+    except InvalidImportFileError as e:
+        coreLogger.error("%s, file: %s", e, file.filename)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except ShardedImportError as e:
+        coreLogger.error("%s, file: %s", e, file.filename)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+
+
+@router.get("/", response_model=StudentPageSchema)
+async def read_students(
+    limit: int = Query(50, ge=1, le=500),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    sort: StudentSortOptions = StudentSortOptions.ID,
+    filters: StudentFilterSchema = Depends()
+):
+    """
+    Retrieves one page of filtered students from the database.
+
+    Pages are ordered by `sort`, id by default, and fetched with keyset
+    pagination, so every page costs the same regardless of how deep it is.
+    Filters and sort are compiled into the query and served by indexes.
+
+    The students come from the DAL's read fast path as `StudentRecord`s
+    already shaped like `StudentResponseSchema`, so they are encoded with
+    orjson directly and the response model is not validated again.
+
+    With `fields` only the named columns are selected and returned, `id`
+    always among them.
+
+    Parameters
+    ----------
+    limit : int
+        The maximum number of students to return.
+    after : str, optional
+        The `next_cursor` of the previous page.
+    fields : str, optional
+        A comma separated sparse fieldset, e.g. `first_name,last_name`.
+    sort : StudentSortOptions
+        The column to sort by, prefixed with `-` for descending order.
+    filters : StudentFilterSchema
+        The filters, passed as query parameters.
+
+    Returns
+    -------
+    StudentPageSchema
+        A page of student data and the cursor of the next page.
+
+    Raises
+    ------
+    HTTPException
+        If the cursor or the fieldset is invalid or there are no students
+        found.
+    """
+    try:
+        students, next_cursor = await service_layer.get_page(
+            limit, after, fields, filters.dict(exclude_none=True), sort
+        )
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     if not students:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No students found"
         )
-    return [student[0] for student in students]
+    return ORJSONResponse({
+        'items': students,
+        'next_cursor': next_cursor,
+    })
+
+
+@router.get("/export")
+async def export_students(
+    format: ExportFormat = ExportFormat.NDJSON,
+    fields: Optional[str] = None
+):
+    """
+    Streams every student in the database as NDJSON or CSV.
+
+    Rows are read from a server-side cursor and written to the response as
+    they arrive, so worker memory stays flat at any table size.
+
+    Parameters
+    ----------
+    format : ExportFormat
+        The output format, either `ndjson` or `csv`.
+    fields : str, optional
+        A comma separated sparse fieldset, all columns by default.
+
+    Returns
+    -------
+    StreamingResponse
+        The encoded students, served as an attachment.
+
+    Raises
+    ------
+    HTTPException
+        If the fieldset is invalid.
+    """
+    try:
+        chunks = service_layer.export(format, fields)
+    except InvalidFieldsError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format],
+        headers={
+            'Content-Disposition': f'attachment; filename="students.{format}"'
+        }
+    )
+
+
+@router.get("/stats", response_model=StudentStatsSchema)
+async def read_student_stats():
+    """
+    Retrieves the student counts by education, gender and enrollment month.
+
+    The counts are read from a summary table kept current on every write,
+    so this answers in constant time however many students there are.
+
+    Returns
+    -------
+    StudentStatsSchema
+        The total and the counts by education, by gender and per month.
+    """
+    return await service_layer.get_stats()
+
+
+@router.get("/search", response_model=StudentSearchSchema)
+async def search_students(
+    q: str = Query(..., min_length=3, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    threshold: float = Query(0.5, ge=0.3, le=1.0),
+    address: bool = False,
+    fields: Optional[str] = None
+):
+    """
+    Finds students by partial or misspelled name, best match first.
+
+    Matches are ranked by trigram word similarity and served by a GIN
+    index. Queries shorter than three characters and thresholds under 0.3
+    match too large a share of the table to stay fast, so they are rejected.
+
+    Parameters
+    ----------
+    q : str
+        The search text, e.g. part of a first or last name.
+    limit : int
+        The maximum number of students to return.
+    threshold : float
+        The minimum similarity of a match, between 0 and 1.
+    address : bool
+        Whether to search the address as well as the name.
+    fields : str, optional
+        A comma separated sparse fieldset, e.g. `first_name,last_name`.
+
+    Returns
+    -------
+    StudentSearchSchema
+        The matching students, each with its score.
+
+    Raises
+    ------
+    HTTPException
+        If the fieldset is invalid.
+    """
+    try:
+        students = await service_layer.search(q, limit, threshold, fields, address)
+    except InvalidFieldsError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return ORJSONResponse({'items': students})
+
+
+@router.get("/by-phone/{phone_number}", response_model=StudentResponseSchema)
+async def read_student_by_phone(phone_number: str, fields: Optional[str] = None):
+    """
+    Retrieves a student from the database by their phone number.
+
+    Any accepted format works, `+98…`, `0…` or a bare `9…`, spaces and
+    dashes included; it is normalized to the stored canonical form and
+    looked up on the unique phone number index. The response carries the
+    student's version as a strong ETag.
+
+    Parameters
+    ----------
+    phone_number : str
+        The phone number of the student to retrieve.
+    fields : str, optional
+        A comma separated sparse fieldset, e.g. `first_name,last_name`.
+
+    Returns
+    -------
+    StudentResponseSchema
+        The student data.
+
+    Raises
+    ------
+    HTTPException
+        If the phone number or the fieldset is invalid, or no student has
+        the phone number.
+    """
+    try:
+        student = await service_layer.get_by_phone(phone_number, fields)
+    except (InvalidPhoneNumberError, InvalidFieldsError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if student is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Student not found"
+        )
+    record, version = student
+    return ORJSONResponse(record, headers={'ETag': make_etag(version)})
 
 
 @router.get("/{student_id}", response_model=StudentResponseSchema)
-async def read_student(student_id: int):
+async def read_student(
+    student_id: int,
+    response: Response,
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None)
+):
     """
     Retrieves a student from the database by their id.
 
+    The response carries the student's version as a strong ETag. When
+    `If-None-Match` holds the current one, only the version is looked up
+    and `304 Not Modified` is returned without loading or serializing the
+    student.
+
+    With `fields` only the named columns are selected and returned, `id`
+    always among them.
+
     Parameters
     ----------
     student_id : int
         The id of the student to retrieve.
+    response : Response
+        The response, used to set the ETag header.
+    fields : str, optional
+        A comma separated sparse fieldset, e.g. `first_name,last_name`.
+    if_none_match : str, optional
+        The `If-None-Match` header.
 
     Returns
     -------
@@ -113,28 +491,64 @@ async def read_student(student_id: int):
     Raises
     ------
     HTTPException
-        If the student is not found.
+        If the fieldset is invalid or the student is not found.
     """
-    student = service_layer.get_one(student_id)
+    if if_none_match is not None:
+        version = await service_layer.get_version(student_id)
+        if version is not None and etag_matches(if_none_match, make_etag(version)):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={'ETag': make_etag(version)}
+            )
+    if fields is not None:
+        try:
+            student = await service_layer.get_record(student_id, fields)
+        except InvalidFieldsError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        if student is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Student not found"
+            )
+        record, version = student
+        return ORJSONResponse(record, headers={'ETag': make_etag(version)})
+    student = await service_layer.get_one(student_id)
     if student is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Student not found"
         )
+    response.headers['ETag'] = make_etag(student[0].version)
     return student[0]
 
 
 @router.put("/{student_id}", response_model=UpdateResponseSchema)
-async def update_student(student_id: int, student: StudentUpdateSchema):
+async def update_student(
+    student_id: int,
+    student: StudentUpdateSchema,
+    response: Response,
+    if_match: Optional[str] = Header(None)
+):
     """
     Updates a student in the database by their id.
 
+    With `If-Match` the update only applies to the versions it names and
+    fails with `412 Precondition Failed` otherwise, or if the student does
+    not exist. The new ETag is sent back on success.
+
     Parameters
     ----------
     student_id : int
         The id of the student to update.
-    student : StudentResponseSchema
+    student : StudentUpdateSchema
         The updated student data.
+    response : Response
+        The response, used to set the ETag header.
+    if_match : str, optional
+        The `If-Match` header.
 
     Returns
     -------
@@ -144,39 +558,51 @@ async def update_student(student_id: int, student: StudentUpdateSchema):
     Raises
     ------
     HTTPException
-        If the student is not found.
+        If the student is not found or was modified since the given version.
     """
+    expected_versions = if_match_versions(if_match) if if_match is not None else None
     try:
-        updated_student = service_layer.update(student_id, **student.dict())
+        updated_student = await service_layer.update(
+            student_id, expected_versions, **student.dict()
+        )
+    except VersionConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=str(e)
+        )
     except ValidationError as e:
-        coreLogger.error(f"ValidationError: {e}")
+        coreLogger.error("ValidationError: %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect data was provided"
         )
     except InvalidPhoneNumberError as e:
-        coreLogger.error(f"{e}, phone number: {student.phone_number}")
+        coreLogger.error("%s, phone number: %s", e, student.phone_number)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
-    if updated_student is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Student not found"
-        )
+    if updated_student['version'] is None:
+        raise _student_not_found(if_match)
+    response.headers['ETag'] = make_etag(updated_student['version'])
     return updated_student
 
 
 @router.delete("/{student_id}", response_model=DeleteResponseSchema)
-async def delete_student(student_id: int):
+async def delete_student(student_id: int, if_match: Optional[str] = Header(None)):
     """
     Deletes a student from the database by their id.
 
+    With `If-Match` the student is only deleted at the versions it names,
+    and `412 Precondition Failed` is returned otherwise, or if the student
+    does not exist.
+
     Parameters
     ----------
     student_id : int
         The id of the student to delete.
+    if_match : str, optional
+        The `If-Match` header.
 
     Returns
     -------
@@ -186,12 +612,32 @@ async def delete_student(student_id: int):
     Raises
     ------
     HTTPException
-        If the student is not found.
+        If the student is not found or was modified since the given version.
     """
-    deleted_student = service_layer.delete(student_id)
-    if deleted_student is None:
+    expected_versions = if_match_versions(if_match) if if_match is not None else None
+    try:
+        deleted_student = await service_layer.delete(student_id, expected_versions)
+    except VersionConflictError as e:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Student not found"
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=str(e)
         )
+    if deleted_student['result'] == 'False':
+        raise _student_not_found(if_match)
     return deleted_student
+
+
+def _student_not_found(if_match: Optional[str]) -> HTTPException:
+    """
+    Fails a write to a missing student: `If-Match` names a version to
+    write against, so a missing student fails it, even with `*`.
+    """
+    if if_match is not None:
+        return HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Student not found"
+        )
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Student not found"
+    )
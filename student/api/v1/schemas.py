@@ -1,45 +1,22 @@
-from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, conlist
 from datetime import date, datetime
 from student.helpers.enums import (
+    BatchOperation,
+    BatchOperationStatus,
+    BulkRowStatus,
     GenderOptions,
     GradeOptions
 )
+from student.repository.bll.types import (
+    BatchOperationSchema,
+    StudentBase
+)
 
-
-class StudentBase(BaseModel):
-    """
-    A Pydantic model representing the base attributes of a student.
-
-    This class defines a Pydantic model for the base attributes of a student.
-    It is used as a base class for other Pydantic models that include additional
-    attributes.
-
-    Config:
-        orm_mode (bool): A configuration option that allows this model to be
-        used in SQLAlchemy ORM mode.
-
-    Examples
-    --------
-    To create a new Pydantic model representing a student with additional
-    attributes, simply inherit from the `StudentBase` class and add the
-    additional attributes:
-
-    >>> from pydantic import BaseModel
-    >>> from datetime import date
-    >>> from student.helpers.enums import GenderOptions, GradeOptions
-    >>> class StudentResponseSchema(StudentBase):
-    ...     first_name: str
-    ...     last_name: str
-    ...     phone_number: str
-    ...     gender: GenderOptions
-    ...     birth_date: date
-    ...     education: GradeOptions
-    ...     enrollment_date: date
-    ...     graduation_date: date
-    ...     address: str
-    """
-    class Config:
-        orm_mode = True
+# upper bound on the operations of one batch request, so a single
+# transaction stays short enough not to hold row locks for long
+BATCH_MAX_OPERATIONS = 10000
 
 
 class StudentResponseSchema(StudentBase):
@@ -73,33 +50,190 @@ class StudentResponseSchema(StudentBase):
     address: str
 
 
-class StudentUpdateSchema(StudentBase):
+class StudentPageSchema(BaseModel):
     """
-    A Pydantic model representing the attributes of a student.
+    A Pydantic model representing one page of students.
 
-    This class defines a Pydantic model for the attributes of a student.
-    It includes attributes for the student's first and last name, phone
-    number, gender, birth date, education level, enrollment date, graduation
-    date, and address.
+    Attributes
+    ----------
+    items : List[StudentResponseSchema]
+        The students of this page, ordered by id.
+    next_cursor : str, optional
+        An opaque cursor to pass as `after` to fetch the next page, or None
+        if this is the last page.
 
     Examples
     --------
-    To create a new Pydantic model representing a student with the same
-    attributes as the `StudentResponseSchema`, simply inherit from the
-    `StudentResponseSchema` class:
+    >>> from student.schemas import StudentPageSchema
+    >>> page = StudentPageSchema(items=[], next_cursor=None)
+    """
+    items: List[StudentResponseSchema]
+    next_cursor: Optional[str]
 
-    >>> from student.schemas import StudentResponseSchema
-    >>> class StudentRequestSchema(StudentResponseSchema):
-    ...     pass
+
+class StudentSearchResultSchema(StudentResponseSchema):
     """
-    first_name: str
-    last_name: str
-    phone_number: str
-    gender: GenderOptions
-    birth_date: date
-    education: GradeOptions
-    graduation_date: date
-    address: str
+    A Pydantic model representing a student found by a fuzzy search.
+
+    Attributes
+    ----------
+    score : float
+        The trigram word similarity of the best matching field, between 0
+        and 1.
+    """
+    score: float
+
+
+class StudentSearchSchema(BaseModel):
+    """
+    A Pydantic model representing the results of a fuzzy search.
+
+    Attributes
+    ----------
+    items : List[StudentSearchResultSchema]
+        The matching students, best match first.
+    """
+    items: List[StudentSearchResultSchema]
+
+
+class StudentStatsSchema(BaseModel):
+    """
+    A Pydantic model representing the student statistics.
+
+    Students whose education, gender or enrollment date is missing are
+    counted under `unknown`.
+
+    Attributes
+    ----------
+    total : int
+        The number of students.
+    by_education : Dict[str, int]
+        The number of students per education level.
+    by_gender : Dict[str, int]
+        The number of students per gender.
+    enrollments_per_month : Dict[str, int]
+        The number of students per enrollment month, as `YYYY-MM`, in
+        chronological order.
+    """
+    total: int
+    by_education: Dict[str, int]
+    by_gender: Dict[str, int]
+    enrollments_per_month: Dict[str, int]
+
+
+class BulkRowResultSchema(BaseModel):
+    """
+    A Pydantic model representing the outcome of one row of a bulk request.
+
+    Attributes
+    ----------
+    index : int
+        The zero-based position of the row in the request body.
+    status : BulkRowStatus
+        Whether the row was created, invalid, a duplicate or failed.
+    id : int, optional
+        The id of the created student.
+    error : str, optional
+        Why the row was not created.
+    """
+    index: int
+    status: BulkRowStatus
+    id: Optional[int]
+    error: Optional[str]
+
+
+class BulkCreateResponseSchema(BaseModel):
+    """
+    A Pydantic model representing the result of a bulk create request.
+
+    Attributes
+    ----------
+    created : int
+        The number of students created.
+    failed : int
+        The number of rows that were not created.
+    results : List[BulkRowResultSchema]
+        One result per row, in request order.
+    """
+    created: int
+    failed: int
+    results: List[BulkRowResultSchema]
+
+
+class BatchRequestSchema(BaseModel):
+    """
+    A Pydantic model representing a batch request.
+
+    Attributes
+    ----------
+    operations : List[BatchOperationSchema]
+        The operations to run, in order, within one transaction.
+    atomic : bool
+        Whether any failed operation rolls back the whole batch.
+    """
+    operations: conlist(BatchOperationSchema, min_items=1, max_items=BATCH_MAX_OPERATIONS)
+    atomic: bool = False
+
+
+class BatchResultSchema(BaseModel):
+    """
+    A Pydantic model representing the outcome of one batch operation.
+
+    Attributes
+    ----------
+    index : int
+        The zero-based position of the operation in the request.
+    op : BatchOperation
+        The operation that was run.
+    status : BatchOperationStatus
+        Whether the operation was applied, and why not otherwise.
+    id : int, optional
+        The id of the student the operation applied to.
+    error : str, optional
+        Why the operation was not applied.
+    """
+    index: int
+    op: BatchOperation
+    status: BatchOperationStatus
+    id: Optional[int]
+    error: Optional[str]
+
+
+class BatchResponseSchema(BaseModel):
+    """
+    A Pydantic model representing the result of a batch request.
+
+    Attributes
+    ----------
+    committed : bool
+        Whether the transaction was committed.
+    results : List[BatchResultSchema]
+        One result per operation, in request order.
+    """
+    committed: bool
+    results: List[BatchResultSchema]
+
+
+class ImportResponseSchema(BaseModel):
+    """
+    A Pydantic model representing the result of a CSV import.
+
+    Attributes
+    ----------
+    total : int
+        The number of data rows in the file.
+    imported : int
+        The number of students created.
+    rejected : int
+        The number of rows that were not imported.
+    rejects_path : str, optional
+        The file listing every rejected row with its reason, or None if no
+        row was rejected.
+    """
+    total: int
+    imported: int
+    rejected: int
+    rejects_path: Optional[str]
 
 
 class UpdateResponseSchema(BaseModel):
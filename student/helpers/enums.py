@@ -62,14 +62,149 @@ class RegexPatternEnum(StrEnum):
     An enumeration class for regex patterns.
 
     This class represents different regex patterns as an enumeration.
-    It currently contains only one member, `IRAN_PHONE_NUMBER`, representing the regex pattern for
-    Iranian phone numbers.
 
     Attributes
     ----------
     IRAN_PHONE_NUMBER : str
-        The regex pattern for Iranian phone numbers. It matches a string that starts with '+98' or '0',
-        followed by exactly 9 digits.
+        The regex pattern for Iranian mobile numbers. It matches a string that starts with '+98',
+        '98', '0' or nothing, followed by '9' and exactly 9 digits, and captures the part from '9' on.
+    IRAN_CANONICAL_PHONE_NUMBER : str
+        The regex pattern of the form phone numbers are stored in, '09' followed by 9 digits.
     """
 
-    IRAN_PHONE_NUMBER = r'^(\+98|0)?9\d{9}$'
+    IRAN_PHONE_NUMBER = r'^(?:\+?98|0)?(9\d{9})$'
+    IRAN_CANONICAL_PHONE_NUMBER = r'^09\d{9}$'
+
+
+class ExportFormat(StrEnum):
+    """
+    An enumeration of the formats students can be exported in.
+
+    Attributes
+    ----------
+    NDJSON : str
+        Newline delimited JSON, one student object per line.
+    CSV : str
+        Comma separated values with a header row.
+    """
+
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class StudentSortOptions(StrEnum):
+    """
+    An enumeration of the orders the student list can be sorted in.
+
+    Every option is backed by an index on the column followed by `id`, which
+    breaks ties so pages can be walked with a keyset cursor. A leading `-`
+    sorts in descending order; students without a value come last either way.
+
+    Attributes
+    ----------
+    ID : str
+        By id, the default.
+    LAST_NAME : str
+        By last name, in code point order.
+    ENROLLMENT_DATE : str
+        By enrollment date.
+    GRADUATION_DATE : str
+        By graduation date.
+    BIRTH_DATE : str
+        By birth date.
+    """
+
+    ID = "id"
+    ID_DESC = "-id"
+    LAST_NAME = "last_name"
+    LAST_NAME_DESC = "-last_name"
+    ENROLLMENT_DATE = "enrollment_date"
+    ENROLLMENT_DATE_DESC = "-enrollment_date"
+    GRADUATION_DATE = "graduation_date"
+    GRADUATION_DATE_DESC = "-graduation_date"
+    BIRTH_DATE = "birth_date"
+    BIRTH_DATE_DESC = "-birth_date"
+
+
+class BulkRowStatus(StrEnum):
+    """
+    An enumeration of the outcomes of a single row in a bulk operation.
+
+    Attributes
+    ----------
+    CREATED : str
+        The row was inserted.
+    INVALID : str
+        The row failed validation and was not sent to the database.
+    DUPLICATE : str
+        The row conflicts with an existing student or an earlier row of the
+        same request.
+    FAILED : str
+        The database rejected the chunk the row belonged to.
+    """
+
+    CREATED = "created"
+    INVALID = "invalid"
+    DUPLICATE = "duplicate"
+    FAILED = "failed"
+
+
+class BatchOperation(StrEnum):
+    """
+    An enumeration of the operations a batch request can carry.
+
+    Attributes
+    ----------
+    CREATE : str
+        Creates a new student from `data`.
+    UPDATE : str
+        Replaces the student with the given `id` by `data`.
+    DELETE : str
+        Deletes the student with the given `id`.
+    """
+
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+
+
+class BatchOperationStatus(StrEnum):
+    """
+    An enumeration of the outcomes of a single operation in a batch.
+
+    Attributes
+    ----------
+    OK : str
+        The operation was applied.
+    NOT_FOUND : str
+        No student has the id the operation refers to.
+    INVALID : str
+        The operation failed validation and was not sent to the database.
+    CONFLICT : str
+        The database rejected the operation, e.g. a duplicate phone number.
+    ABORTED : str
+        The operation was not applied because its atomic batch failed.
+    """
+
+    OK = "ok"
+    NOT_FOUND = "not_found"
+    INVALID = "invalid"
+    CONFLICT = "conflict"
+    ABORTED = "aborted"
+
+
+class ShardKey(StrEnum):
+    """
+    An enumeration of the columns students can be sharded by.
+
+    Attributes
+    ----------
+    ID : str
+        By id, so reads and writes by id go to a single shard.
+    PHONE_NUMBER : str
+        By canonical phone number, so phone numbers are unique across
+        shards and lookups by phone go to a single shard.
+    """
+
+    ID = "id"
+    PHONE_NUMBER = "phone_number"
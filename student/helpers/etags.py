@@ -0,0 +1,88 @@
+from typing import List, Optional, Set
+
+
+def make_etag(version: int) -> str:
+    """
+    Builds the strong entity tag of a student row version.
+
+    Parameters
+    ----------
+    version : int
+        The row version of the student.
+
+    Returns
+    -------
+    str
+        The quoted entity tag, e.g. `"3"`.
+    """
+    return f'"{version}"'
+
+
+def parse_etags(header: str) -> Optional[List[str]]:
+    """
+    Splits an `If-Match` or `If-None-Match` header into its entity tags.
+
+    Parameters
+    ----------
+    header : str
+        The raw header value.
+
+    Returns
+    -------
+    list or None
+        The entity tags as sent, weak ones keeping their `W/` prefix, or
+        None if the header is `*`.
+    """
+    header = header.strip()
+    if header == '*':
+        return None
+    return [tag.strip() for tag in header.split(',') if tag.strip()]
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """
+    Evaluates `If-None-Match` with the weak comparison RFC 9110 requires.
+
+    Parameters
+    ----------
+    header : str
+        The raw `If-None-Match` header value.
+    etag : str
+        The current strong entity tag.
+
+    Returns
+    -------
+    bool
+        True if the client already holds the current representation.
+    """
+    tags = parse_etags(header)
+    if tags is None:
+        return True
+    return any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+def if_match_versions(header: str) -> Optional[Set[int]]:
+    """
+    Extracts the row versions an `If-Match` header allows a write against.
+
+    `If-Match` uses the strong comparison, so weak tags never match and
+    tags that are not versions of this API are ignored.
+
+    Parameters
+    ----------
+    header : str
+        The raw `If-Match` header value.
+
+    Returns
+    -------
+    set or None
+        The accepted versions, possibly empty, or None if the header is `*`.
+    """
+    tags = parse_etags(header)
+    if tags is None:
+        return None
+    versions = set()
+    for tag in tags:
+        if len(tag) > 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdigit():
+            versions.add(int(tag[1:-1]))
+    return versions
@@ -24,3 +24,42 @@ class InvalidPhoneNumberError(ValueError):
     def __init__(self):
         self.message = "Invalid phone number"
         super().__init__(self.message)
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+    def __init__(self):
+        self.message = "Invalid pagination cursor"
+        super().__init__(self.message)
+
+class InvalidImportFileError(ValueError):
+    """Raised when a CSV import file cannot be loaded"""
+
+    def __init__(self, reason: str):
+        self.message = f"Invalid import file: {reason}"
+        super().__init__(self.message)
+
+class ShardedImportError(Exception):
+    """Raised when a CSV import is requested while students are sharded"""
+
+    def __init__(self):
+        self.message = "CSV imports are not supported while students are sharded over SHARD_URLS"
+        super().__init__(self.message)
+
+class BatchError(DataAccessError):
+    """Exception for errors that occur when running a batch of operations in the database."""
+    pass
+
+class VersionConflictError(Exception):
+    """Raised when a conditional write does not match the current row version"""
+
+    def __init__(self):
+        self.message = "Student was modified by another request"
+        super().__init__(self.message)
+
+class InvalidFieldsError(ValueError):
+    """Raised when a sparse fieldset names fields a student does not have"""
+
+    def __init__(self, fields: list):
+        self.message = f"Unknown fields: {', '.join(fields)}"
+        super().__init__(self.message)
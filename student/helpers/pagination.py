@@ -0,0 +1,65 @@
+import base64
+import binascii
+import json
+from typing import Any, List
+
+from student.helpers.exceptions import InvalidCursorError
+
+
+def encode_cursor(sort: str, values: List[Any]) -> str:
+    """
+    Encodes the keyset position of the last row of a page into an opaque cursor.
+
+    Parameters
+    ----------
+    sort : str
+        The sort key the page was ordered by.
+    values : list
+        The sort key values of the last row, ending with its primary key.
+
+    Returns
+    -------
+    str
+        A URL-safe cursor to pass back as `after` to fetch the next page.
+
+    Examples
+    --------
+    >>> cursor = encode_cursor('id', [42])
+    >>> decode_cursor(cursor, 'id')
+    [42]
+    """
+    payload = json.dumps({'s': sort, 'v': values}, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, sort: str) -> List[Any]:
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    Parameters
+    ----------
+    cursor : str
+        The opaque cursor received from the client.
+    sort : str
+        The sort key of the current request; a cursor issued for a different
+        ordering is rejected.
+
+    Returns
+    -------
+    list
+        The sort key values of the last row of the previous page.
+
+    Raises
+    ------
+    InvalidCursorError
+        If the cursor is malformed or was issued for another sort key.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload['v']
+        if payload['s'] != sort or not isinstance(values, list) or not values:
+            raise InvalidCursorError
+        return values
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursorError
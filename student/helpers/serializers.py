@@ -0,0 +1,88 @@
+import csv
+import io
+from enum import Enum
+from typing import Any, AsyncIterator, Iterable, Sequence
+
+import orjson
+
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def to_ndjson(rows: Iterable[Any]) -> bytes:
+    """
+    Encodes a batch of rows as newline delimited JSON.
+
+    Parameters
+    ----------
+    rows : iterable
+        Named rows, such as SQLAlchemy `Row` objects.
+
+    Returns
+    -------
+    bytes
+        One JSON object per row, each terminated by a newline.
+    """
+    return b''.join(
+        orjson.dumps(row._asdict(), option=orjson.OPT_APPEND_NEWLINE)
+        for row in rows
+    )
+
+
+def to_csv(rows: Iterable[Sequence[Any]], header: Sequence[str] = None) -> bytes:
+    """
+    Encodes a batch of rows as CSV.
+
+    Enum members are written by value, so the output matches the JSON API.
+
+    Parameters
+    ----------
+    rows : iterable
+        Rows as sequences of column values.
+    header : sequence of str, optional
+        Column names to write before the rows.
+
+    Returns
+    -------
+    bytes
+        The UTF-8 encoded CSV lines.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header is not None:
+        writer.writerow(header)
+    writer.writerows(
+        [value.value if isinstance(value, Enum) else value for value in row]
+        for row in rows
+    )
+    return buffer.getvalue().encode()
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Splits a streamed NDJSON body into lines as the chunks arrive.
+
+    Lines are not decoded here, so a malformed line can be reported against
+    its own position instead of failing the whole body.
+
+    Parameters
+    ----------
+    chunks : async iterator of bytes
+        The raw request body, as received from the client.
+
+    Yields
+    ------
+    bytes
+        Every non-blank line of the body, without the line terminator.
+    """
+    pending = b''
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
@@ -0,0 +1,44 @@
+import re
+
+from student.helpers.enums import RegexPatternEnum
+from student.helpers.exceptions import InvalidPhoneNumberError
+
+# compiled once; ASCII so `\d` does not accept other scripts' digits
+PHONE_NUMBER = re.compile(RegexPatternEnum.IRAN_PHONE_NUMBER, re.ASCII)
+PHONE_NUMBER_SEPARATORS = str.maketrans('', '', ' ()-')
+
+
+def normalize_phone_number(value: str) -> str:
+    """
+    Validates an Iranian mobile number and returns its canonical form.
+
+    Spaces, dashes and parentheses are ignored, and the `+98…`, `98…`,
+    `0…` and bare `9…` forms are all accepted and stored as `09XXXXXXXXX`,
+    so one number is always one row of the unique phone number index.
+    Shared by the `Student` model and the request schemas, so rows inserted
+    without going through the ORM are held to the same rule.
+
+    Parameters
+    ----------
+    value : str
+        The phone number to normalize.
+
+    Returns
+    -------
+    str
+        The canonical phone number.
+
+    Raises
+    ------
+    InvalidPhoneNumberError
+        If the phone number is not valid.
+
+    Examples
+    --------
+    >>> normalize_phone_number('+98 912 345 6789')
+    '09123456789'
+    """
+    match = PHONE_NUMBER.match(value.translate(PHONE_NUMBER_SEPARATORS))
+    if match is None:
+        raise InvalidPhoneNumberError
+    return '0' + match.group(1)
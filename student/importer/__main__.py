@@ -0,0 +1,40 @@
+import argparse
+import json
+from pathlib import Path
+
+from kernel.settings.logging import configure_logging
+from student.helpers.exceptions import ShardedImportError
+from student.importer import import_students
+
+
+def main() -> None:
+    """
+    Imports students from a CSV file.
+
+    Examples
+    --------
+    $ python -m student.importer students.csv --rejects rejects.csv
+    """
+    configure_logging()
+    parser = argparse.ArgumentParser(
+        prog='python -m student.importer',
+        description='Import students from a CSV file with COPY.'
+    )
+    parser.add_argument('path', type=Path, help='the CSV file, with a header row')
+    parser.add_argument(
+        '--rejects',
+        type=Path,
+        default=None,
+        help='where to write rejected rows (default: a file in REJECTS_DIR)'
+    )
+    args = parser.parse_args()
+    with open(args.path, 'rb') as source:
+        try:
+            result = import_students(source, rejects_path=args.rejects)
+        except ShardedImportError as e:
+            raise SystemExit(e.message)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,381 @@
+import csv
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Callable, List, Optional
+
+from psycopg import errors, sql
+from sqlalchemy import (
+    DateTime,
+    Enum,
+    String
+)
+
+from database import db
+from database.partitions import SKIP_CONFLICTS
+from kernel.settings import (
+    importer as importer_settings,
+    sharding as sharding_settings
+)
+from kernel.settings.logging import coreLogger
+from student.helpers.enums import RegexPatternEnum
+from student.helpers.exceptions import InvalidImportFileError, ShardedImportError
+from student.models import Student, StudentKey
+
+TABLE = Student.__table__
+# every model column may appear in the file; `id` and `version` are accepted
+# but ignored, new students always get their id from the sequence and start
+# at the first version
+FILE_COLUMNS: List[str] = [column.name for column in TABLE.columns]
+SERVER_COLUMNS = {'id', 'version'}
+INSERT_COLUMNS: List[str] = [name for name in FILE_COLUMNS if name not in SERVER_COLUMNS]
+OPTIONAL_COLUMNS = SERVER_COLUMNS | {'enrollment_date'}
+
+# `pg_input_is_valid` checks a cast without raising; older servers fall back
+# to a function trapping the cast error, which costs a subtransaction per call
+PG_INPUT_IS_VALID_VERSION = 160000
+CREATE_IS_TIMESTAMP = """
+CREATE OR REPLACE FUNCTION pg_temp.is_timestamp(value text)
+RETURNS boolean LANGUAGE plpgsql IMMUTABLE AS $$
+BEGIN
+    PERFORM value::timestamp;
+    RETURN true;
+EXCEPTION WHEN others THEN
+    RETURN false;
+END $$
+"""
+
+
+def _is_timestamp(server_version: int) -> Callable[[sql.Composable], sql.Composable]:
+    """Returns the builder of the timestamp validity check for the server."""
+    if server_version >= PG_INPUT_IS_VALID_VERSION:
+        return lambda value: sql.SQL("pg_input_is_valid({}, 'timestamp')").format(value)
+    return lambda value: sql.SQL('pg_temp.is_timestamp({})').format(value)
+
+
+def _normalized(name: str) -> sql.Composable:
+    """Returns the expression normalizing a staged text column."""
+    column = TABLE.c[name]
+    value = sql.SQL("nullif(btrim({}), '')").format(sql.Identifier(name))
+    if name == 'phone_number':
+        # the canonical form of `normalize_phone_number`, NULL if invalid
+        return sql.SQL("'0' || substring(translate({}, ' ()-', '') FROM {})").format(
+            value, sql.Literal(str(RegexPatternEnum.IRAN_PHONE_NUMBER))
+        )
+    if isinstance(column.type, Enum):
+        # accept member names and values in any case, store the name
+        enum = column.type.enum_class
+        cases = sql.SQL(' ').join(
+            sql.SQL('WHEN {} THEN {}').format(
+                sql.Literal(str(member.value).upper()),
+                sql.Literal(member.name)
+            )
+            for member in enum
+        )
+        return sql.SQL('CASE upper({}) {} ELSE upper({}) END').format(
+            value, cases, value
+        )
+    return value
+
+
+def _invalid(name: str, is_timestamp: Callable) -> sql.Composable:
+    """Returns the condition under which a normalized column is rejected."""
+    column = TABLE.c[name]
+    identifier = sql.Identifier(name)
+    checks = []
+    if isinstance(column.type, Enum):
+        checks.append(sql.SQL('{} <> ALL({})').format(
+            identifier, sql.Literal(list(column.type.enums))
+        ))
+    elif isinstance(column.type, DateTime):
+        checks.append(sql.SQL('NOT {}').format(is_timestamp(identifier)))
+    elif isinstance(column.type, String) and column.type.length:
+        checks.append(sql.SQL('char_length({}) > {}').format(
+            identifier, sql.Literal(column.type.length)
+        ))
+    condition = sql.SQL(' OR ').join(checks)
+    if name in OPTIONAL_COLUMNS:
+        return sql.SQL('{} IS NOT NULL AND ({})').format(identifier, condition)
+    return sql.SQL('{} IS NULL OR {}').format(identifier, condition)
+
+
+def _typed(name: str) -> sql.Composable:
+    """Returns the expression casting a validated column to its table type."""
+    column = TABLE.c[name]
+    identifier = sql.Identifier(name)
+    if isinstance(column.type, Enum):
+        return sql.SQL('{}::{}').format(identifier, sql.Identifier(column.type.name))
+    if isinstance(column.type, DateTime):
+        expression = sql.SQL('{}::timestamp').format(identifier)
+        if name in OPTIONAL_COLUMNS:
+            expression = sql.SQL('coalesce({}, localtimestamp)').format(expression)
+        return expression
+    return identifier
+
+
+class CopyImport:
+    """
+    The statements of a single CSV import.
+
+    Rows are staged in two UNLOGGED tables private to the import: temporary
+    tables would live in the small per-session `temp_buffers` and spill to
+    disk on large files. Both tables are created and dropped inside the
+    import transaction, so a failed import leaves nothing behind.
+
+    Attributes
+    ----------
+    staging : sql.Identifier
+        The table the file is copied into, one text column per file column.
+    checked : sql.Identifier
+        The normalized rows, each with its reject reason or NULL.
+    """
+
+    def __init__(self, server_version: int) -> None:
+        suffix = uuid.uuid4().hex[:16]
+        self.staging = sql.Identifier(f'student_import_{suffix}')
+        self.checked = sql.Identifier(f'student_import_{suffix}_checked')
+        self.is_timestamp = _is_timestamp(server_version)
+
+    def create_staging(self) -> sql.Composable:
+        return sql.SQL(
+            "CREATE UNLOGGED TABLE {} "
+            "(record bigint GENERATED ALWAYS AS IDENTITY, {})"
+        ).format(self.staging, sql.SQL(', ').join(
+            sql.SQL('{} text').format(sql.Identifier(name)) for name in FILE_COLUMNS
+        ))
+
+    def copy(self, header: List[str]) -> sql.Composable:
+        return sql.SQL(
+            "COPY {} ({}) FROM STDIN WITH (FORMAT csv, ENCODING 'UTF8')"
+        ).format(self.staging, sql.SQL(', ').join(map(sql.Identifier, header)))
+
+    def create_checked(self) -> sql.Composable:
+        """
+        Normalizes and validates every staged row in one pass.
+
+        The normalization is materialized so each expression is computed once
+        however many checks read it. Among the valid rows only the first
+        occurrence of a phone number is kept, and rows matching an existing
+        student in `student_keys` are rejected up front.
+        """
+        return sql.SQL("""
+            CREATE UNLOGGED TABLE {checked} AS
+            WITH normalized AS MATERIALIZED (
+                SELECT record, {normalized} FROM {staging}
+            ), validated AS MATERIALIZED (
+                SELECT normalized.*, CASE {checks} END AS invalid
+                FROM normalized
+            )
+            SELECT validated.*,
+                   CASE
+                       WHEN validated.invalid IS NOT NULL THEN validated.invalid
+                       WHEN row_number() OVER (
+                           PARTITION BY validated.invalid IS NULL, validated.phone_number
+                           ORDER BY validated.record
+                       ) > 1 THEN 'duplicate phone_number in file'
+                       WHEN existing.id IS NOT NULL THEN 'conflicts with an existing student'
+                   END AS reject_reason
+            FROM validated
+            LEFT JOIN {keys} AS existing
+                   ON existing.phone_number = validated.phone_number
+        """).format(
+            checked=self.checked,
+            staging=self.staging,
+            keys=sql.Identifier(StudentKey.__tablename__),
+            normalized=sql.SQL(', ').join(
+                sql.SQL('{} AS {}').format(_normalized(name), sql.Identifier(name))
+                for name in INSERT_COLUMNS
+            ),
+            checks=sql.SQL(' ').join(
+                sql.SQL('WHEN {} THEN {}').format(
+                    _invalid(name, self.is_timestamp), sql.Literal(f'invalid {name}')
+                )
+                for name in INSERT_COLUMNS
+            ),
+        )
+
+    def insert(self) -> sql.Composable:
+        """Merges the valid rows with a plain INSERT, the fast path."""
+        return sql.SQL("""
+            INSERT INTO {table} ({columns})
+            SELECT {typed} FROM {checked} WHERE reject_reason IS NULL
+        """).format(
+            table=sql.Identifier(TABLE.name),
+            columns=sql.SQL(', ').join(map(sql.Identifier, INSERT_COLUMNS)),
+            typed=sql.SQL(', ').join(map(_typed, INSERT_COLUMNS)),
+            checked=self.checked,
+        )
+
+    def merge(self) -> sql.Composable:
+        """
+        Merges the valid rows tolerating conflicts, and rejects the rows that
+        lost to a student inserted since they were checked.
+
+        The conflicts are found in `student_keys`, the transaction must run
+        `SKIP_CONFLICTS` first. Speculative insertion makes this about twice
+        as slow as `insert()`, so it only runs when the fast path hit a unique
+        violation.
+        """
+        return sql.SQL("""
+            WITH inserted AS (
+                INSERT INTO {table} ({columns})
+                SELECT {typed} FROM {checked} WHERE reject_reason IS NULL
+                ON CONFLICT DO NOTHING
+                RETURNING phone_number
+            )
+            UPDATE {checked} AS checked
+            SET reject_reason = 'conflicts with an existing student'
+            WHERE checked.reject_reason IS NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM inserted
+                  WHERE inserted.phone_number = checked.phone_number
+              )
+        """).format(
+            table=sql.Identifier(TABLE.name),
+            columns=sql.SQL(', ').join(map(sql.Identifier, INSERT_COLUMNS)),
+            typed=sql.SQL(', ').join(map(_typed, INSERT_COLUMNS)),
+            checked=self.checked,
+        )
+
+    def count(self) -> sql.Composable:
+        return sql.SQL(
+            "SELECT count(*), count(reject_reason) FROM {}"
+        ).format(self.checked)
+
+    def copy_rejects(self) -> sql.Composable:
+        return sql.SQL("""
+            COPY (
+                SELECT staged.record, checked.reject_reason, {columns}
+                FROM {staging} AS staged
+                JOIN {checked} AS checked USING (record)
+                WHERE checked.reject_reason IS NOT NULL
+                ORDER BY staged.record
+            ) TO STDOUT WITH (FORMAT csv, HEADER)
+        """).format(
+            staging=self.staging,
+            checked=self.checked,
+            columns=sql.SQL(', ').join(
+                sql.SQL('staged.{}').format(sql.Identifier(name)) for name in FILE_COLUMNS
+            ),
+        )
+
+    def drop(self) -> sql.Composable:
+        return sql.SQL("DROP TABLE {}, {}").format(self.checked, self.staging)
+
+
+def read_header(source: BinaryIO) -> List[str]:
+    """
+    Reads and checks the header row of a CSV import file.
+
+    Parameters
+    ----------
+    source : BinaryIO
+        The file, positioned at its first byte.
+
+    Returns
+    -------
+    list of str
+        The column names, in file order.
+
+    Raises
+    ------
+    InvalidImportFileError
+        If the header is empty, repeats a column, names an unknown column or
+        misses a required one.
+    """
+    line = source.readline().decode('utf-8-sig')
+    header = [name.strip() for name in next(csv.reader([line]), [])]
+    if not header:
+        raise InvalidImportFileError("missing header row")
+    unknown = sorted(set(header) - set(FILE_COLUMNS))
+    if unknown:
+        raise InvalidImportFileError(f"unknown columns {', '.join(unknown)}")
+    if len(set(header)) != len(header):
+        raise InvalidImportFileError("repeated columns")
+    missing = sorted(set(FILE_COLUMNS) - OPTIONAL_COLUMNS - set(header))
+    if missing:
+        raise InvalidImportFileError(f"missing columns {', '.join(missing)}")
+    return header
+
+
+def import_students(source: BinaryIO, rejects_path: Optional[Path] = None) -> dict:
+    """
+    Imports students from a CSV file with `COPY FROM STDIN`.
+
+    The file is streamed untouched into a staging table, then normalized and
+    validated there with set-based SQL: phone numbers against
+    `RegexPatternEnum.IRAN_PHONE_NUMBER`, kept in their canonical form, gender
+    and education against the `GenderOptions` and `GradeOptions` members,
+    dates, lengths and required columns against the model. The valid rows are merged into `students` in
+    a single statement. Everything runs in one transaction.
+
+    Parameters
+    ----------
+    source : BinaryIO
+        The CSV file, with a header row naming the columns.
+    rejects_path : Path, optional
+        Where to write the rejected rows; defaults to a timestamped file in
+        `REJECTS_DIR`.
+
+    Returns
+    -------
+    dict
+        The number of rows read, imported and rejected, and the path of the
+        rejects file, or None if no row was rejected.
+
+    Raises
+    ------
+    InvalidImportFileError
+        If the header row is not valid.
+    ShardedImportError
+        If `SHARD_URLS` is set: the rows would all be loaded into the first
+        shard, whatever shard they belong to.
+    """
+    if sharding_settings.SHARD_URLS:
+        raise ShardedImportError()
+    header = read_header(source)
+    connection = db.engine.raw_connection()
+    try:
+        driver_connection = connection.driver_connection
+        job = CopyImport(driver_connection.info.server_version)
+        with driver_connection.transaction():
+            cursor = driver_connection.cursor()
+            cursor.execute("SELECT set_config('work_mem', %s, true)", (importer_settings.WORK_MEM,))
+            if driver_connection.info.server_version < PG_INPUT_IS_VALID_VERSION:
+                cursor.execute(CREATE_IS_TIMESTAMP)
+            cursor.execute(job.create_staging())
+            with cursor.copy(job.copy(header)) as copy:
+                while data := source.read(importer_settings.COPY_BUFFER_SIZE):
+                    copy.write(data)
+            cursor.execute(job.create_checked())
+            try:
+                with driver_connection.transaction():
+                    cursor.execute(job.insert())
+            except errors.UniqueViolation:
+                coreLogger.info("Import raced with concurrent writes, merging with ON CONFLICT")
+                cursor.execute(SKIP_CONFLICTS.text)
+                cursor.execute(job.merge())
+            total, rejected = cursor.execute(job.count()).fetchone()
+            if rejected:
+                if rejects_path is None:
+                    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+                    rejects_path = importer_settings.REJECTS_DIR / f"students-{stamp}-rejects.csv"
+                rejects_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(rejects_path, 'wb') as rejects_file:
+                    with cursor.copy(job.copy_rejects()) as copy:
+                        for data in copy:
+                            rejects_file.write(data)
+            else:
+                rejects_path = None
+            cursor.execute(job.drop())
+    finally:
+        connection.close()
+    coreLogger.info(
+        "Imported %s of %s students, %s rejected", total - rejected, total, rejected
+    )
+    return {
+        'total': total,
+        'imported': total - rejected,
+        'rejected': rejected,
+        'rejects_path': str(rejects_path) if rejects_path else None,
+    }
@@ -1 +1,6 @@
-from .student import Student
+from .student import (
+    Student,
+    full_name
+)
+from .stats import StudentStats
+from .keys import StudentKey
@@ -0,0 +1,59 @@
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    String
+)
+
+from database import db
+
+
+class StudentKey(db.Base):
+    """
+    A database model representing the unique keys of a student.
+
+    `students` is partitioned by enrollment date, and PostgreSQL only
+    enforces the uniqueness of keys including it, so the id and phone
+    number of every student are kept unique here instead. The table is
+    kept current by triggers on `students`, in the same transaction as
+    every write, see migration `c61f0b8d2a47`.
+
+    Attributes
+    ----------
+    id : int
+        The student's id.
+    phone_number : str
+        The student's canonical phone number.
+    enrollment_date : DateTime
+        The student's enrollment date, which locates the partition holding
+        them.
+    """
+    __tablename__ = "student_keys"
+    database = db
+
+    id = Column(
+        Integer,
+        primary_key=True,
+        autoincrement=False,
+    )
+
+    phone_number = Column(
+        String(15),
+        unique=True,
+    )
+
+    enrollment_date = Column(
+        DateTime,
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        """
+        Returns a string representation of the keys suitable for debugging.
+
+        Returns
+        -------
+        str
+            A string representation of the keys suitable for debugging.
+        """
+        return f"<student keys: {self.id}, {self.phone_number}, {self.enrollment_date}>"
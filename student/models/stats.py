@@ -0,0 +1,68 @@
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    String
+)
+
+from database import db
+
+
+class StudentStats(db.Base):
+    """
+    A database model representing one bucket of the student statistics.
+
+    The table holds a student count per combination of education, gender
+    and enrollment month, so dashboards read a few dozen rows instead of
+    aggregating the students table. It is kept current by statement-level
+    triggers on `students`, see migration `f2c8e5a71d36`, and can be rebuilt
+    from scratch with `AsyncStudentDataAccessLayer.rebuild_stats`.
+
+    Unknown values are stored as empty strings, so every bucket has a
+    non-null primary key to upsert on.
+
+    Attributes
+    ----------
+    education : str
+        The `GradeOptions` member name, or '' if unknown.
+    gender : str
+        The `GenderOptions` member name, or '' if unknown.
+    month : str
+        The enrollment month as `YYYY-MM`, or '' if unknown.
+    count : int
+        The number of students in the bucket.
+    """
+    __tablename__ = "student_stats"
+    database = db
+
+    education = Column(
+        String(20),
+        primary_key=True,
+    )
+
+    gender = Column(
+        String(10),
+        primary_key=True,
+    )
+
+    month = Column(
+        String(7),
+        primary_key=True,
+    )
+
+    count = Column(
+        BigInteger,
+        nullable=False,
+        default=0,
+    )
+
+    def __repr__(self) -> str:
+        """
+        Returns a string representation of the bucket suitable for debugging.
+
+        Returns
+        -------
+        str
+            A string representation of the bucket suitable for debugging.
+        """
+        return f"<student stats: {self.education}, {self.gender}, " \
+                f"{self.month}: {self.count}>"
@@ -1,4 +1,3 @@
-import re
 from datetime import datetime
 
 from sqlalchemy import (
@@ -7,9 +6,14 @@ from sqlalchemy import (
     DateTime,
     Integer,
     Enum,
-    CheckConstraint
+    CheckConstraint,
+    Index,
+    func,
+    literal_column,
+    text
 )
 from sqlalchemy.orm import validates
+from sqlalchemy.sql import ColumnElement
 
 from database import db
 from student.helpers.enums import (
@@ -17,16 +21,53 @@ from student.helpers.enums import (
     GradeOptions,
     RegexPatternEnum
 )
-from student.helpers.exceptions import InvalidPhoneNumberError
+from student.helpers.validators import normalize_phone_number
+
+
+def full_name(first_name, last_name) -> ColumnElement:
+    """
+    Builds the full name expression the trigram name index is built on.
+
+    Queries have to use the very same expression for the index to apply, so
+    the constants are inlined rather than bound.
+
+    Parameters
+    ----------
+    first_name : Column
+        The first name column.
+    last_name : Column
+        The last name column.
+
+    Returns
+    -------
+    ColumnElement
+        `coalesce(first_name, '') || ' ' || coalesce(last_name, '')`
+    """
+    empty = literal_column("''")
+    return (
+        func.coalesce(first_name, empty)
+        + literal_column("' '")
+        + func.coalesce(last_name, empty)
+    ).self_group()
+
 
 class Student(db.Base):
     """
     A database model representing a student.
 
+    The table is partitioned by range of enrollment date, see migration
+    `c61f0b8d2a47`. Its primary key must include the enrollment date, so
+    the id and phone number are kept unique through `StudentKey` rather
+    than by indexes of its own. Queries carrying the
+    enrollment date only read the partitions it may fall into; lookups by
+    id or phone number find it in `student_keys`, see
+    `student.repository.dal.filters.by_key`.
+
     Attributes
     ----------
     id : int
-        The primary key of the student, autoincremented.
+        The id of the student, autoincremented; with the enrollment date,
+        the primary key.
     first_name : str
         The first name of the student.
     last_name : str
@@ -40,16 +81,21 @@ class Student(db.Base):
     education : GradeOptions
         The education level of the student. It is an Enum with constraints and string validation.
     enrollment_date : DateTime
-        The date of enrollment of the student. It defaults to the current date and time.
+        The date of enrollment of the student, the partition key. It
+        defaults to the current date and time.
     graduation_date : DateTime
         The date of graduation of the student.
     address : str
         The address of the student.
+    version : int
+        The row version, starting at 1 and bumped by every update. It is
+        served as the student's ETag.
 
     Methods
     -------
     validate_phone_number(key, value)
-        Validates the phone number of the student.
+        Validates the phone number of the student and normalizes it to its
+        canonical form.
     """
     __tablename__ = "students"
     database = db
@@ -70,7 +116,6 @@ class Student(db.Base):
 
     phone_number = Column(
         String(15),
-        unique=True,
     )
 
     gender = Column(
@@ -95,7 +140,9 @@ class Student(db.Base):
 
     enrollment_date = Column(
         DateTime,
-        default=datetime.now()
+        primary_key=True,
+        nullable=False,
+        default=datetime.now
     )
 
     graduation_date = Column(
@@ -106,6 +153,42 @@ class Student(db.Base):
         String(255),
     )
 
+    version = Column(
+        Integer,
+        nullable=False,
+        default=1,
+        server_default=text('1'),
+    )
+
+    # every list filter and sort is served by one of these; `id` breaks ties
+    # so keyset cursors can seek into them
+    __table_args__ = (
+        Index('ix_students_last_name', last_name.collate('C'), id),
+        Index('ix_students_enrollment_date', enrollment_date, id),
+        Index('ix_students_graduation_date', graduation_date, id),
+        Index('ix_students_birth_date', birth_date, id),
+        Index('ix_students_education_id', education, id),
+        Index('ix_students_education_enrollment_date', education, enrollment_date, id),
+        # fuzzy search, see `AsyncStudentDataAccessLayer.search`
+        Index(
+            'ix_students_full_name_trgm',
+            full_name(first_name, last_name).label('full_name'),
+            postgresql_using='gin',
+            postgresql_ops={'full_name': 'gin_trgm_ops'},
+        ),
+        Index(
+            'ix_students_address_trgm',
+            address,
+            postgresql_using='gin',
+            postgresql_ops={'address': 'gin_trgm_ops'},
+        ),
+        # one number, one spelling: lookups by phone are exact index matches
+        CheckConstraint(
+            f"phone_number ~ '{RegexPatternEnum.IRAN_CANONICAL_PHONE_NUMBER}'",
+            name='ck_students_phone_number_canonical',
+        ),
+    )
+
     @validates('phone_number')
     def validate_phone_number(self, key, value: str) -> str:
         """
@@ -121,20 +204,14 @@ class Student(db.Base):
         Returns
         -------
         str
-            The validated phone number.
+            The canonical phone number.
 
         Raises
         ------
         InvalidPhoneNumberError
             If the phone number is not valid.
         """
-        if value.isdigit() and re.match(
-            RegexPatternEnum.IRAN_PHONE_NUMBER,
-            value
-        ):
-            return value
-        else:
-            raise InvalidPhoneNumberError
+        return normalize_phone_number(value)
 
     def __str__(self) -> str:
         """
@@ -0,0 +1 @@
+from .mover import rebalance
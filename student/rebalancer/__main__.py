@@ -0,0 +1,40 @@
+import argparse
+import json
+
+from kernel.settings import sharding as sharding_settings
+from kernel.settings.logging import configure_logging
+from student.rebalancer import rebalance
+
+
+def main() -> None:
+    """
+    Moves students to the shards they belong to after shards were added.
+
+    Examples
+    --------
+    $ python -m student.rebalancer --dry-run
+    """
+    configure_logging()
+    batch_size = sharding_settings.REBALANCE_BATCH_SIZE
+    parser = argparse.ArgumentParser(
+        prog='python -m student.rebalancer',
+        description='Move students to the shard their shard key places them on.'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=batch_size,
+        help=f'students scanned per transaction (default: {batch_size})'
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='only count the students that would be moved'
+    )
+    args = parser.parse_args()
+    result = rebalance(batch_size=args.batch_size, dry_run=args.dry_run)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy import create_engine, delete, insert, select
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from database.shards import place
+from kernel.settings import (
+    database as database_settings,
+    sharding as sharding_settings
+)
+from kernel.settings.logging import coreLogger
+from student.helpers.enums import ShardKey
+from student.models import Student
+
+TABLE = Student.__table__
+
+
+def _name(url: str) -> str:
+    """Returns the host, port and database of a URL, without credentials."""
+    parsed = make_url(url)
+    return f'{parsed.host}:{parsed.port or 5432}/{parsed.database}'
+
+
+def _insert(connection: Connection, rows: List[dict]) -> None:
+    """
+    Inserts rows as they are, replacing a copy left by an interrupted move.
+
+    `students` has no unique index on `id` to resolve a conflict with, the
+    copies are deleted first instead.
+    """
+    connection.execute(delete(TABLE).where(TABLE.c.id.in_([row['id'] for row in rows])))
+    connection.execute(insert(TABLE).values(rows))
+
+
+def _move(source: Engine, target: Engine, ids: List[int], key: ShardKey, index: int, shards: int) -> dict:
+    """
+    Moves students from one shard to another.
+
+    The students stay locked on the source until they were committed on
+    the target, so a concurrent write either lands before the copy or
+    waits and then finds them gone, and looks them up on the other shards.
+    A student whose key changed meanwhile is left where they now belong.
+    Students the target rejects, e.g. for a phone number taken there, are
+    left on the source and counted as conflicts.
+    """
+    moved: List[int] = []
+    conflicts = 0
+    with source.connect() as old, target.connect() as new:
+        locked = old.execute(
+            select(TABLE).where(TABLE.c.id.in_(ids)).order_by(TABLE.c.id).with_for_update()
+        ).mappings().all()
+        rows = [dict(row) for row in locked if place(row[key], shards) == index]
+        if rows:
+            try:
+                _insert(new, rows)
+                new.commit()
+                moved = [row['id'] for row in rows]
+            except IntegrityError:
+                new.rollback()
+                for row in rows:
+                    try:
+                        _insert(new, [row])
+                        new.commit()
+                        moved.append(row['id'])
+                    except IntegrityError as e:
+                        new.rollback()
+                        conflicts += 1
+                        coreLogger.warning(
+                            "Student with id %s could not be moved: %s", row['id'], e.orig
+                        )
+        if moved:
+            old.execute(delete(TABLE).where(TABLE.c.id.in_(moved)))
+        old.commit()
+    return {'moved': len(moved), 'conflicts': conflicts}
+
+
+def rebalance(
+    batch_size: Optional[int] = None,
+    dry_run: bool = False,
+    key: Optional[str] = None,
+    urls: Optional[List[str]] = None
+) -> dict:
+    """
+    Moves every student to the shard their shard key now places them on.
+
+    Run after appending shards to `SHARD_URLS`, while the API keeps
+    serving: every shard is scanned in id order, `batch_size` students at
+    a time, and the misplaced students of a batch are moved to each of
+    their shards in one transaction per shard. With the jump hash, only
+    the students placed on the new shards move. Running it again moves
+    nothing unless students were written in the wrong place meanwhile,
+    e.g. by a CSV import, which always loads into the first shard.
+
+    Parameters
+    ----------
+    batch_size : int, optional
+        The students scanned, and moved at most, per transaction,
+        `REBALANCE_BATCH_SIZE` by default.
+    dry_run : bool
+        Only count the students that would be moved.
+    key : str, optional
+        The `ShardKey` students are placed by, `SHARD_KEY` by default.
+    urls : list of str, optional
+        The URLs of the shards after the first, `SHARD_URLS` by default.
+
+    Returns
+    -------
+    dict
+        Per shard, the students scanned and moved out of it or, with
+        `dry_run`, found misplaced; and the totals, with the students that
+        could not be moved for a conflict on their new shard.
+    """
+    batch_size = sharding_settings.REBALANCE_BATCH_SIZE if batch_size is None else batch_size
+    key = ShardKey(sharding_settings.SHARD_KEY if key is None else key)
+    urls = sharding_settings.SHARD_URLS if urls is None else urls
+    engines = [db.engine, *(create_engine(url) for url in urls)]
+    names = [_name(url) for url in (database_settings.DB_URL, *urls)]
+    summary = {'shards': {}, 'scanned': 0, 'misplaced': 0, 'moved': 0, 'conflicts': 0}
+    try:
+        for index, engine in enumerate(engines):
+            shard = {'scanned': 0, 'misplaced': 0, 'moved': 0, 'conflicts': 0}
+            last = None
+            while True:
+                stmt = select(TABLE.c.id, TABLE.c[key]).order_by(TABLE.c.id).limit(batch_size)
+                if last is not None:
+                    stmt = stmt.where(TABLE.c.id > last)
+                with engine.connect() as connection:
+                    rows = connection.execute(stmt).all()
+                if not rows:
+                    break
+                last = rows[-1][0]
+                shard['scanned'] += len(rows)
+                targets: Dict[int, List[int]] = defaultdict(list)
+                for id, value in rows:
+                    target = place(value, len(engines))
+                    if target != index:
+                        targets[target].append(id)
+                for target, ids in targets.items():
+                    shard['misplaced'] += len(ids)
+                    if not dry_run:
+                        result = _move(engine, engines[target], ids, key, target, len(engines))
+                        shard['moved'] += result['moved']
+                        shard['conflicts'] += result['conflicts']
+            coreLogger.info(
+                "Rebalanced shard %s: %s scanned, %s misplaced, %s moved",
+                names[index], shard['scanned'], shard['misplaced'], shard['moved']
+            )
+            summary['shards'][names[index]] = shard
+            for total in ('scanned', 'misplaced', 'moved', 'conflicts'):
+                summary[total] += shard[total]
+    finally:
+        for engine in engines[1:]:
+            engine.dispose()
+    return summary
@@ -1 +1,4 @@
-from .service import StudentService
+from .service import (
+    StudentService,
+    AsyncStudentService
+)
@@ -0,0 +1,241 @@
+import asyncio
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+# marks a key missing from the cache, as opposed to a cached negative lookup
+MISSING = object()
+
+
+class CacheBackend(ABC):
+    """
+    The storage behind an `EntityCache`.
+
+    Methods are coroutines so that network backends (e.g. Redis or
+    memcached) can be plugged in without changing the service layer.
+    """
+
+    @abstractmethod
+    async def get(self, key: Hashable) -> Any:
+        """Returns the value stored for `key`, or `MISSING`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """Stores `value` for `key` for `ttl` seconds."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, key: Hashable) -> None:
+        """Removes `key`, if present."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Removes every key."""
+        raise NotImplementedError
+
+
+class LRUCacheBackend(CacheBackend):
+    """
+    An in-process cache backend with LRU and TTL eviction.
+
+    Expired entries are dropped when they are read; once `max_size` entries
+    are stored, the least recently used one is evicted.
+
+    Attributes
+    ----------
+    max_size : int
+        The maximum number of stored entries.
+
+    Examples
+    --------
+    >>> backend = LRUCacheBackend(max_size=2)
+    >>> await backend.set(1, 'a', ttl=60)
+    >>> await backend.get(1)
+    'a'
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+
+    async def get(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        expires_at, value = entry
+        if expires_at <= monotonic():
+            del self._entries[key]
+            return MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        self._entries[key] = (monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class EntityCache:
+    """
+    A read-through cache with negative caching and single-flight loading.
+
+    Lookups that find nothing are cached too, for `negative_ttl` seconds, so
+    repeated requests for a missing id stay off the database. Concurrent
+    misses for the same key share a single load: the first caller runs the
+    loader and the others await its result.
+
+    Attributes
+    ----------
+    backend : CacheBackend
+        Where entries are stored.
+    ttl : float
+        How long found entities are cached, in seconds.
+    negative_ttl : float
+        How long missing entities are cached, in seconds.
+    hits : int
+        Lookups answered from the cache, including negative entries.
+    misses : int
+        Lookups that had to run the loader.
+    coalesced : int
+        Misses that awaited a load already in flight instead of running the
+        loader themselves.
+
+    Examples
+    --------
+    >>> cache = EntityCache(LRUCacheBackend(1000), ttl=60, negative_ttl=5)
+    >>> student = await cache.get_or_load(42, dal.get_one)
+    >>> await cache.invalidate(42)
+    """
+
+    NEGATIVE = object()
+
+    def __init__(self, backend: CacheBackend, ttl: float, negative_ttl: float) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[Hashable], Awaitable[Optional[Any]]]
+    ) -> Optional[Any]:
+        """
+        Returns the cached value of `key`, loading it on a miss.
+
+        Parameters
+        ----------
+        key : Hashable
+            The cache key, passed on to the loader.
+        loader : callable
+            A coroutine function returning the value, or None if it does not
+            exist.
+
+        Returns
+        -------
+        Any
+            The value, or None if it does not exist.
+        """
+        value = await self.backend.get(key)
+        if value is not MISSING:
+            self.hits += 1
+            return None if value is self.NEGATIVE else value
+        self.misses += 1
+        flight = self._inflight.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(flight)
+        flight = asyncio.get_running_loop().create_future()
+        self._inflight[key] = flight
+        try:
+            value = await loader(key)
+        except BaseException as e:
+            flight.set_exception(e)
+            # the waiters re-raise it; nobody may be waiting on this one
+            flight.exception()
+            raise
+        else:
+            flight.set_result(value)
+            # a write invalidating the key while it was loading removes the
+            # flight, and the possibly stale value must not be stored then
+            if self._inflight.get(key) is flight:
+                if value is None:
+                    await self.backend.set(key, self.NEGATIVE, self.negative_ttl)
+                else:
+                    await self.backend.set(key, value, self.ttl)
+            return value
+        finally:
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+
+    async def peek(self, key: Hashable) -> Optional[Any]:
+        """
+        Returns the cached value of `key` without loading or counting it.
+
+        Parameters
+        ----------
+        key : Hashable
+            The cache key.
+
+        Returns
+        -------
+        Any
+            The value, None for a cached negative lookup, or `MISSING`.
+        """
+        value = await self.backend.get(key)
+        return None if value is self.NEGATIVE else value
+
+    async def invalidate(self, *keys: Hashable) -> None:
+        """
+        Removes keys after their entities were written.
+
+        Parameters
+        ----------
+        *keys : Hashable
+            The keys to remove.
+        """
+        for key in keys:
+            self._inflight.pop(key, None)
+            await self.backend.delete(key)
+
+    async def clear(self) -> None:
+        """Removes every key, e.g. after a bulk import."""
+        self._inflight.clear()
+        await self.backend.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns
+        -------
+        dict
+            The hit, miss and coalesced counts, the hit ratio and, for
+            in-process backends, the number of stored entries.
+        """
+        lookups = self.hits + self.misses
+        stats = {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
+        if hasattr(self.backend, '__len__'):
+            stats['size'] = len(self.backend)
+        return stats
@@ -1,6 +1,72 @@
-from typing import List, Optional
+import asyncio
+from collections import Counter
+from functools import cached_property
+from typing import (
+    Any,
+    BinaryIO,
+    AsyncIterable,
+    AsyncIterator,
+    Collection,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union
+)
+
+import orjson
+from pydantic import ValidationError
+
+from database.replicas import primary_reads
+from kernel.settings import (
+    cache as cache_settings,
+    sharding as sharding_settings
+)
 from student.models import Student
-from student.repository.dal import StudentDataAccessLayer
+from student.repository.bll.types import (
+    BatchOperationSchema,
+    StudentCreateSchema,
+    StudentUpdateSchema
+)
+from student.helpers.enums import (
+    BatchOperation,
+    BatchOperationStatus,
+    BulkRowStatus,
+    ExportFormat,
+    GenderOptions,
+    GradeOptions,
+    StudentSortOptions
+)
+from student.helpers.exceptions import CreationError
+from student.helpers.pagination import (
+    encode_cursor,
+    decode_cursor
+)
+from student.repository.bll.cache import (
+    MISSING,
+    EntityCache,
+    LRUCacheBackend
+)
+from student.helpers.validators import normalize_phone_number
+from student.helpers.serializers import (
+    to_ndjson,
+    to_csv
+)
+from student.repository.dal import (
+    StudentDataAccessLayer,
+    AsyncStudentDataAccessLayer,
+    ShardedStudentDataAccessLayer,
+    DEFAULT_FIELDS,
+    StudentRecord,
+    parse_fields,
+    batch_result,
+    abort_batch
+)
+
+# rows per multi-row INSERT; ten columns per row stays far below the
+# 65535 bind parameter limit of the PostgreSQL protocol
+BULK_CHUNK_SIZE = 1000
+
 
 class StudentService:
     """
@@ -101,3 +167,682 @@ class StudentService:
             True if the delete operation was successful, False otherwise
         """
         return self.dal.delete(id)
+
+
+class AsyncStudentService:
+    """
+    An asyncio service layer used to interact with the Student model in the
+    database.
+
+    Mirrors `StudentService`, but delegates to `AsyncStudentDataAccessLayer`
+    so every call has to be awaited and never blocks the event loop.
+
+    Single students are served through a read-through `EntityCache`; every
+    write path invalidates the ids it touched. With `SHARD_URLS` set, the
+    students are spread over shards by `ShardedStudentDataAccessLayer`.
+    Both are created on first use, so creating the service reads no
+    settings.
+
+    Attributes
+    ----------
+    dal : AsyncStudentDataAccessLayer or ShardedStudentDataAccessLayer
+        The data access layer.
+    cache : EntityCache
+        The cache of `get_one` lookups, keyed by id.
+
+    Methods
+    -------
+    get_all():
+        Retrieves all students from the database.
+    get_page(limit, after, fields=None, filters=None, sort=StudentSortOptions.ID):
+        Retrieves one page of students and the cursor of the next page.
+    search(q, limit, threshold, fields=None, include_address=False):
+        Finds the students whose name best matches a fuzzy query.
+    get_stats():
+        Retrieves the student counts by education, gender and month.
+    rebuild_stats():
+        Recomputes the student statistics from scratch.
+    export(format, fields=None):
+        Streams every student encoded in the given format.
+    get_one(id):
+        Retrieves a student from the database by their id.
+    get_record(id, fields):
+        Retrieves a sparse fieldset of a student by their id.
+    get_by_phone(phone_number, fields=None):
+        Retrieves a student by their phone number, in any accepted format.
+    get_version(id):
+        Retrieves only the row version of a student.
+    create(**kwargs):
+        Creates a new student in the database.
+    bulk_create(items):
+        Validates and creates many students, reporting the outcome per row.
+    import_csv(source):
+        Imports students from a CSV file with COPY.
+    batch(operations, atomic):
+        Validates and runs mixed operations in one transaction.
+    update(id, expected_versions=None, **kwargs):
+        Updates a student in the database by their id.
+    delete(id, expected_versions=None):
+        Deletes a student from the database by their id.
+    """
+
+    @cached_property
+    def dal(self) -> Union[AsyncStudentDataAccessLayer, ShardedStudentDataAccessLayer]:
+        if sharding_settings.SHARD_URLS:
+            return ShardedStudentDataAccessLayer()
+        return AsyncStudentDataAccessLayer()
+
+    @cached_property
+    def cache(self) -> EntityCache:
+        return EntityCache(
+            LRUCacheBackend(cache_settings.CACHE_MAX_SIZE if cache_settings.CACHE_ENABLED else 0),
+            ttl=cache_settings.CACHE_TTL,
+            negative_ttl=cache_settings.CACHE_NEGATIVE_TTL
+        )
+
+    async def get_all(self) -> List[Student]:
+        """
+        Retrieves all students from the database.
+
+        Returns
+        -------
+        list
+            a list of Student objects
+        """
+        return await self.dal.get_all()
+
+    async def get_page(
+        self,
+        limit: int,
+        after: Optional[str] = None,
+        fields: Optional[str] = None,
+        filters: Optional[dict] = None,
+        sort: StudentSortOptions = StudentSortOptions.ID
+    ) -> Tuple[List[StudentRecord], Optional[str]]:
+        """
+        Retrieves one page of students and the cursor of the next page.
+
+        The DAL requests one extra row to find out whether another page
+        exists without a separate count query. Cursors record the sort they
+        were issued for and are rejected for any other.
+
+        Parameters
+        ----------
+        limit : int
+            the maximum number of students to return
+        after : str, optional
+            the opaque cursor returned with the previous page
+        fields : str, optional
+            a comma separated sparse fieldset
+        filters : dict, optional
+            the non-null fields of a `StudentFilterSchema`
+        sort : StudentSortOptions
+            the order of the page
+
+        Returns
+        -------
+        tuple
+            a list of StudentRecord objects and the cursor of the next page,
+            or None if this is the last page
+
+        Raises
+        ------
+        InvalidCursorError
+            If the cursor is malformed.
+        InvalidFieldsError
+            If the fieldset names unknown fields.
+        """
+        fields = parse_fields(fields) or DEFAULT_FIELDS
+        position = decode_cursor(after, sort) if after is not None else None
+        students, last = await self.dal.get_page(
+            limit, after=position, fields=fields, filters=filters, sort=sort
+        )
+        next_cursor = encode_cursor(sort, last) if last is not None else None
+        return students, next_cursor
+
+    async def search(
+        self,
+        q: str,
+        limit: int,
+        threshold: float,
+        fields: Optional[str] = None,
+        include_address: bool = False
+    ) -> List[StudentRecord]:
+        """
+        Finds the students whose name best matches a partial or misspelled query.
+
+        Parameters
+        ----------
+        q : str
+            the search text
+        limit : int
+            the maximum number of students to return
+        threshold : float
+            the minimum similarity of a match, between 0 and 1
+        fields : str, optional
+            a comma separated sparse fieldset
+        include_address : bool
+            whether to match the address as well as the name
+
+        Returns
+        -------
+        list
+            the matching students with their score, best match first
+
+        Raises
+        ------
+        InvalidFieldsError
+            If the fieldset names unknown fields.
+        """
+        return await self.dal.search(
+            q.strip(),
+            limit,
+            threshold,
+            fields=parse_fields(fields) or DEFAULT_FIELDS,
+            include_address=include_address
+        )
+
+    async def get_stats(self) -> dict:
+        """
+        Retrieves the student counts by education, gender and enrollment month.
+
+        The buckets of the summary table are few, so they are rolled up here
+        in constant time regardless of the number of students.
+
+        Returns
+        -------
+        dict
+            the total and the counts by education, by gender and per month
+        """
+        by_education, by_gender, per_month = Counter(), Counter(), Counter()
+        for education, gender, month, count in await self.dal.get_stats():
+            # the table stores enum member names, the API serves values
+            by_education[GradeOptions[education].value if education else 'unknown'] += count
+            by_gender[GenderOptions[gender].value if gender else 'unknown'] += count
+            per_month[month or 'unknown'] += count
+        return {
+            'total': sum(by_gender.values()),
+            'by_education': dict(by_education),
+            'by_gender': dict(by_gender),
+            'enrollments_per_month': dict(sorted(per_month.items())),
+        }
+
+    async def rebuild_stats(self) -> int:
+        """
+        Recomputes the student statistics from scratch.
+
+        Returns
+        -------
+        int
+            the number of students counted
+        """
+        return await self.dal.rebuild_stats()
+
+    def export(
+        self,
+        format: ExportFormat,
+        fields: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Streams every student encoded in the given format.
+
+        The fieldset is validated before anything is streamed, so an
+        invalid one can still be rejected with an error response.
+
+        Parameters
+        ----------
+        format : ExportFormat
+            the output format
+        fields : str, optional
+            a comma separated sparse fieldset, all columns by default
+
+        Returns
+        -------
+        AsyncIterator[bytes]
+            encoded chunks, one per batch read from the database
+
+        Raises
+        ------
+        InvalidFieldsError
+            If the fieldset names unknown fields.
+        """
+        return self._export(format, parse_fields(fields))
+
+    async def _export(
+        self,
+        format: ExportFormat,
+        fields: Optional[Tuple[str, ...]]
+    ) -> AsyncIterator[bytes]:
+        header = fields or [column.name for column in Student.__table__.columns]
+        async for rows in self.dal.stream_all(fields=fields):
+            if format == ExportFormat.CSV:
+                yield to_csv(rows, header)
+                header = None
+            else:
+                yield to_ndjson(rows)
+
+    async def get_one(self, id: int) -> Optional[Student]:
+        """
+        Retrieves a student from the database by their id
+
+        Students are cached; a miss is read from the primary even when reads
+        go to replicas, so the cache never keeps a row older than the last
+        write, which invalidated it.
+
+        Parameters
+        ----------
+        id : int
+            the student's id
+
+        Returns
+        -------
+        Student
+            a Student object
+        """
+        return await self.cache.get_or_load(id, self._load)
+
+    async def _load(self, id: int) -> Optional[Student]:
+        # the cache answers every client for `CACHE_TTL` seconds, before any
+        # read is routed, so it is only ever filled from the primary
+        with primary_reads():
+            return await self.dal.get_one(id)
+
+    async def get_record(
+        self,
+        id: int,
+        fields: str
+    ) -> Optional[Tuple[StudentRecord, int]]:
+        """
+        Retrieves a sparse fieldset of a student by their id.
+
+        Sparse reads select only their columns and bypass the entity cache,
+        which holds whole students.
+
+        Parameters
+        ----------
+        id : int
+            the student's id
+        fields : str
+            a comma separated sparse fieldset
+
+        Returns
+        -------
+        tuple
+            the record and the student's version, or None if there is no
+            such student
+
+        Raises
+        ------
+        InvalidFieldsError
+            If the fieldset names unknown fields.
+        """
+        return await self.dal.get_record(id, parse_fields(fields))
+
+    async def get_by_phone(
+        self,
+        phone_number: str,
+        fields: Optional[str] = None
+    ) -> Optional[Tuple[StudentRecord, int]]:
+        """
+        Retrieves a student by their phone number, in any accepted format.
+
+        The number is brought into its canonical form first, which is the
+        only form stored, so the lookup is an exact index match.
+
+        Parameters
+        ----------
+        phone_number : str
+            the phone number, e.g. `+98 912 345 6789` or `09123456789`
+        fields : str, optional
+            a comma separated sparse fieldset
+
+        Returns
+        -------
+        tuple
+            the record and the student's version, or None if no student has
+            the phone number
+
+        Raises
+        ------
+        InvalidPhoneNumberError
+            If the phone number is not valid.
+        InvalidFieldsError
+            If the fieldset names unknown fields.
+        """
+        return await self.dal.get_by_phone(
+            normalize_phone_number(phone_number),
+            parse_fields(fields) or DEFAULT_FIELDS
+        )
+
+    async def get_version(self, id: int) -> Optional[int]:
+        """
+        Retrieves only the row version of a student, for conditional reads.
+
+        A cached student answers without a query; otherwise only the version
+        column is selected.
+
+        Parameters
+        ----------
+        id : int
+            the student's id
+
+        Returns
+        -------
+        int
+            the student's version, or None if there is no such student
+        """
+        student = await self.cache.peek(id)
+        if student is MISSING:
+            return await self.dal.get_version(id)
+        return None if student is None else student[0].version
+
+    async def create(self, **kwargs) -> Student:
+        """
+        Creates a new student in the database.
+
+        Parameters
+        ----------
+        **kwargs : dict
+            arbitrary keyword arguments
+
+        Returns
+        -------
+        Student
+            a newly created Student object
+        """
+        student = await self.dal.create(**kwargs)
+        await self.cache.invalidate(student.id)
+        return student
+
+    async def bulk_create(self, items: Union[Iterable[Any], AsyncIterable[Any]]) -> dict:
+        """
+        Validates and creates many students, reporting the outcome per row.
+
+        Items are consumed in chunks of `BULK_CHUNK_SIZE`, so a streamed body
+        is never held in memory as a whole. Every chunk is inserted and
+        committed with one statement; invalid and duplicate rows are reported
+        without aborting the rest of the batch.
+
+        Parameters
+        ----------
+        items : iterable or async iterable
+            student objects, or raw NDJSON lines still to be decoded
+
+        Returns
+        -------
+        dict
+            the number of created and failed rows, and one result per row
+        """
+        if not hasattr(items, '__aiter__'):
+            items = self._aiter(items)
+        results: List[dict] = []
+        chunk: List[Any] = []
+        async for item in items:
+            chunk.append(item)
+            if len(chunk) == BULK_CHUNK_SIZE:
+                results.extend(await self._create_chunk(chunk, len(results)))
+                chunk = []
+        if chunk:
+            results.extend(await self._create_chunk(chunk, len(results)))
+        created = sum(
+            1 for result in results if result['status'] == BulkRowStatus.CREATED
+        )
+        return {
+            'created': created,
+            'failed': len(results) - created,
+            'results': results,
+        }
+
+    async def import_csv(self, source: BinaryIO) -> dict:
+        """
+        Imports students from a CSV file with COPY.
+
+        The import runs on psycopg's blocking COPY protocol, so it is moved
+        to a worker thread to keep the event loop free. The importer is only
+        loaded by the first import, off the application's startup.
+
+        Parameters
+        ----------
+        source : BinaryIO
+            the CSV file, with a header row naming the columns
+
+        Returns
+        -------
+        dict
+            the number of rows read, imported and rejected, and the path of
+            the rejects file
+
+        Raises
+        ------
+        ShardedImportError
+            If students are sharded over `SHARD_URLS`.
+        """
+        from student.importer import import_students
+
+        result = await asyncio.to_thread(import_students, source)
+        await self.cache.clear()
+        return result
+
+    async def batch(self, operations: List[BatchOperationSchema], atomic: bool = False) -> dict:
+        """
+        Validates and runs mixed operations in one transaction.
+
+        Consecutive valid operations of the same kind are grouped, so the data
+        access layer can run each group as one statement while keeping the
+        request order. Invalid operations are reported without touching the
+        database; in an atomic batch they abort the whole request.
+
+        Parameters
+        ----------
+        operations : list
+            the create, update and delete operations, in order
+        atomic : bool
+            whether any failed operation rolls back the whole batch
+
+        Returns
+        -------
+        dict
+            whether the transaction was committed, and one result per
+            operation in request order
+        """
+        results = {}
+        groups = []
+        for index, operation in enumerate(operations):
+            try:
+                id, values = self._validate_operation(operation)
+            except (ValueError, ValidationError) as e:
+                results[index] = batch_result(
+                    index, operation.op, BatchOperationStatus.INVALID, operation.id,
+                    error=self._describe_error(e)
+                )
+                continue
+            if groups and groups[-1][0] == operation.op:
+                groups[-1][1].append((index, id, values))
+            else:
+                groups.append((operation.op, [(index, id, values)]))
+        if atomic and results:
+            results = abort_batch(results, groups)
+        elif groups:
+            results.update(await self.dal.batch(groups, atomic))
+            await self.cache.invalidate(*{
+                result['id'] for result in results.values()
+                if result['status'] == BatchOperationStatus.OK
+            })
+        committed = not atomic or all(
+            result['status'] == BatchOperationStatus.OK for result in results.values()
+        )
+        return {
+            'committed': committed,
+            'results': [results[index] for index in range(len(operations))],
+        }
+
+    @staticmethod
+    def _validate_operation(operation: BatchOperationSchema) -> Tuple[Optional[int], Optional[dict]]:
+        """
+        Checks that an operation carries what it needs and validates its data.
+        """
+        if operation.op == BatchOperation.CREATE:
+            if operation.data is None:
+                raise ValueError("data is required")
+            return None, StudentCreateSchema.parse_obj(operation.data).dict()
+        if operation.id is None:
+            raise ValueError("id is required")
+        if operation.op == BatchOperation.UPDATE:
+            if operation.data is None:
+                raise ValueError("data is required")
+            return operation.id, StudentUpdateSchema.parse_obj(operation.data).dict()
+        return operation.id, None
+
+    @staticmethod
+    def _describe_error(error: Exception) -> str:
+        if isinstance(error, ValidationError):
+            return '; '.join(
+                f"{'.'.join(map(str, err['loc']))}: {err['msg']}"
+                for err in error.errors()
+            )
+        return str(error)
+
+    async def _create_chunk(self, items: List[Any], offset: int) -> List[dict]:
+        """
+        Validates one chunk of a bulk request and inserts its valid rows.
+
+        Parameters
+        ----------
+        items : list
+            the raw items of the chunk
+        offset : int
+            the position of the first item in the whole request
+
+        Returns
+        -------
+        list
+            one result per item, in order
+        """
+        results: List[Optional[dict]] = [None] * len(items)
+        pending: dict = {}
+        rows: List[dict] = []
+        for position, item in enumerate(items):
+            index = offset + position
+            try:
+                if isinstance(item, bytes):
+                    item = orjson.loads(item)
+                student = StudentCreateSchema.parse_obj(item)
+            except orjson.JSONDecodeError as e:
+                results[position] = self._row_result(index, BulkRowStatus.INVALID, error=str(e))
+                continue
+            except ValidationError as e:
+                results[position] = self._row_result(
+                    index, BulkRowStatus.INVALID, error=self._describe_error(e)
+                )
+                continue
+            if student.phone_number in pending:
+                results[position] = self._row_result(
+                    index,
+                    BulkRowStatus.DUPLICATE,
+                    error="phone_number repeated within the request"
+                )
+                continue
+            pending[student.phone_number] = position
+            rows.append(student.dict())
+        if rows:
+            try:
+                created = await self.dal.bulk_create(rows)
+            except CreationError as e:
+                for position in pending.values():
+                    results[position] = self._row_result(
+                        offset + position, BulkRowStatus.FAILED, error=str(e)
+                    )
+            else:
+                ids = {phone_number: id for id, phone_number in created}
+                await self.cache.invalidate(*ids.values())
+                for phone_number, position in pending.items():
+                    if phone_number in ids:
+                        results[position] = self._row_result(
+                            offset + position, BulkRowStatus.CREATED, id=ids[phone_number]
+                        )
+                    else:
+                        results[position] = self._row_result(
+                            offset + position,
+                            BulkRowStatus.DUPLICATE,
+                            error="conflicts with an existing student"
+                        )
+        return results
+
+    @staticmethod
+    def _row_result(
+        index: int,
+        status: BulkRowStatus,
+        id: Optional[int] = None,
+        error: Optional[str] = None
+    ) -> dict:
+        return {'index': index, 'status': status, 'id': id, 'error': error}
+
+    @staticmethod
+    async def _aiter(items: Iterable[Any]) -> AsyncIterator[Any]:
+        for item in items:
+            yield item
+
+    async def update(
+        self,
+        id: int,
+        expected_versions: Optional[Collection[int]] = None,
+        **kwargs
+    ) -> dict:
+        """
+        Updates a student in the database by their id.
+
+        Parameters
+        ----------
+        id : int
+            the student's id
+        expected_versions : Collection[int], optional
+            the versions the update is allowed to overwrite
+        **kwargs : dict
+            arbitrary keyword arguments
+
+        Returns
+        -------
+        dict
+            whether the update was successful and the new version
+
+        Raises
+        ------
+        VersionConflictError
+            if the student exists at a version that was not expected
+        """
+        try:
+            return await self.dal.update(id, expected_versions, **kwargs)
+        finally:
+            # a conflict means the cached copy may be stale as well
+            await self.cache.invalidate(id)
+
+    async def delete(
+        self,
+        id: int,
+        expected_versions: Optional[Collection[int]] = None
+    ) -> dict:
+        """
+        Deletes a student from the database by their id.
+
+        Parameters
+        ----------
+        id : int
+            the student's id
+        expected_versions : Collection[int], optional
+            the versions the delete is allowed to remove
+
+        Returns
+        -------
+        dict
+            whether the delete was successful
+
+        Raises
+        ------
+        VersionConflictError
+            if the student exists at a version that was not expected
+        """
+        try:
+            return await self.dal.delete(id, expected_versions)
+        finally:
+            # a conflict means the cached copy may be stale as well
+            await self.cache.invalidate(id)
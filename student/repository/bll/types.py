@@ -0,0 +1,157 @@
+from datetime import date
+from typing import Optional
+
+from pydantic import BaseModel, constr, validator
+
+from student.helpers.enums import (
+    BatchOperation,
+    GenderOptions,
+    GradeOptions
+)
+from student.helpers.validators import normalize_phone_number
+
+
+class StudentBase(BaseModel):
+    """
+    A Pydantic model representing the base attributes of a student.
+
+    This class defines a Pydantic model for the base attributes of a student.
+    It is used as a base class for other Pydantic models that include additional
+    attributes.
+
+    Config:
+        orm_mode (bool): A configuration option that allows this model to be
+        used in SQLAlchemy ORM mode.
+
+    Examples
+    --------
+    To create a new Pydantic model representing a student with additional
+    attributes, simply inherit from the `StudentBase` class and add the
+    additional attributes:
+
+    >>> from pydantic import BaseModel
+    >>> from datetime import date
+    >>> from student.helpers.enums import GenderOptions, GradeOptions
+    >>> class StudentResponseSchema(StudentBase):
+    ...     first_name: str
+    ...     last_name: str
+    ...     phone_number: str
+    ...     gender: GenderOptions
+    ...     birth_date: date
+    ...     education: GradeOptions
+    ...     enrollment_date: date
+    ...     graduation_date: date
+    ...     address: str
+    """
+    class Config:
+        orm_mode = True
+
+
+class StudentFilterSchema(BaseModel):
+    """
+    A Pydantic model representing the filters of the student list.
+
+    Every filter is optional and they are combined with AND. Date ranges
+    are inclusive on both ends.
+
+    Examples
+    --------
+    >>> from student.schemas import StudentFilterSchema
+    >>> filters = StudentFilterSchema(
+    ...     education=GradeOptions.MASTER,
+    ...     enrollment_date_from=date(2025, 1, 1),
+    ...     enrollment_date_to=date(2025, 12, 31),
+    ... )
+    """
+    education: Optional[GradeOptions]
+    gender: Optional[GenderOptions]
+    enrollment_date_from: Optional[date]
+    enrollment_date_to: Optional[date]
+    graduation_date_from: Optional[date]
+    graduation_date_to: Optional[date]
+    birth_date_from: Optional[date]
+    birth_date_to: Optional[date]
+    last_name_prefix: Optional[constr(min_length=1, max_length=50)]
+
+
+class StudentUpdateSchema(StudentBase):
+    """
+    A Pydantic model representing the attributes of a student.
+
+    This class defines a Pydantic model for the attributes of a student.
+    It includes attributes for the student's first and last name, phone
+    number, gender, birth date, education level, enrollment date, graduation
+    date, and address. Updates bypass the ORM, so the phone number is
+    normalized here.
+
+    Examples
+    --------
+    To create a new Pydantic model representing a student with the same
+    attributes as the `StudentResponseSchema`, simply inherit from the
+    `StudentResponseSchema` class:
+
+    >>> from student.schemas import StudentResponseSchema
+    >>> class StudentRequestSchema(StudentResponseSchema):
+    ...     pass
+    """
+    first_name: str
+    last_name: str
+    phone_number: str
+    gender: GenderOptions
+    birth_date: date
+    education: GradeOptions
+    graduation_date: date
+    address: str
+
+    _normalize_phone_number = validator('phone_number', allow_reuse=True)(
+        normalize_phone_number
+    )
+
+
+class StudentCreateSchema(StudentBase):
+    """
+    A Pydantic model representing a student to be created in bulk.
+
+    The id is assigned by the database, and the phone number is validated
+    with the same rule as the `Student` model, since bulk inserts bypass the
+    ORM.
+
+    Examples
+    --------
+    >>> from student.schemas import StudentCreateSchema
+    >>> StudentCreateSchema.parse_obj(payload)
+    """
+    first_name: str
+    last_name: str
+    phone_number: str
+    gender: GenderOptions
+    birth_date: date
+    education: GradeOptions
+    graduation_date: date
+    address: str
+
+    _normalize_phone_number = validator('phone_number', allow_reuse=True)(
+        normalize_phone_number
+    )
+
+
+class BatchOperationSchema(BaseModel):
+    """
+    A Pydantic model representing one operation of a batch request.
+
+    `data` is validated against `StudentCreateSchema` or
+    `StudentUpdateSchema` depending on the operation, so an invalid
+    operation is reported on its own instead of rejecting the request.
+
+    Attributes
+    ----------
+    op : BatchOperation
+        The operation to run.
+    id : int, optional
+        The student to update or delete.
+    data : dict, optional
+        The student data to create or update with.
+    """
+    op: BatchOperation
+    id: Optional[int]
+    data: Optional[dict]
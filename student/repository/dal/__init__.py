@@ -1,2 +1,16 @@
-from .queryset import StudentDataAccessLayer
-from .interface import IDataAccessLayer
\ No newline at end of file
+from .queryset import (
+    StudentDataAccessLayer,
+    AsyncStudentDataAccessLayer,
+    batch_result,
+    abort_batch,
+    build_page
+)
+from .sharded import ShardedStudentDataAccessLayer
+from .interface import IDataAccessLayer
+from .records import (
+    DEFAULT_FIELDS,
+    StudentRecord,
+    parse_fields,
+    record_columns,
+    record_type
+)
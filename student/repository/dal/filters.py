@@ -0,0 +1,186 @@
+from datetime import date, datetime, time, timedelta
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import and_, select, tuple_
+from sqlalchemy.sql import ColumnElement
+
+from student.helpers.enums import StudentSortOptions
+from student.helpers.exceptions import InvalidCursorError
+from student.models import Student, StudentKey
+
+# the sort key of every whitelisted order; last names sort in code point
+# order so the same index also serves prefix filters, whatever the
+# database collation
+SORT_COLUMNS = {
+    'id': Student.id,
+    'last_name': Student.last_name.collate('C'),
+    'enrollment_date': Student.enrollment_date,
+    'graduation_date': Student.graduation_date,
+    'birth_date': Student.birth_date,
+}
+# the columns filtered with an inclusive `<name>_from` / `<name>_to` range
+RANGE_FILTERS = ('enrollment_date', 'graduation_date', 'birth_date')
+
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """
+    Returns the smallest string greater than every string starting with
+    `prefix` in code point order, or None if there is none.
+    """
+    while prefix and prefix[-1] == chr(0x10FFFF):
+        prefix = prefix[:-1]
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def compile_filters(filters: dict) -> List[ColumnElement]:
+    """
+    Compiles list filters into WHERE clauses.
+
+    Equality filters compare the enum columns, date ranges are half-open
+    timestamp ranges so a whole day is included, and the last name prefix
+    is a range on the same code point ordered expression as the
+    `last_name` sort, which the `ix_students_last_name` index covers.
+
+    Parameters
+    ----------
+    filters : dict
+        The non-null fields of a `StudentFilterSchema`.
+
+    Returns
+    -------
+    list
+        The clauses, to be combined with AND.
+    """
+    clauses = []
+    if filters.get('education') is not None:
+        clauses.append(Student.education == filters['education'])
+    if filters.get('gender') is not None:
+        clauses.append(Student.gender == filters['gender'])
+    for name in RANGE_FILTERS:
+        column = Student.__table__.c[name]
+        start, end = filters.get(f'{name}_from'), filters.get(f'{name}_to')
+        if start is not None:
+            clauses.append(column >= datetime.combine(start, time.min))
+        if end is not None:
+            clauses.append(column < datetime.combine(end + timedelta(days=1), time.min))
+    prefix = filters.get('last_name_prefix')
+    if prefix:
+        column = SORT_COLUMNS['last_name']
+        clauses.append(column >= prefix)
+        upper = _prefix_upper_bound(prefix)
+        if upper is not None:
+            clauses.append(column < upper)
+    return clauses
+
+
+def by_key(column: ColumnElement, value: Any) -> ColumnElement:
+    """
+    Matches the student with a unique key, in the partition holding them.
+
+    A lookup by id or phone number does not carry the enrollment date
+    `students` is partitioned by, so it is read from `student_keys` first,
+    within the same statement; the partitions it rules out are then never
+    read.
+
+    Parameters
+    ----------
+    column : Column
+        `id` or `phone_number` of `students`.
+    value : Any
+        The key, or a bind parameter.
+
+    Returns
+    -------
+    ColumnElement
+        The WHERE clause matching the student.
+    """
+    key = StudentKey.__table__.c[column.name]
+    enrollment_date = select(StudentKey.enrollment_date).where(key == value).scalar_subquery()
+    return and_(column == value, Student.enrollment_date == enrollment_date)
+
+
+def sort_key(sort: StudentSortOptions) -> Tuple[str, ColumnElement, bool]:
+    """
+    Resolves a sort option.
+
+    Parameters
+    ----------
+    sort : StudentSortOptions
+        The requested order.
+
+    Returns
+    -------
+    tuple
+        The column name, the expression to order by, and whether the order
+        is descending.
+    """
+    descending = sort.startswith('-')
+    name = sort.removeprefix('-')
+    return name, SORT_COLUMNS[name], descending
+
+
+def decode_key(name: str, values: List[Any]) -> Tuple[Any, ...]:
+    """
+    Turns the values of a decoded cursor back into a typed keyset position.
+
+    Parameters
+    ----------
+    name : str
+        The sort column name.
+    values : list
+        The values stored in the cursor: the id alone when sorting by id,
+        otherwise the sort value, possibly null, followed by the id.
+
+    Returns
+    -------
+    tuple
+        The position, typed like the sort key.
+
+    Raises
+    ------
+    InvalidCursorError
+        If the values do not fit the sort key.
+    """
+    if name == 'id':
+        if len(values) != 1 or type(values[0]) is not int:
+            raise InvalidCursorError
+        return (values[0],)
+    if len(values) != 2 or type(values[1]) is not int:
+        raise InvalidCursorError
+    value, id = values
+    if value is None:
+        return None, id
+    if not isinstance(value, str):
+        raise InvalidCursorError
+    if name == 'last_name':
+        return value, id
+    try:
+        return datetime.fromisoformat(value), id
+    except ValueError:
+        raise InvalidCursorError
+
+
+def encode_key(values: Tuple[Any, ...]) -> List[Any]:
+    """Turns a keyset position into values a cursor can store."""
+    return [
+        value.isoformat() if isinstance(value, (date, datetime)) else value
+        for value in values
+    ]
+
+
+def seek(
+    column: ColumnElement,
+    descending: bool,
+    position: Tuple[Any, ...]
+) -> ColumnElement:
+    """
+    Returns the condition selecting the rows after a keyset position.
+
+    The row value comparison is a single index condition on the composite
+    `(column, id)` index, so the scan starts right at the position.
+    """
+    keys = tuple_(column, Student.id) if len(position) == 2 else Student.id
+    bound = tuple_(*position) if len(position) == 2 else position[0]
+    return keys < bound if descending else keys > bound
@@ -0,0 +1,89 @@
+import functools
+import inspect
+from time import perf_counter
+from typing import Callable, Type
+
+from kernel.metrics import (
+    QUERY_DURATION,
+    QUERY_ERRORS
+)
+from student.helpers.exceptions import DataAccessError
+
+
+def instrumented(dal: str) -> Callable[[Type], Type]:
+    """
+    Class decorator timing every public method of a data access layer.
+
+    Each call is observed in the `dal_query_duration_seconds` histogram, and
+    a `DataAccessError` it raises is counted in `dal_errors_total` under its
+    subclass name. The labeled children are bound once per method, so a
+    call only pays for two clock reads and an observation. Streaming
+    methods are timed until their last batch was consumed.
+
+    Parameters
+    ----------
+    dal : str
+        The value of the `dal` label, e.g. "async".
+
+    Returns
+    -------
+    Callable
+        The decorator, returning the class with its methods wrapped.
+
+    Examples
+    --------
+    >>> @instrumented('async')
+    ... class AsyncStudentDataAccessLayer(IDataAccessLayer):
+    ...     ...
+    """
+    def decorate(cls: Type) -> Type:
+        for name, method in list(vars(cls).items()):
+            if name.startswith('_') or not inspect.isfunction(method):
+                continue
+            setattr(cls, name, _instrument(method, dal, name))
+        return cls
+    return decorate
+
+
+def _instrument(method: Callable, dal: str, name: str) -> Callable:
+    """Wraps one method according to its kind."""
+    duration = QUERY_DURATION.labels(dal, name)
+
+    def count_error(error: DataAccessError) -> None:
+        QUERY_ERRORS.labels(dal, name, type(error).__name__).inc()
+
+    if inspect.isasyncgenfunction(method):
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                async for item in method(*args, **kwargs):
+                    yield item
+            except DataAccessError as e:
+                count_error(e)
+                raise
+            finally:
+                duration.observe(perf_counter() - start)
+    elif inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            except DataAccessError as e:
+                count_error(e)
+                raise
+            finally:
+                duration.observe(perf_counter() - start)
+    else:
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            except DataAccessError as e:
+                count_error(e)
+                raise
+            finally:
+                duration.observe(perf_counter() - start)
+    return wrapper
@@ -1,24 +1,151 @@
-from typing import List, Optional
+from typing import Any, AsyncIterator, Collection, Dict, List, Optional, Sequence, Tuple
 
-from sqlalchemy import select, update, insert, delete
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import select, update, insert, delete, bindparam, func, cast, text, Text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from .interface import IDataAccessLayer
-from student.models import Student
+from .metrics import instrumented
+from .filters import (
+    by_key,
+    compile_filters,
+    decode_key,
+    encode_key,
+    seek,
+    sort_key
+)
+from .records import (
+    DEFAULT_FIELDS,
+    STUDENT_FIELDS,
+    StudentRecord,
+    record_columns,
+    record_type
+)
+from student.models import (
+    Student,
+    StudentKey,
+    StudentStats,
+    full_name
+)
+from database.partitions import SKIP_CONFLICTS
 from kernel.settings.logging import coreLogger
+from student.helpers.enums import (
+    BatchOperation,
+    BatchOperationStatus,
+    StudentSortOptions
+)
 from student.helpers.exceptions import (
+    BatchError,
     RetrievalError,
     DeletionError,
     CreationError,
     UpdateError,
+    VersionConflictError,
 )
 
+# a run of consecutive operations of the same kind, as (index, id, values)
+BatchGroup = Tuple[BatchOperation, List[Tuple[int, Optional[int], Optional[dict]]]]
+
+
+def batch_result(
+    index: int,
+    op: BatchOperation,
+    status: BatchOperationStatus,
+    id: Optional[int] = None,
+    error: Optional[str] = None
+) -> dict:
+    """
+    Builds the result of one batch operation.
+
+    Parameters
+    ----------
+    index : int
+        the position of the operation in the request
+    op : BatchOperation
+        the operation
+    status : BatchOperationStatus
+        the outcome of the operation
+    id : int, optional
+        the id of the student the operation applied to
+    error : str, optional
+        why the operation was not applied
+
+    Returns
+    -------
+    dict
+        the operation result
+    """
+    return {'index': index, 'op': op, 'status': status, 'id': id, 'error': error}
+
+
+def abort_batch(results: Dict[int, dict], groups: List[BatchGroup]) -> Dict[int, dict]:
+    """
+    Marks every operation of a failed atomic batch that did not fail on its
+    own as aborted.
+
+    Parameters
+    ----------
+    results : dict
+        the results collected so far, keyed by operation index
+    groups : list
+        every operation group of the batch
+
+    Returns
+    -------
+    dict
+        the results of all operations, keyed by operation index
+    """
+    for op, items in groups:
+        for index, id, _ in items:
+            result = results.get(index)
+            if result is None or result['status'] == BatchOperationStatus.OK:
+                results[index] = batch_result(
+                    index, op, BatchOperationStatus.ABORTED, id,
+                    error="atomic batch rolled back"
+                )
+    return results
 
+
+def build_page(
+    rows: Sequence[Row],
+    limit: int,
+    fields: Tuple[str, ...]
+) -> Tuple[List[StudentRecord], Optional[List[Any]]]:
+    """
+    Turns the rows selected for a page into its records and next position.
+
+    Parameters
+    ----------
+    rows : list
+        up to `limit + 1` rows in page order, each holding the columns of
+        `fields` followed by its sort key
+    limit : int
+        the maximum number of students of the page
+    fields : tuple of str
+        the fieldset the rows were selected with
+
+    Returns
+    -------
+    tuple
+        the records of the page, and the keyset position of its last one
+        if another page follows
+    """
+    width = len(fields)
+    record = record_type(fields)
+    students = [record(*row[:width]) for row in rows[:limit]]
+    last = encode_key(rows[limit - 1][width:]) if len(rows) > limit else None
+    return students, last
+
+
+@instrumented('sync')
 class StudentDataAccessLayer(IDataAccessLayer):
     """
     A class used to interact with the Student model in the database.
 
-    ...
+    Every method opens its own `Session` from `Student.database.session`
+    and closes it before returning. Public methods are timed by
+    `instrumented`.
 
     Attributes
     ----------
@@ -48,12 +175,13 @@ class StudentDataAccessLayer(IDataAccessLayer):
             a list of Student objects
         """
         try:
-            stmt = select(Student)
-            students = Student.database.session.execute(stmt).fetchall()
-            coreLogger.info(f"Retrieved all {len(students)} students from the database")
+            with Student.database.session() as session:
+                stmt = select(Student)
+                students = session.execute(stmt).fetchall()
+            coreLogger.debug("Retrieved all %s students from the database", len(students))
             return students
         except SQLAlchemyError as e:
-            coreLogger.error(f"Failed to get all students: {e}")
+            coreLogger.error("Failed to get all students: %s", e)
             raise RetrievalError("Error retrieving all students from database")
 
     def get_one(self, id: int) -> Optional[Student]:
@@ -71,16 +199,17 @@ class StudentDataAccessLayer(IDataAccessLayer):
             a Student object
         """
         try:
-            stmt = select(Student) \
-                    .where(Student.id==id)
-            student = Student.database.session.execute(stmt).first()
+            with Student.database.session() as session:
+                stmt = select(Student) \
+                        .where(by_key(Student.id, id))
+                student = session.execute(stmt).first()
             if student:
-                coreLogger.info(f"Retrieved student with id {id} from the database")
+                coreLogger.debug("Retrieved student with id %s from the database", id)
             else:
-                coreLogger.info(f"No student found with id {id} in the database")
+                coreLogger.debug("No student found with id %s in the database", id)
             return student
         except SQLAlchemyError as e:
-            coreLogger.error(f"Failed to get student with id {id}: {e}")
+            coreLogger.error("Failed to get student with id %s: %s", id, e)
             raise RetrievalError(
                 f"Error retrieving student with id {id} from database"
             )
@@ -99,16 +228,17 @@ class StudentDataAccessLayer(IDataAccessLayer):
         Student
             a newly created Student object
         """
-        try:
-            instance = Student(**kwargs)
-            Student.database.session.add(instance)
-            Student.database.session.commit()
-            coreLogger.info(f"Created new student with id {instance.id}")
-            return instance
-        except SQLAlchemyError as e:
-            Student.database.session.rollback()
-            coreLogger.error(f"Failed to create student: {e}")
-            raise CreationError("Error creating student in database")
+        with Student.database.session() as session:
+            try:
+                instance = Student(**kwargs)
+                session.add(instance)
+                session.commit()
+                coreLogger.info("Created new student with id %s", instance.id)
+                return instance
+            except SQLAlchemyError as e:
+                session.rollback()
+                coreLogger.error("Failed to create student: %s", e)
+                raise CreationError("Error creating student in database")
 
     def update(self, id: int, **kwargs) -> Optional[bool]:
         """
@@ -126,21 +256,22 @@ class StudentDataAccessLayer(IDataAccessLayer):
         bool
             True if the update operation was successful, False otherwise
         """
-        try:
-            stmt = update(Student) \
-                        .where(Student.id == id) \
-                            .values(**kwargs)
-            result = Student.database.session.execute(stmt)
-            if result:
-                Student.database.session.commit()
-                coreLogger.info(f"Updated student with id {id}")
-            return {'result': f'{result.rowcount > 0}'}
-        except SQLAlchemyError as e:
-            Student.database.session.rollback()
-            coreLogger.error(f"Failed to update student with id {id}: {e}")
-            raise UpdateError(
-                f"Error updating student with id {id} in database"
-            )
+        with Student.database.session() as session:
+            try:
+                stmt = update(Student) \
+                            .where(by_key(Student.id, id)) \
+                                .values(version=Student.version + 1, **kwargs)
+                result = session.execute(stmt)
+                if result:
+                    session.commit()
+                    coreLogger.info("Updated student with id %s", id)
+                return {'result': f'{result.rowcount > 0}'}
+            except SQLAlchemyError as e:
+                session.rollback()
+                coreLogger.error("Failed to update student with id %s: %s", id, e)
+                raise UpdateError(
+                    f"Error updating student with id {id} in database"
+                )
 
     def delete(self, id: int) -> Optional[bool]:
         """
@@ -156,17 +287,773 @@ class StudentDataAccessLayer(IDataAccessLayer):
         bool
             True if the delete operation was successful, False otherwise
         """
+        with Student.database.session() as session:
+            try:
+                stmt = delete(Student) \
+                            .where(by_key(Student.id, id))
+                result = session.execute(stmt)
+                if result:
+                    session.commit()
+                    coreLogger.info("Deleted student with id %s", id)
+                return {'result': f'{result.rowcount > 0}'}
+            except SQLAlchemyError as e:
+                session.rollback()
+                coreLogger.error("Failed to delete student with id %s: %s", id, e)
+                raise DeletionError(
+                    f"Error deleting student with id {id} from database"
+                )
+
+
+@instrumented('async')
+class AsyncStudentDataAccessLayer(IDataAccessLayer):
+    """
+    An asyncio counterpart of `StudentDataAccessLayer`.
+
+    Every method opens its own `AsyncSession` from the `async_session` of
+    its database, `Student.database` by default, so database round trips
+    are awaited instead of blocking the event loop and concurrent requests
+    never share a transaction. Reads take theirs from `read_session()` or
+    `read_engine()` instead, which may route them to a read replica;
+    writes, and reads that decide a write, always go to the primary. Public
+    methods are timed by `instrumented`.
+
+    Parameters
+    ----------
+    database : SqlAlchemy or Shard, optional
+        The database to work on, `Student.database` by default; a sharded
+        layer binds one layer to each of its shards.
+
+    Methods
+    -------
+    get_all():
+        Retrieves all students from the database.
+    get_page(limit, after):
+        Retrieves one page of students ordered by id.
+    stream_all(batch_size):
+        Streams every student from a server-side cursor, in batches.
+    get_one(id):
+        Retrieves a student from the database by their id.
+    create(**kwargs):
+        Creates a new student in the database.
+    bulk_create(rows):
+        Creates many students with a single multi-row INSERT.
+    update(id, **kwargs):
+        Updates a student in the database by their id.
+    delete(id):
+        Deletes a student from the database by their id.
+    batch(groups, atomic):
+        Runs groups of create, update and delete operations in one
+        transaction.
+    """
+    def __init__(self, database=None) -> None:
+        self.database = Student.database if database is None else database
+
+    async def get_all(self) -> List[Student]:
+        """
+        Retrieves all students from the database.
+
+        Returns
+        -------
+        list
+            a list of Student objects
+        """
+        try:
+            async with self.database.read_session() as session:
+                stmt = select(Student)
+                students = (await session.execute(stmt)).fetchall()
+            coreLogger.debug("Retrieved all %s students from the database", len(students))
+            return students
+        except SQLAlchemyError as e:
+            coreLogger.error("Failed to get all students: %s", e)
+            raise RetrievalError("Error retrieving all students from database")
+
+    async def get_page(
+        self,
+        limit: int,
+        after: Optional[List[Any]] = None,
+        fields: Tuple[str, ...] = DEFAULT_FIELDS,
+        filters: Optional[dict] = None,
+        sort: StudentSortOptions = StudentSortOptions.ID
+    ) -> Tuple[List[StudentRecord], Optional[List[Any]]]:
+        """
+        Retrieves one page of filtered, sorted students, using keyset pagination.
+
+        The page starts right after the `after` position, so the index of the
+        sort key is seeked directly and the cost does not grow with the page
+        depth. Students whose sort value is null come after all others and
+        are paged by id in a second, equally indexed, query.
+
+        This is the read fast path: plain columns are selected on a Core
+        connection, bypassing the ORM session, and each row is turned into
+        a slotted record ready to be encoded. Only the columns of `fields`
+        are selected, plus the sort key.
+
+        Parameters
+        ----------
+        limit : int
+            the maximum number of students to return
+        after : list, optional
+            the keyset position of the last student of the previous page,
+            as stored in its cursor
+        fields : tuple of str
+            the validated fieldset to select, including `id`
+        filters : dict, optional
+            the non-null fields of a `StudentFilterSchema`
+        sort : StudentSortOptions
+            the order of the page
+
+        Returns
+        -------
+        tuple
+            a list of StudentRecord objects, or records of the fieldset, and
+            the keyset position of the last one if another page follows
+
+        Raises
+        ------
+        InvalidCursorError
+            If the position does not fit the sort key.
+        """
+        rows = await self._page_rows(limit, after, fields, filters, sort)
+        students, last = build_page(rows, limit, fields)
+        coreLogger.debug("Retrieved a page of %s students from the database", len(students))
+        return students, last
+
+    async def _page_rows(
+        self,
+        limit: int,
+        after: Optional[List[Any]],
+        fields: Tuple[str, ...],
+        filters: Optional[dict],
+        sort: StudentSortOptions
+    ) -> List[Row]:
+        """
+        Selects up to `limit + 1` rows of a page, in page order.
+
+        Each row holds the columns of `fields` followed by its sort key: the
+        sort value, unless sorting by id, and the id.
+        """
+        name, column, descending = sort_key(sort)
+        position = decode_key(name, after) if after is not None else None
+        keys = (Student.id,) if name == 'id' else (column, Student.id)
+        base = select(*record_columns(fields), *keys) \
+                    .where(*compile_filters(filters or {}))
+        order = (lambda key: key.desc()) if descending else (lambda key: key)
+        try:
+            async with self.database.read_engine().connect() as connection:
+                rows = []
+                if position is None or position[0] is not None:
+                    stmt = base.order_by(*map(order, keys)) \
+                                .limit(limit + 1)
+                    if name != 'id':
+                        stmt = stmt.where(column.is_not(None))
+                    if position is not None:
+                        stmt = stmt.where(seek(column, descending, position))
+                    rows = (await connection.execute(stmt)).all()
+                if name != 'id' and len(rows) <= limit:
+                    # ordering by the constant null key as well keeps the
+                    # index order usable, so no sort is needed
+                    stmt = base.where(column.is_(None)) \
+                                .order_by(*map(order, keys)) \
+                                    .limit(limit + 1 - len(rows))
+                    if position is not None and position[0] is None:
+                        stmt = stmt.where(seek(Student.id, descending, position[1:]))
+                    rows += (await connection.execute(stmt)).all()
+            return rows
+        except SQLAlchemyError as e:
+            coreLogger.error("Failed to get a page of students after %s: %s", after, e)
+            raise RetrievalError("Error retrieving students from database")
+
+    async def search(
+        self,
+        q: str,
+        limit: int,
+        threshold: float,
+        fields: Tuple[str, ...] = DEFAULT_FIELDS,
+        include_address: bool = False
+    ) -> List[StudentRecord]:
+        """
+        Finds the students whose name best matches a partial or misspelled query.
+
+        Matching uses pg_trgm's word similarity, which scores how well the
+        query matches any part of the full name. The `%>` operator is served
+        by the `ix_students_full_name_trgm` GIN index: only the students
+        above `threshold` are fetched from a bitmap scan, and just those are
+        ranked. With `include_address` the address is searched as well,
+        through its own GIN index.
+
+        Parameters
+        ----------
+        q : str
+            the search text
+        limit : int
+            the maximum number of students to return
+        threshold : float
+            the minimum word similarity, between 0 and 1
+        fields : tuple of str
+            the validated fieldset to select, including `id`
+        include_address : bool
+            whether to match the address as well as the name
+
+        Returns
+        -------
+        list
+            records of the fieldset plus their `score`, best match first
+        """
+        name = full_name(Student.first_name, Student.last_name)
+        score = func.word_similarity(q, name)
+        condition = name.op('%>')(q)
+        if include_address:
+            score = func.greatest(score, func.word_similarity(q, Student.address))
+            condition = condition | Student.address.op('%>')(q)
+        stmt = select(*record_columns(fields), score.label('score')) \
+                .where(condition) \
+                    .order_by(score.desc(), Student.id) \
+                        .limit(limit)
+        try:
+            async with self.database.read_engine().connect() as connection:
+                # `%>` compares against this setting, local to the transaction
+                await connection.execute(
+                    select(func.set_config('pg_trgm.word_similarity_threshold', str(threshold), True))
+                )
+                result = await connection.execute(stmt)
+                record = record_type(fields, ('score',))
+                students = [record(*row) for row in result.tuples()]
+            coreLogger.debug("Found %s students matching %r", len(students), q)
+            return students
+        except SQLAlchemyError as e:
+            coreLogger.error("Failed to search students for %r: %s", q, e)
+            raise RetrievalError("Error searching students in database")
+
+    async def get_stats(self) -> List[Row]:
+        """
+        Retrieves the student counts per education, gender and enrollment month.
+
+        The counts come from the `student_stats` summary table, which the
+        triggers on `students` keep current, so this reads one row per
+        non-empty bucket however many students there are.
+
+        Returns
+        -------
+        list
+            rows of education, gender, month and count
+        """
+        try:
+            async with self.database.read_engine().connect() as connection:
+                stmt = select(
+                    StudentStats.education,
+                    StudentStats.gender,
+                    StudentStats.month,
+                    StudentStats.count
+                ).where(StudentStats.count != 0)
+                buckets = (await connection.execute(stmt)).all()
+            coreLogger.debug("Retrieved %s student stats buckets", len(buckets))
+            return buckets
+        except SQLAlchemyError as e:
+            coreLogger.error("Failed to get student stats: %s", e)
+            raise RetrievalError("Error retrieving student stats from database")
+
+    async def rebuild_stats(self) -> int:
+        """
+        Recomputes the student statistics from scratch.
+
+        Writes to `students` are blocked while the table is aggregated, so
+        no trigger delta can be lost or counted twice; reads go on.
+
+        Returns
+        -------
+        int
+            the number of students counted
+        """
+        columns = (
+            func.coalesce(cast(Student.education, Text), ''),
+            func.coalesce(cast(Student.gender, Text), ''),
+            func.coalesce(func.to_char(Student.enrollment_date, 'YYYY-MM'), ''),
+        )
+        try:
+            async with self.database.async_engine.begin() as connection:
+                await connection.execute(text('LOCK TABLE students IN SHARE MODE'))
+                await connection.execute(delete(StudentStats))
+                await connection.execute(
+                    insert(StudentStats).from_select(
+                        ['education', 'gender', 'month', 'count'],
+                        select(*columns, func.count()).group_by(*columns)
+                    )
+                )
+                total = (await connection.execute(
+                    select(func.coalesce(func.sum(StudentStats.count), 0))
+                )).scalar()
+            coreLogger.info("Rebuilt student stats for %s students", total)
+            return total
+        except SQLAlchemyError as e:
+            coreLogger.error("Failed to rebuild student stats: %s", e)
+            raise UpdateError("Error rebuilding student stats in database")
+
+    async def stream_all(
+        self,
+        batch_size: int = 1000,
+        fields: Optional[Tuple[str, ...]] = None
+    ) -> AsyncIterator[Sequence[Row]]:
+        """
+        Streams every student from a server-side cursor, in batches.
+
+        Plain columns are selected so no ORM instances are built, and only
+        `batch_size` rows are held in memory at a time regardless of the
+        size of the table. They are shaped like the JSON API by
+        `record_columns()`, so an export has the types of a page.
+
+        Parameters
+        ----------
+        batch_size : int
+            the number of rows fetched from the cursor per round trip
+        fields : tuple of str, optional
+            the validated fieldset to select, all columns by default
+
+        Yields
+        ------
+        list
+            batches of rows ordered by id
+        """
+        try:
+            async with self.database.read_session() as session:
+                stmt = select(*record_columns(fields or STUDENT_FIELDS)) \
+                        .order_by(Student.id) \
+                            .execution_options(yield_per=batch_size)
+                result = await session.stream(stmt)
+                async for partition in result.partitions():
+                    yield partition
+            coreLogger.debug("Streamed all students from the database")
+        except SQLAlchemyError as e:
+            coreLogger.error("Failed to stream students: %s", e)
+            raise RetrievalError("Error streaming students from database")
+
+    async def get_one(self, id: int) -> Optional[Student]:
+        """
+        Retrieves a student from the database by their id
+
+        Parameters
+        ----------
+        id : int
+            the student's id
+
+        Returns
+        -------
+        Student
+            a Student object
+        """
+        try:
+            async with self.database.read_session() as session:
+                stmt = select(Student) \
+                        .where(by_key(Student.id, id))
+                student = (await session.execute(stmt)).first()
+            if student:
+                coreLogger.debug("Retrieved student with id %s from the database", id)
+            else:
+                coreLogger.debug("No student found with id %s in the database", id)
+            return student
+        except SQLAlchemyError as e:
+            coreLogger.error("Failed to get student with id %s: %s", id, e)
+            raise RetrievalError(
+                f"Error retrieving student with id {id} from database"
+            )
+
+    async def get_record(
+        self,
+        id: int,
+        fields: Tuple[str, ...]
+    ) -> Optional[Tuple[StudentRecord, int]]:
+        """
+        Retrieves a sparse fieldset of a student by their id
+
+        Like `get_page`, this selects only the requested columns on a Core
+        connection, plus the version for the ETag.
+
+        Parameters
+        ----------
+        id : int
+            the student's id
+        fields : tuple of str
+            the validated fieldset to select, including `id`
+
+        Returns
+        -------
+        tuple
+            the record of the fieldset and the student's version, or None
+            if there is no such student
+        """
         try:
-            stmt = delete(Student) \
-                        .where(Student.id==id)
-            result = Student.database.session.execute(stmt)
-            if result:
-                Student.database.session.commit()
-                coreLogger.info(f"Deleted student with id {id}")
-            return {'result': f'{result.rowcount > 0}'}
+            async with self.database.read_engine().connect() as connection:
+                stmt = select(*record_columns(fields), Student.version) \
+                        .where(by_key(Student.id, id))
+                row = (await connection.execute(stmt)).first()
+            if row is None:
+                coreLogger.debug("No student found with id %s in the database", id)
+                return None
+            coreLogger.debug("Retrieved student with id %s from the database", id)
+            return record_type(fields)(*row[:-1]), row[-1]
         except SQLAlchemyError as e:
-            Student.database.session.rollback()
-            coreLogger.error(f"Failed to delete student with id {id}: {e}")
-            raise DeletionError(
-                f"Error deleting student with id {id} from database"
+            coreLogger.error("Failed to get student with id %s: %s", id, e)
+            raise RetrievalError(
+                f"Error retrieving student with id {id} from database"
             )
+
+    async def get_by_phone(
+        self,
+        phone_number: str,
+        fields: Tuple[str, ...] = DEFAULT_FIELDS
+    ) -> Optional[Tuple[StudentRecord, int]]:
+        """
+        Retrieves a student by their canonical phone number
+
+        A single probe of the unique phone number index, selecting the
+        fieldset and the version for the ETag on a Core connection.
+
+        Parameters
+        ----------
+        phone_number : str
+            the canonical phone number
+        fields : tuple of str
+            the validated fieldset to select, including `id`
+
+        Returns
+        -------
+        tuple
+            the record of the fieldset and the student's version, or None
+            if no student has the phone number
+        """
+        try:
+            async with self.database.read_engine().connect() as connection:
+                stmt = select(*record_columns(fields), Student.version) \
+                        .where(by_key(Student.phone_number, phone_number))
+                row = (await connection.execute(stmt)).first()
+            if row is None:
+                coreLogger.debug("No student found with phone number %s in the database", phone_number)
+                return None
+            coreLogger.debug("Retrieved student with phone number %s from the database", phone_number)
+            return record_type(fields)(*row[:-1]), row[-1]
+        except SQLAlchemyError as e:
+            coreLogger.error("Failed to get student with phone number %s: %s", phone_number, e)
+            raise RetrievalError(
+                f"Error retrieving student with phone number {phone_number} from database"
+            )
+
+    async def get_version(self, id: int) -> Optional[int]:
+        """
+        Retrieves only the row version of a student by their id
+
+        Parameters
+        ----------
+        id : int
+            the student's id
+
+        Returns
+        -------
+        int
+            the student's version, or None if there is no such student
+        """
+        try:
+            async with self.database.read_session() as session:
+                stmt = select(Student.version) \
+                        .where(by_key(Student.id, id))
+                return (await session.execute(stmt)).scalar()
+        except SQLAlchemyError as e:
+            coreLogger.error("Failed to get the version of student with id %s: %s", id, e)
+            raise RetrievalError(
+                f"Error retrieving student with id {id} from database"
+            )
+
+    async def create(self, **kwargs) -> Student:
+        """
+        Creates a new student in the database.
+
+        Parameters
+        ----------
+        **kwargs : dict
+            arbitrary keyword arguments
+
+        Returns
+        -------
+        Student
+            a newly created Student object
+        """
+        async with self.database.async_session() as session:
+            try:
+                instance = Student(**kwargs)
+                session.add(instance)
+                await session.commit()
+                coreLogger.info("Created new student with id %s", instance.id)
+                return instance
+            except SQLAlchemyError as e:
+                await session.rollback()
+                coreLogger.error("Failed to create student: %s", e)
+                raise CreationError("Error creating student in database")
+
+    async def bulk_create(self, rows: List[dict]) -> List[Row]:
+        """
+        Creates many students with a single multi-row INSERT.
+
+        Rows that conflict with an existing student are skipped, by
+        `student_keys` under `SKIP_CONFLICTS`, instead of aborting the
+        statement, and are simply missing from the returned rows.
+
+        Parameters
+        ----------
+        rows : list
+            the validated column values of each student
+
+        Returns
+        -------
+        list
+            the id and phone number of every student that was inserted
+        """
+        async with self.database.async_session() as session:
+            try:
+                await session.execute(SKIP_CONFLICTS)
+                stmt = pg_insert(Student.__table__) \
+                            .values(rows) \
+                                .on_conflict_do_nothing() \
+                                    .returning(Student.id, Student.phone_number)
+                created = (await session.execute(stmt)).fetchall()
+                await session.commit()
+                coreLogger.info("Created %s of %s students in bulk", len(created), len(rows))
+                return created
+            except SQLAlchemyError as e:
+                await session.rollback()
+                coreLogger.error("Failed to create students in bulk: %s", e)
+                raise CreationError("Error creating students in database")
+
+    async def update(
+        self,
+        id: int,
+        expected_versions: Optional[Collection[int]] = None,
+        **kwargs
+    ) -> dict:
+        """
+        Updates a student in the database by their id and bumps their version.
+
+        With `expected_versions` the version is part of the WHERE clause, so
+        a stale write matches no row and fails without waiting on a lock.
+
+        Parameters
+        ----------
+        id : int
+            the student's id
+        expected_versions : Collection[int], optional
+            the versions the update is allowed to overwrite
+        **kwargs : dict
+            arbitrary keyword arguments
+
+        Returns
+        -------
+        dict
+            whether the update was successful and the new version
+
+        Raises
+        ------
+        VersionConflictError
+            if the student exists at a version that was not expected
+        """
+        async with self.database.async_session() as session:
+            try:
+                stmt = update(Student) \
+                            .where(by_key(Student.id, id))
+                if expected_versions is not None:
+                    stmt = stmt.where(Student.version.in_(expected_versions))
+                stmt = stmt.values(version=Student.version + 1, **kwargs) \
+                            .returning(Student.version)
+                version = (await session.execute(stmt)).scalar()
+                if version is None and expected_versions is not None:
+                    await self._check_exists(session, id)
+                await session.commit()
+                if version is not None:
+                    coreLogger.info("Updated student with id %s", id)
+                return {'result': f'{version is not None}', 'version': version}
+            except SQLAlchemyError as e:
+                await session.rollback()
+                coreLogger.error("Failed to update student with id %s: %s", id, e)
+                raise UpdateError(
+                    f"Error updating student with id {id} in database"
+                )
+
+    async def delete(
+        self,
+        id: int,
+        expected_versions: Optional[Collection[int]] = None
+    ) -> dict:
+        """
+        Deletes a student from the database by their id.
+
+        Parameters
+        ----------
+        id : int
+            the student's id
+        expected_versions : Collection[int], optional
+            the versions the delete is allowed to remove
+
+        Returns
+        -------
+        dict
+            whether the delete was successful
+
+        Raises
+        ------
+        VersionConflictError
+            if the student exists at a version that was not expected
+        """
+        async with self.database.async_session() as session:
+            try:
+                stmt = delete(Student) \
+                            .where(by_key(Student.id, id))
+                if expected_versions is not None:
+                    stmt = stmt.where(Student.version.in_(expected_versions))
+                result = await session.execute(stmt)
+                if not result.rowcount and expected_versions is not None:
+                    await self._check_exists(session, id)
+                await session.commit()
+                if result.rowcount:
+                    coreLogger.info("Deleted student with id %s", id)
+                return {'result': f'{result.rowcount > 0}'}
+            except SQLAlchemyError as e:
+                await session.rollback()
+                coreLogger.error("Failed to delete student with id %s: %s", id, e)
+                raise DeletionError(
+                    f"Error deleting student with id {id} from database"
+                )
+
+    async def _check_exists(self, session, id: int) -> None:
+        """
+        Tells a version conflict apart from a missing student after a
+        conditional write matched no row.
+        """
+        stmt = select(Student.id).where(by_key(Student.id, id))
+        if (await session.execute(stmt)).first() is not None:
+            coreLogger.info("Version conflict writing student with id %s", id)
+            raise VersionConflictError()
+
+    async def batch(self, groups: List[BatchGroup], atomic: bool) -> Dict[int, dict]:
+        """
+        Runs groups of create, update and delete operations in one transaction.
+
+        Each group is a run of consecutive operations of the same kind and is
+        sent as a single statement: a multi-row INSERT for creates, an
+        executemany UPDATE for updates and a DELETE over an id array for
+        deletes, so request order is kept while round trips stay per group.
+
+        Without `atomic`, every group runs in a savepoint; a group hitting a
+        constraint is retried one operation at a time to pin the failure on
+        the offending operations only. With `atomic`, the first failed
+        operation rolls back the whole transaction.
+
+        Parameters
+        ----------
+        groups : list
+            the operation groups, in request order
+        atomic : bool
+            whether any failed operation rolls back the whole batch
+
+        Returns
+        -------
+        dict
+            the result of every operation, keyed by its index
+
+        Raises
+        ------
+        BatchError
+            If the transaction fails for a reason other than an operation.
+        """
+        results: Dict[int, dict] = {}
+        async with self.database.async_session() as session:
+            try:
+                for op, items in groups:
+                    if atomic:
+                        try:
+                            group_results = await self._run_group(session, op, items)
+                        except IntegrityError as e:
+                            group_results = {
+                                index: batch_result(
+                                    index, op, BatchOperationStatus.CONFLICT, id,
+                                    error=str(e.orig)
+                                )
+                                for index, id, _ in items
+                            }
+                    else:
+                        group_results = await self._run_group_isolated(session, op, items)
+                    results.update(group_results)
+                    if atomic and any(
+                        result['status'] != BatchOperationStatus.OK
+                        for result in group_results.values()
+                    ):
+                        await session.rollback()
+                        coreLogger.info("Rolled back atomic batch of %s operations", len(results))
+                        return abort_batch(results, groups)
+                await session.commit()
+                coreLogger.info("Committed batch of %s operations", len(results))
+                return results
+            except SQLAlchemyError as e:
+                await session.rollback()
+                coreLogger.error("Failed to run batch: %s", e)
+                raise BatchError("Error running batch in database")
+
+    async def _run_group_isolated(self, session, op: BatchOperation, items: list) -> Dict[int, dict]:
+        """
+        Runs one group in a savepoint, splitting it up if a constraint fails.
+        """
+        try:
+            async with session.begin_nested():
+                return await self._run_group(session, op, items)
+        except IntegrityError as e:
+            if len(items) == 1:
+                index, id, _ = items[0]
+                return {
+                    index: batch_result(
+                        index, op, BatchOperationStatus.CONFLICT, id, error=str(e.orig)
+                    )
+                }
+            results = {}
+            for item in items:
+                results.update(await self._run_group_isolated(session, op, [item]))
+            return results
+
+    async def _run_group(self, session, op: BatchOperation, items: list) -> Dict[int, dict]:
+        """
+        Runs one group of operations of the same kind as a single statement.
+        """
+        table = Student.__table__
+        results = {}
+        if op == BatchOperation.CREATE:
+            stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+            created = await session.execute(stmt, [values for _, _, values in items])
+            for (index, _, _), (id,) in zip(items, created):
+                results[index] = batch_result(index, op, BatchOperationStatus.OK, id)
+        elif op == BatchOperation.UPDATE:
+            ids = {id for _, id, _ in items}
+            existing = set((await session.execute(
+                select(StudentKey.id).where(StudentKey.id.in_(ids))
+            )).scalars())
+            params = []
+            for index, id, values in items:
+                if id in existing:
+                    params.append({'b_id': id, **{f'b_{key}': value for key, value in values.items()}})
+                    results[index] = batch_result(index, op, BatchOperationStatus.OK, id)
+                else:
+                    results[index] = batch_result(index, op, BatchOperationStatus.NOT_FOUND, id)
+            if params:
+                columns = items[0][2].keys()
+                stmt = update(table) \
+                            .where(by_key(table.c.id, bindparam('b_id'))) \
+                                .values({
+                                    table.c.version: table.c.version + 1,
+                                    **{key: bindparam(f'b_{key}') for key in columns}
+                                })
+                await session.execute(stmt, params)
+        else:
+            stmt = delete(table) \
+                        .where(table.c.id.in_({id for _, id, _ in items})) \
+                            .returning(table.c.id)
+            deleted = set((await session.execute(stmt)).scalars())
+            for index, id, _ in items:
+                if id in deleted:
+                    deleted.discard(id)
+                    results[index] = batch_result(index, op, BatchOperationStatus.OK, id)
+                else:
+                    results[index] = batch_result(index, op, BatchOperationStatus.NOT_FOUND, id)
+        return results
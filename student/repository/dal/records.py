@@ -0,0 +1,140 @@
+from dataclasses import dataclass, make_dataclass
+from datetime import date
+from functools import lru_cache
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import Date, cast
+
+from student.helpers.enums import (
+    GenderOptions,
+    GradeOptions
+)
+from student.helpers.exceptions import InvalidFieldsError
+from student.models import Student
+
+TABLE = Student.__table__
+# every model column, in table order; sparse fieldsets are validated against
+# these and always put back into this order
+STUDENT_FIELDS: Tuple[str, ...] = tuple(column.name for column in TABLE.columns)
+# the fields of `StudentResponseSchema`, served when no fieldset is asked for
+DEFAULT_FIELDS: Tuple[str, ...] = (
+    'id',
+    'first_name',
+    'last_name',
+    'phone_number',
+    'gender',
+    'birth_date',
+    'education',
+    'graduation_date',
+    'address',
+)
+# `StudentResponseSchema` serves these as dates rather than timestamps
+DATE_FIELDS = {'birth_date', 'graduation_date'}
+
+
+@dataclass(slots=True)
+class StudentRecord:
+    """
+    A read-only projection of a student, built straight from a result row.
+
+    Records skip the ORM entirely: no identity map, no attribute
+    instrumentation and no per-row `Row` wrapper. Their fields are exactly
+    those of `StudentResponseSchema`, already in their serialized types, so
+    orjson encodes them natively without a response model. Sparse fieldsets
+    get records of their own from `record_type()`.
+
+    Examples
+    --------
+    >>> stmt = select(*record_columns(DEFAULT_FIELDS))
+    >>> records = [StudentRecord(*row) for row in connection.execute(stmt)]
+    >>> orjson.dumps(records[0])
+    b'{"id":1,"first_name":"Ali",...}'
+    """
+    id: int
+    first_name: Optional[str]
+    last_name: Optional[str]
+    phone_number: Optional[str]
+    gender: Optional[GenderOptions]
+    birth_date: Optional[date]
+    education: Optional[GradeOptions]
+    graduation_date: Optional[date]
+    address: Optional[str]
+
+
+def parse_fields(value: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Validates a comma separated sparse fieldset.
+
+    `id` is always part of a fieldset, since it identifies the student and
+    positions the pagination cursor.
+
+    Parameters
+    ----------
+    value : str, optional
+        The `fields` query parameter, e.g. `first_name,last_name`.
+
+    Returns
+    -------
+    tuple or None
+        The requested fields in table order, or None if no fieldset was
+        given.
+
+    Raises
+    ------
+    InvalidFieldsError
+        If a field is not a column of the student model.
+    """
+    if value is None:
+        return None
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = sorted(requested.difference(STUDENT_FIELDS))
+    if unknown:
+        raise InvalidFieldsError(unknown)
+    requested.add('id')
+    return tuple(name for name in STUDENT_FIELDS if name in requested)
+
+
+def record_columns(fields: Tuple[str, ...]) -> tuple:
+    """
+    Returns the select list of a fieldset, shaped like the JSON API.
+
+    Parameters
+    ----------
+    fields : tuple of str
+        Validated fields, as returned by `parse_fields()`.
+
+    Returns
+    -------
+    tuple
+        One column expression per field, dates cast in the query so no
+        per-row conversion is left to do in Python.
+    """
+    return tuple(
+        cast(TABLE.c[name], Date).label(name) if name in DATE_FIELDS else TABLE.c[name]
+        for name in fields
+    )
+
+
+@lru_cache(maxsize=128)
+def record_type(fields: Tuple[str, ...], extra: Tuple[str, ...] = ()) -> type:
+    """
+    Returns the slotted record class of a fieldset.
+
+    Parameters
+    ----------
+    fields : tuple of str
+        Validated fields, as returned by `parse_fields()`.
+    extra : tuple of str
+        Computed fields selected after the columns, e.g. a search score.
+
+    Returns
+    -------
+    type
+        `StudentRecord` for the default fields, otherwise a slots dataclass
+        with exactly the given fields, created once per fieldset.
+    """
+    if fields == DEFAULT_FIELDS and not extra:
+        return StudentRecord
+    return make_dataclass(
+        'StudentRecord', [(name, Any) for name in fields + extra], slots=True
+    )
@@ -0,0 +1,858 @@
+import asyncio
+import heapq
+import os
+from collections import Counter, defaultdict
+from contextlib import suppress
+from itertools import islice
+from operator import attrgetter, itemgetter
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar
+)
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import SQLAlchemyError
+
+from database.shards import place
+from kernel.settings.logging import coreLogger
+from kernel.settings import sharding as sharding_settings
+from student.helpers.enums import (
+    BatchOperation,
+    BatchOperationStatus,
+    ShardKey,
+    StudentSortOptions
+)
+from student.helpers.exceptions import (
+    CreationError,
+    RetrievalError,
+    UpdateError,
+    VersionConflictError
+)
+from student.helpers.validators import normalize_phone_number
+from student.models import Student, StudentKey
+from .filters import by_key, sort_key
+from .interface import IDataAccessLayer
+from .metrics import instrumented
+from .queryset import (
+    AsyncStudentDataAccessLayer,
+    BatchGroup,
+    abort_batch,
+    batch_result,
+    build_page
+)
+from .records import (
+    DEFAULT_FIELDS,
+    StudentRecord
+)
+
+T = TypeVar('T')
+
+# ids are reserved from the sequence of the first shard, the one every
+# student got their id from before sharding
+RESERVE_IDS = text(
+    "SELECT nextval(pg_get_serial_sequence('students', 'id')) FROM generate_series(1, :count)"
+)
+
+
+async def gather(*aws: Awaitable[T]) -> List[T]:
+    """
+    Awaits concurrently, then raises the first error if any failed.
+
+    Unlike a plain `asyncio.gather`, every awaitable has finished by the
+    time an error is raised, so no shard is left working unobserved.
+    """
+    results = await asyncio.gather(*aws, return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+
+def unique(rows: Iterable[T], key: Callable[[T], Any]) -> Iterator[T]:
+    """
+    Drops the rows whose key equals the previous row's.
+
+    While a rebalance moves a student, both shards may hold them for an
+    instant; in a merged order both copies are next to each other.
+    """
+    last = object()
+    for row in rows:
+        current = key(row)
+        if current != last:
+            last = current
+            yield row
+
+
+def page_order(width: int, name: str, descending: bool) -> Callable[[Row], tuple]:
+    """
+    Returns the key ordering page rows like `_page_rows()` selects them.
+
+    Students without a sort value come last in both directions, so they
+    get the smallest key when the merge runs in reverse, the largest
+    otherwise.
+    """
+    if name == 'id':
+        return lambda row: (row[width],)
+    if descending:
+        return lambda row: (row[width] is not None, row[width], row[width + 1])
+    return lambda row: (row[width] is None, row[width], row[width + 1])
+
+
+async def merge_batches(
+    streams: List[AsyncIterator[Sequence[Row]]],
+    key: Callable[[Row], Any],
+    batch_size: int
+) -> AsyncIterator[List[Row]]:
+    """
+    Merges streams of batches sorted by `key` into batches in the same order.
+
+    The next batch of every stream is fetched while the current one is
+    merged, so the shards stream concurrently. Every stream is closed when
+    the merge ends, early or not.
+
+    Parameters
+    ----------
+    streams : list
+        async iterators of batches, each sorted by `key` across batches
+    key : callable
+        the unique sort key of a row
+    batch_size : int
+        the number of rows per merged batch
+
+    Yields
+    ------
+    list
+        batches of rows in `key` order, without duplicate keys
+    """
+    fetches: List[Optional[asyncio.Future]] = [
+        asyncio.ensure_future(anext(stream, None)) for stream in streams
+    ]
+    batches: List[Sequence[Row]] = [()] * len(streams)
+    offsets = [0] * len(streams)
+    heads: List[Tuple[Any, int]] = []
+
+    async def advance(index: int) -> None:
+        batch = await fetches[index]
+        if not batch:
+            fetches[index] = None
+            return
+        batches[index], offsets[index] = batch, 0
+        fetches[index] = asyncio.ensure_future(anext(streams[index], None))
+        heapq.heappush(heads, (key(batch[0]), index))
+
+    try:
+        for index in range(len(streams)):
+            await advance(index)
+        merged: List[Row] = []
+        last = object()
+        while heads:
+            current, index = heapq.heappop(heads)
+            row = batches[index][offsets[index]]
+            offsets[index] += 1
+            if current != last:
+                merged.append(row)
+                last = current
+            if offsets[index] < len(batches[index]):
+                heapq.heappush(heads, (key(batches[index][offsets[index]]), index))
+            else:
+                await advance(index)
+            if len(merged) == batch_size:
+                yield merged
+                merged = []
+        if merged:
+            yield merged
+    finally:
+        for fetch in fetches:
+            if fetch is not None:
+                fetch.cancel()
+                with suppress(BaseException):
+                    await fetch
+        for stream in streams:
+            await stream.aclose()
+
+
+class IdAllocator:
+    """
+    Hands out student ids reserved in blocks from the first shard's sequence.
+
+    Shards other than the first never use their own sequence, so ids stay
+    unique across shards and can place a student before they are inserted.
+    Ids reserved but not handed out when a process exits are never used,
+    like those of a sequence cache. A forked child drops the ids it
+    inherited, which its parent may hand out as well.
+
+    Parameters
+    ----------
+    block_size : int
+        The ids reserved beyond those asked for, per round trip.
+
+    Examples
+    --------
+    >>> ids = IdAllocator(100)
+    >>> await ids.take(3)
+    [10026, 10027, 10028]
+    """
+
+    def __init__(self, block_size: int) -> None:
+        self.block_size = block_size
+        self._ids: List[int] = []
+        os.register_at_fork(after_in_child=self._ids.clear)
+
+    async def take(self, count: int) -> List[int]:
+        """
+        Hands out new ids.
+
+        Parameters
+        ----------
+        count : int
+            the number of ids
+
+        Returns
+        -------
+        list
+            `count` ids no other call, in any process, hands out
+
+        Raises
+        ------
+        CreationError
+            If ids could not be reserved.
+        """
+        while len(self._ids) < count:
+            self._ids.extend(await self._reserve(count - len(self._ids) + self.block_size))
+        ids = self._ids[:count]
+        del self._ids[:count]
+        return ids
+
+    @staticmethod
+    async def _reserve(count: int) -> List[int]:
+        try:
+            async with Student.database.async_engine.connect() as connection:
+                ids = (await connection.execute(RESERVE_IDS, {'count': count})).scalars().all()
+            return sorted(ids)
+        except SQLAlchemyError as e:
+            coreLogger.error("Failed to reserve %s student ids: %s", count, e)
+            raise CreationError("Error reserving student ids")
+
+
+@instrumented('sharded')
+class ShardedStudentDataAccessLayer(IDataAccessLayer):
+    """
+    Spreads students over several databases by a hash of their shard key.
+
+    The shards are `Student.database`, the first one, followed by its
+    `shards`, each served by an `AsyncStudentDataAccessLayer` of its own.
+    A student belongs to the shard `place()` picks for their shard key, the
+    id or the canonical phone number, given the number of shards:
+
+    - Reads and writes of one student by their shard key go to their shard
+      alone. By the other key, every shard is asked at once.
+    - Lists, searches and exports are scattered to every shard at once and
+      their sorted results gathered with a k-way merge that keeps their
+      order, so a page costs one query per shard.
+    - New students get an id from `IdAllocator` before they are placed.
+
+    While `python -m student.rebalancer` moves students to the shards they
+    now belong to, a student missing from their shard is looked up on all
+    the others, then on their shard again, since they may have been moved
+    there meanwhile.
+
+    Each shard only enforces uniqueness among its own students: sharded by
+    id, two students on different shards may share a phone number, and
+    sharded by phone number, a client given id may be taken on another
+    shard. Batches and bulk inserts commit on each shard separately, so an
+    atomic batch may only touch one shard. Public methods are timed by
+    `instrumented`, and the calls to each shard under the `async` label.
+
+    Parameters
+    ----------
+    key : str, optional
+        The `ShardKey` students are placed by, `SHARD_KEY` by default.
+    id_block_size : int, optional
+        The ids reserved per round trip, see `IdAllocator`, `ID_BLOCK_SIZE`
+        by default.
+
+    Examples
+    --------
+    >>> dal = ShardedStudentDataAccessLayer(key='id')
+    >>> students, last = await dal.get_page(20)
+    """
+
+    def __init__(self, key: Optional[str] = None, id_block_size: Optional[int] = None) -> None:
+        self.key = ShardKey(sharding_settings.SHARD_KEY if key is None else key)
+        self.ids = IdAllocator(
+            sharding_settings.ID_BLOCK_SIZE if id_block_size is None else id_block_size
+        )
+        self._databases: Optional[tuple] = None
+        self._layers: Tuple[AsyncStudentDataAccessLayer, ...] = ()
+
+    @property
+    def layers(self) -> Tuple[AsyncStudentDataAccessLayer, ...]:
+        """The data access layer of every shard, the first shard's first."""
+        shards = Student.database.shards
+        # the shards are created again after a fork or a dispose
+        if shards is not self._databases:
+            self._layers = tuple(
+                AsyncStudentDataAccessLayer(database)
+                for database in (Student.database, *shards)
+            )
+            self._databases = shards
+        return self._layers
+
+    def shard_of(self, values: Dict[str, Any]) -> int:
+        """
+        Returns the index of the shard a student belongs to.
+
+        Parameters
+        ----------
+        values : dict
+            the student's columns, at least their shard key
+
+        Returns
+        -------
+        int
+            the index of the shard in `layers`
+        """
+        value = values[self.key]
+        if self.key is ShardKey.PHONE_NUMBER:
+            value = normalize_phone_number(value)
+        return place(value, len(self.layers))
+
+    async def _point(
+        self,
+        value: Any,
+        by_key: bool,
+        operation: Callable[[AsyncStudentDataAccessLayer], Awaitable[Optional[T]]]
+    ) -> Optional[T]:
+        """
+        Runs a read or write of one student on the shard holding them.
+
+        `operation` returns None on a shard without the student. Looked up
+        by the shard key, the student's own shard is tried alone first,
+        then all the others and that shard again; otherwise, all shards at
+        once.
+        """
+        layers = self.layers
+        home = None
+        if by_key:
+            home = layers[self.shard_of({self.key: value})]
+            result = await operation(home)
+            if result is not None or len(layers) == 1:
+                return result
+        for result in await gather(*(operation(layer) for layer in layers if layer is not home)):
+            if result is not None:
+                return result
+        return None if home is None else await operation(home)
+
+    async def _holding(self, layer: AsyncStudentDataAccessLayer, ids: Collection[int]) -> Set[int]:
+        """Returns which of the ids a shard holds, read from its primary."""
+        try:
+            async with layer.database.async_engine.connect() as connection:
+                stmt = select(StudentKey.id).where(StudentKey.id.in_(ids))
+                return set((await connection.execute(stmt)).scalars())
+        except SQLAlchemyError as e:
+            coreLogger.error("Failed to locate %s students: %s", len(ids), e)
+            raise RetrievalError("Error locating students in database")
+
+    async def _locate(self, ids: Collection[int]) -> Dict[int, int]:
+        """
+        Finds the shard of every student, by the index of the shard.
+
+        Students on no shard are left out; a student being moved, found
+        on two shards, is located on the one they belong to.
+        """
+        if not ids:
+            return {}
+        layers = self.layers
+        located: Dict[int, int] = {}
+        for index, held in enumerate(await gather(*(self._holding(layer, ids) for layer in layers))):
+            for id in held:
+                if id not in located or (
+                    self.key is ShardKey.ID and place(id, len(layers)) == index
+                ):
+                    located[id] = index
+        return located
+
+    async def get_all(self) -> List[Row]:
+        """
+        Retrieves all students from every shard, ordered by id.
+
+        Returns
+        -------
+        list
+            a list of Student objects
+        """
+        parts = await gather(*(layer.get_all() for layer in self.layers))
+        rows = sorted((row for part in parts for row in part), key=lambda row: row[0].id)
+        return list(unique(rows, key=lambda row: row[0].id))
+
+    async def get_page(
+        self,
+        limit: int,
+        after: Optional[List[Any]] = None,
+        fields: Tuple[str, ...] = DEFAULT_FIELDS,
+        filters: Optional[dict] = None,
+        sort: StudentSortOptions = StudentSortOptions.ID
+    ) -> Tuple[List[StudentRecord], Optional[List[Any]]]:
+        """
+        Retrieves one page of filtered, sorted students from every shard.
+
+        Every shard seeks its own page past the same keyset position, and
+        the pages are merged in sort order; the first `limit` rows of the
+        merge are the page, and cursors are the same as unsharded.
+
+        Parameters
+        ----------
+        limit : int
+            the maximum number of students to return
+        after : list, optional
+            the keyset position of the last student of the previous page,
+            as stored in its cursor
+        fields : tuple of str
+            the validated fieldset to select, including `id`
+        filters : dict, optional
+            the non-null fields of a `StudentFilterSchema`
+        sort : StudentSortOptions
+            the order of the page
+
+        Returns
+        -------
+        tuple
+            a list of StudentRecord objects, or records of the fieldset, and
+            the keyset position of the last one if another page follows
+        """
+        name, _, descending = sort_key(sort)
+        pages = await gather(*(
+            layer._page_rows(limit, after, fields, filters, sort) for layer in self.layers
+        ))
+        merged = heapq.merge(*pages, key=page_order(len(fields), name, descending), reverse=descending)
+        rows = list(islice(unique(merged, key=itemgetter(-1)), limit + 1))
+        students, last = build_page(rows, limit, fields)
+        coreLogger.debug("Retrieved a page of %s students from %s shards", len(students), len(pages))
+        return students, last
+
+    async def search(
+        self,
+        q: str,
+        limit: int,
+        threshold: float,
+        fields: Tuple[str, ...] = DEFAULT_FIELDS,
+        include_address: bool = False
+    ) -> List[StudentRecord]:
+        """
+        Finds the students whose name best matches a query, on every shard.
+
+        Every shard ranks its own best `limit` matches, and the best
+        `limit` of all of them are kept.
+
+        Parameters
+        ----------
+        q : str
+            the search text
+        limit : int
+            the maximum number of students to return
+        threshold : float
+            the minimum word similarity, between 0 and 1
+        fields : tuple of str
+            the validated fieldset to select, including `id`
+        include_address : bool
+            whether to match the address as well as the name
+
+        Returns
+        -------
+        list
+            records of the fieldset plus their `score`, best match first
+        """
+        results = await gather(*(
+            layer.search(q, limit, threshold, fields, include_address) for layer in self.layers
+        ))
+        merged = heapq.merge(*results, key=lambda student: (-student.score, student.id))
+        return list(islice(unique(merged, key=attrgetter('id')), limit))
+
+    async def get_stats(self) -> List[tuple]:
+        """
+        Retrieves the student counts per education, gender and enrollment
+        month, summed over every shard.
+
+        Returns
+        -------
+        list
+            tuples of education, gender, month and count
+        """
+        counts: Counter = Counter()
+        for buckets in await gather(*(layer.get_stats() for layer in self.layers)):
+            for education, gender, month, count in buckets:
+                counts[education, gender, month] += count
+        return [(*bucket, count) for bucket, count in counts.items() if count]
+
+    async def rebuild_stats(self) -> int:
+        """
+        Recomputes the student statistics of every shard from scratch.
+
+        Returns
+        -------
+        int
+            the number of students counted
+        """
+        return sum(await gather(*(layer.rebuild_stats() for layer in self.layers)))
+
+    async def stream_all(
+        self,
+        batch_size: int = 1000,
+        fields: Optional[Tuple[str, ...]] = None
+    ) -> AsyncIterator[Sequence[Row]]:
+        """
+        Streams every student of every shard, merged in id order, in batches.
+
+        Parameters
+        ----------
+        batch_size : int
+            the number of rows fetched from each shard's cursor per round
+            trip, and per merged batch
+        fields : tuple of str, optional
+            the validated fieldset to select, all columns by default
+
+        Yields
+        ------
+        list
+            batches of rows ordered by id
+        """
+        position = 0 if fields is None else fields.index('id')
+        streams = [layer.stream_all(batch_size, fields) for layer in self.layers]
+        async for batch in merge_batches(streams, itemgetter(position), batch_size):
+            yield batch
+
+    async def get_one(self, id: int) -> Optional[Row]:
+        """
+        Retrieves a student by their id from the shard holding them.
+
+        Parameters
+        ----------
+        id : int
+            the student's id
+
+        Returns
+        -------
+        Student
+            a Student object
+        """
+        return await self._point(id, self.key is ShardKey.ID, lambda layer: layer.get_one(id))
+
+    async def get_record(
+        self,
+        id: int,
+        fields: Tuple[str, ...]
+    ) -> Optional[Tuple[StudentRecord, int]]:
+        """
+        Retrieves a sparse fieldset of a student by their id.
+
+        Parameters
+        ----------
+        id : int
+            the student's id
+        fields : tuple of str
+            the validated fieldset to select, including `id`
+
+        Returns
+        -------
+        tuple
+            the record of the fieldset and the student's version, or None
+            if there is no such student
+        """
+        return await self._point(
+            id, self.key is ShardKey.ID, lambda layer: layer.get_record(id, fields)
+        )
+
+    async def get_by_phone(
+        self,
+        phone_number: str,
+        fields: Tuple[str, ...] = DEFAULT_FIELDS
+    ) -> Optional[Tuple[StudentRecord, int]]:
+        """
+        Retrieves a student by their canonical phone number.
+
+        Parameters
+        ----------
+        phone_number : str
+            the canonical phone number
+        fields : tuple of str
+            the validated fieldset to select, including `id`
+
+        Returns
+        -------
+        tuple
+            the record of the fieldset and the student's version, or None
+            if no student has the phone number
+        """
+        return await self._point(
+            phone_number,
+            self.key is ShardKey.PHONE_NUMBER,
+            lambda layer: layer.get_by_phone(phone_number, fields)
+        )
+
+    async def get_version(self, id: int) -> Optional[int]:
+        """
+        Retrieves only the row version of a student by their id.
+
+        Parameters
+        ----------
+        id : int
+            the student's id
+
+        Returns
+        -------
+        int
+            the student's version, or None if there is no such student
+        """
+        return await self._point(id, self.key is ShardKey.ID, lambda layer: layer.get_version(id))
+
+    async def create(self, **kwargs) -> Row:
+        """
+        Creates a new student on the shard they belong to.
+
+        Parameters
+        ----------
+        **kwargs : dict
+            arbitrary keyword arguments; an id is reserved if none is given
+
+        Returns
+        -------
+        Student
+            a newly created Student object
+        """
+        if kwargs.get('id') is None:
+            kwargs['id'], = await self.ids.take(1)
+        return await self.layers[self.shard_of(kwargs)].create(**kwargs)
+
+    async def bulk_create(self, rows: List[dict]) -> List[Row]:
+        """
+        Creates many students, with one multi-row INSERT per shard.
+
+        The inserts run concurrently and commit separately: if one shard
+        fails, the students of the others are created all the same, though
+        the whole call fails.
+
+        Parameters
+        ----------
+        rows : list
+            the validated column values of each student
+
+        Returns
+        -------
+        list
+            the id and phone number of every student that was inserted
+        """
+        parts: Dict[int, List[dict]] = defaultdict(list)
+        for id, row in zip(await self.ids.take(len(rows)), rows):
+            row = {**row, 'id': id}
+            parts[self.shard_of(row)].append(row)
+        layers = self.layers
+        created = await gather(*(layers[index].bulk_create(part) for index, part in parts.items()))
+        return [row for part in created for row in part]
+
+    async def update(
+        self,
+        id: int,
+        expected_versions: Optional[Collection[int]] = None,
+        **kwargs
+    ) -> dict:
+        """
+        Updates a student by their id on the shard holding them.
+
+        Sharded by phone number, a new phone number may place the student
+        on another shard, where they are moved.
+
+        Parameters
+        ----------
+        id : int
+            the student's id
+        expected_versions : Collection[int], optional
+            the versions the update is allowed to overwrite
+        **kwargs : dict
+            arbitrary keyword arguments
+
+        Returns
+        -------
+        dict
+            whether the update was successful and the new version
+
+        Raises
+        ------
+        VersionConflictError
+            if the student exists at a version that was not expected
+        """
+        missing = {'result': 'False', 'version': None}
+        if self.key is ShardKey.PHONE_NUMBER and 'phone_number' in kwargs:
+            located = await self._locate([id])
+            if id not in located:
+                return missing
+            source, target = located[id], self.shard_of(kwargs)
+            if source != target:
+                return await self._move(source, target, id, expected_versions, kwargs)
+            return await self.layers[source].update(id, expected_versions, **kwargs)
+
+        async def update(layer: AsyncStudentDataAccessLayer) -> Optional[dict]:
+            result = await layer.update(id, expected_versions, **kwargs)
+            return result if result['version'] is not None else None
+
+        return await self._point(id, self.key is ShardKey.ID, update) or missing
+
+    async def _move(
+        self,
+        source: int,
+        target: int,
+        id: int,
+        expected_versions: Optional[Collection[int]],
+        values: dict
+    ) -> dict:
+        """
+        Updates a student while moving them to another shard.
+
+        The student stays locked on their old shard until they were
+        inserted on the new one, so a concurrent write either comes first
+        and is moved along, or finds them on the new shard.
+        """
+        table = Student.__table__
+        layers = self.layers
+        async with layers[source].database.async_session() as old, \
+                layers[target].database.async_session() as new:
+            try:
+                stmt = select(table).where(by_key(table.c.id, id)).with_for_update()
+                row = (await old.execute(stmt)).mappings().first()
+                if row is None:
+                    return {'result': 'False', 'version': None}
+                if expected_versions is not None and row['version'] not in expected_versions:
+                    coreLogger.info("Version conflict writing student with id %s", id)
+                    raise VersionConflictError()
+                moved = {**row, **values, 'version': row['version'] + 1}
+                await new.execute(insert(table).values(moved))
+                await new.commit()
+                await old.execute(delete(table).where(by_key(table.c.id, id)))
+                await old.commit()
+            except SQLAlchemyError as e:
+                await new.rollback()
+                await old.rollback()
+                coreLogger.error("Failed to update student with id %s: %s", id, e)
+                raise UpdateError(
+                    f"Error updating student with id {id} in database"
+                )
+        coreLogger.info("Updated student with id %s, moved from shard %s to %s", id, source, target)
+        return {'result': 'True', 'version': moved['version']}
+
+    async def delete(
+        self,
+        id: int,
+        expected_versions: Optional[Collection[int]] = None
+    ) -> dict:
+        """
+        Deletes a student by their id from the shard holding them.
+
+        Parameters
+        ----------
+        id : int
+            the student's id
+        expected_versions : Collection[int], optional
+            the versions the delete is allowed to remove
+
+        Returns
+        -------
+        dict
+            whether the delete was successful
+
+        Raises
+        ------
+        VersionConflictError
+            if the student exists at a version that was not expected
+        """
+        async def delete(layer: AsyncStudentDataAccessLayer) -> Optional[dict]:
+            result = await layer.delete(id, expected_versions)
+            return result if result['result'] == 'True' else None
+
+        return await self._point(id, self.key is ShardKey.ID, delete) or {'result': 'False'}
+
+    async def batch(self, groups: List[BatchGroup], atomic: bool) -> Dict[int, dict]:
+        """
+        Runs groups of operations, split into one transaction per shard.
+
+        Every operation goes to the shard of its student, keeping request
+        order within each shard, and the shards run concurrently. An atomic
+        batch touching more than one shard is aborted as a whole, since
+        their transactions cannot commit together; so is an update moving
+        a student to another shard, which has to be made on its own.
+
+        Parameters
+        ----------
+        groups : list
+            the operation groups, in request order
+        atomic : bool
+            whether any failed operation rolls back the whole batch
+
+        Returns
+        -------
+        dict
+            the result of every operation, keyed by its index
+
+        Raises
+        ------
+        BatchError
+            If a transaction fails for a reason other than an operation.
+        """
+        operations = [(op, item) for op, items in groups for item in items]
+        creates = sum(1 for op, _ in operations if op == BatchOperation.CREATE)
+        new_ids = iter(await self.ids.take(creates))
+        located = await self._locate({
+            id for op, (_, id, _) in operations if op != BatchOperation.CREATE
+        })
+
+        results: Dict[int, dict] = {}
+        shards: Dict[int, List[BatchGroup]] = defaultdict(list)
+        for op, (index, id, values) in operations:
+            if op == BatchOperation.CREATE:
+                values = {**values, 'id': next(new_ids)}
+                shard = self.shard_of(values)
+            elif id in located:
+                shard = located[id]
+                if op == BatchOperation.UPDATE and self.key in values \
+                        and self.shard_of(values) != shard:
+                    results[index] = batch_result(
+                        index, op, BatchOperationStatus.INVALID, id,
+                        error="moves the student to another shard, update them on their own"
+                    )
+                    continue
+            else:
+                # a shard reports the student as not found
+                shard = 0
+            shard_groups = shards[shard]
+            if shard_groups and shard_groups[-1][0] == op:
+                shard_groups[-1][1].append((index, id, values))
+            else:
+                shard_groups.append((op, [(index, id, values)]))
+
+        if atomic and results:
+            return abort_batch(results, groups)
+        if atomic and len(shards) > 1:
+            return {
+                index: batch_result(
+                    index, op, BatchOperationStatus.ABORTED, id,
+                    error="atomic batch spans several shards"
+                )
+                for op, (index, id, _) in operations
+            }
+        layers = self.layers
+        for shard_results in await gather(*(
+            layers[shard].batch(shard_groups, atomic) for shard, shard_groups in shards.items()
+        )):
+            results.update(shard_results)
+        return results
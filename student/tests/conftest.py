@@ -0,0 +1,120 @@
+"""
+Fixtures of the tests running against PostgreSQL.
+
+The whole session reads a copy of `settings.toml` naming `<DB_NAME>_test`
+instead, passed as `SETTINGS_FILE`, so no test can reach the configured
+database. That database is created and migrated to head once per session
+and dropped at its end; the tests needing it are skipped when the server
+cannot be reached or lacks the pg_trgm extension the migrations need.
+"""
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import tomllib
+from itertools import count
+from pathlib import Path
+from typing import Callable
+
+import psycopg
+import pytest
+from fastapi.testclient import TestClient
+from psycopg import sql
+
+from kernel.settings.base import BASE_DIR
+
+settings_directory = tempfile.TemporaryDirectory()
+
+
+def pytest_configure(config) -> None:
+    # before anything reads the settings, which are parsed only once
+    source = Path(os.environ.get('SETTINGS_FILE', BASE_DIR / 'settings.toml'))
+    settings = source.read_text()
+    name = tomllib.loads(settings)['settings']['database']['DB_NAME']
+    settings = re.sub(r'(?m)^(\s*DB_NAME\s*=\s*).*$', rf'\g<1>"{name}_test"', settings, count=1)
+    settings_file = Path(settings_directory.name) / 'settings.toml'
+    settings_file.write_text(settings)
+    os.environ['SETTINGS_FILE'] = str(settings_file)
+
+
+def pytest_unconfigure(config) -> None:
+    settings_directory.cleanup()
+
+
+def connect_server() -> psycopg.Connection:
+    """Connects to the maintenance database of the configured server."""
+    from kernel.settings.database import DB_CONF
+
+    return psycopg.connect(
+        host=DB_CONF['DB_HOST'],
+        port=DB_CONF['DB_PORT'],
+        user=DB_CONF['DB_USER'],
+        password=DB_CONF['DB_PASSWORD'],
+        dbname='postgres',
+        autocommit=True
+    )
+
+
+@pytest.fixture(scope='session')
+def database() -> str:
+    """Creates and migrates the test database, dropping it afterwards."""
+    from kernel.settings.database import DB_NAME
+
+    try:
+        server = connect_server()
+    except psycopg.OperationalError as e:
+        pytest.skip(f"PostgreSQL is not reachable: {e}")
+    with server:
+        stmt = "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        if server.execute(stmt).fetchone() is None:
+            pytest.skip("PostgreSQL lacks the pg_trgm extension")
+        server.execute(sql.SQL('DROP DATABASE IF EXISTS {} WITH (FORCE)').format(
+            sql.Identifier(DB_NAME)
+        ))
+        server.execute(sql.SQL("CREATE DATABASE {} TEMPLATE template0 ENCODING 'UTF8'").format(
+            sql.Identifier(DB_NAME)
+        ))
+    try:
+        subprocess.run(
+            [sys.executable, '-m', 'alembic', 'upgrade', 'head'],
+            cwd=BASE_DIR,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        yield DB_NAME
+    finally:
+        with connect_server() as server:
+            server.execute(sql.SQL('DROP DATABASE IF EXISTS {} WITH (FORCE)').format(
+                sql.Identifier(DB_NAME)
+            ))
+
+
+@pytest.fixture(scope='session')
+def client(database: str) -> TestClient:
+    """Serves the application, with its lifespan, for the whole session."""
+    from kernel.application import create_app
+
+    with TestClient(create_app()) as client:
+        yield client
+
+
+@pytest.fixture(scope='session')
+def new_student() -> Callable[..., dict]:
+    """Builds the payload of a student with a phone number of its own."""
+    numbers = count(1)
+
+    def new_student(**values) -> dict:
+        return {
+            'first_name': 'Sara',
+            'last_name': 'Karimi',
+            'phone_number': f'0912{next(numbers):07d}',
+            'gender': 'FEMALE',
+            'birth_date': '2000-01-01',
+            'education': 'BACHELOR',
+            'graduation_date': '2024-06-30',
+            'address': 'Tehran',
+            **values,
+        }
+
+    return new_student
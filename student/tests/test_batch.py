@@ -0,0 +1,98 @@
+MISSING_ID = 10 ** 9
+
+
+def create_student(client, student: dict) -> int:
+    return client.post('/v1/students/bulk', json=[student]).json()['results'][0]['id']
+
+
+def run_batch(client, operations: list, atomic: bool = False) -> dict:
+    response = client.post(
+        '/v1/students/batch', json={'operations': operations, 'atomic': atomic}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def statuses(result: dict) -> list:
+    return [(item['index'], item['op'], item['status']) for item in result['results']]
+
+
+def test_failed_operations_do_not_fail_the_batch(client, new_student):
+    existing = new_student()
+    existing_id = create_student(client, existing)
+    doomed_id = create_student(client, new_student())
+    first, last = new_student(), new_student()
+
+    result = run_batch(client, [
+        {'op': 'create', 'data': first},
+        {'op': 'create', 'data': {**existing, 'first_name': 'Reza'}},
+        {'op': 'create', 'data': last},
+        {'op': 'update', 'id': existing_id, 'data': {**existing, 'first_name': 'Maryam'}},
+        {'op': 'update', 'id': MISSING_ID, 'data': existing},
+        {'op': 'delete', 'id': doomed_id},
+        {'op': 'delete', 'id': MISSING_ID},
+        {'op': 'create'},
+    ])
+
+    assert result['committed'] is True
+    assert statuses(result) == [
+        (0, 'create', 'ok'),
+        (1, 'create', 'conflict'),
+        (2, 'create', 'ok'),
+        (3, 'update', 'ok'),
+        (4, 'update', 'not_found'),
+        (5, 'delete', 'ok'),
+        (6, 'delete', 'not_found'),
+        (7, 'create', 'invalid'),
+    ]
+    assert result['results'][7]['error'] == 'data is required'
+    for item in (result['results'][0], result['results'][2]):
+        assert client.get(f"/v1/students/{item['id']}").status_code == 200
+    assert client.get(f'/v1/students/{existing_id}').json()['first_name'] == 'Maryam'
+    assert client.get(f'/v1/students/{doomed_id}').status_code == 404
+
+
+def test_updates_bump_the_version(client, new_student):
+    student = new_student()
+    id = create_student(client, student)
+    etag = client.get(f'/v1/students/{id}').headers['ETag']
+
+    run_batch(client, [{'op': 'update', 'id': id, 'data': student}])
+
+    assert client.get(f'/v1/students/{id}').headers['ETag'] != etag
+
+
+def test_atomic_batch_is_rolled_back_by_a_conflict(client, new_student):
+    existing = new_student()
+    existing_id = create_student(client, existing)
+    created = new_student()
+
+    result = run_batch(client, [
+        {'op': 'create', 'data': created},
+        {'op': 'update', 'id': existing_id, 'data': {**existing, 'first_name': 'Maryam'}},
+        {'op': 'create', 'data': {**existing, 'first_name': 'Reza'}},
+        {'op': 'delete', 'id': existing_id},
+    ], atomic=True)
+
+    assert result['committed'] is False
+    assert statuses(result) == [
+        (0, 'create', 'aborted'),
+        (1, 'update', 'aborted'),
+        (2, 'create', 'conflict'),
+        (3, 'delete', 'aborted'),
+    ]
+    assert client.get(f"/v1/students/by-phone/{created['phone_number']}").status_code == 404
+    assert client.get(f'/v1/students/{existing_id}').json()['first_name'] == existing['first_name']
+
+
+def test_atomic_batch_with_an_invalid_operation_runs_nothing(client, new_student):
+    created = new_student()
+
+    result = run_batch(client, [
+        {'op': 'create', 'data': created},
+        {'op': 'update', 'data': created},
+    ], atomic=True)
+
+    assert result['committed'] is False
+    assert statuses(result) == [(0, 'create', 'aborted'), (1, 'update', 'invalid')]
+    assert client.get(f"/v1/students/by-phone/{created['phone_number']}").status_code == 404
@@ -0,0 +1,65 @@
+import orjson
+
+
+def test_rows_are_reported_in_request_order(client, new_student):
+    existing = new_student()
+    assert client.post('/v1/students/bulk', json=[existing]).json()['created'] == 1
+    repeated = new_student()
+    rows = [
+        new_student(),
+        new_student(phone_number='12345'),
+        repeated,
+        {**existing, 'first_name': 'Reza'},
+        repeated,
+        new_student(gender='OTHER'),
+    ]
+
+    response = client.post('/v1/students/bulk', json=rows)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body['created'], body['failed']) == (2, 4)
+    results = body['results']
+    assert [result['index'] for result in results] == list(range(len(rows)))
+    assert [result['status'] for result in results] == [
+        'created', 'invalid', 'created', 'duplicate', 'duplicate', 'invalid'
+    ]
+    assert results[3]['error'] == 'conflicts with an existing student'
+    assert results[4]['error'] == 'phone_number repeated within the request'
+    assert results[5]['error'].startswith('gender:')
+    for result in (results[0], results[2]):
+        assert client.get(f"/v1/students/{result['id']}").status_code == 200
+
+
+def test_phone_numbers_are_stored_canonically(client, new_student):
+    row = new_student()
+    row['phone_number'] = '+98' + row['phone_number'][1:]
+
+    result = client.post('/v1/students/bulk', json=[row]).json()['results'][0]
+
+    student = client.get(f"/v1/students/{result['id']}").json()
+    assert student['phone_number'] == '0' + row['phone_number'][3:]
+
+
+def test_ndjson_lines_are_reported_on_their_own(client, new_student):
+    body = b'\n'.join([
+        orjson.dumps(new_student()),
+        b'{"first_name": ',
+        b'',
+        orjson.dumps(new_student()),
+    ])
+
+    response = client.post(
+        '/v1/students/bulk',
+        content=body,
+        headers={'Content-Type': 'application/x-ndjson'}
+    )
+
+    results = response.json()['results']
+    assert [result['status'] for result in results] == ['created', 'invalid', 'created']
+
+
+def test_body_must_be_an_array(client, new_student):
+    response = client.post('/v1/students/bulk', json=new_student())
+
+    assert response.status_code == 400
@@ -0,0 +1,117 @@
+import asyncio
+
+from student.repository.bll.cache import MISSING, EntityCache, LRUCacheBackend
+
+
+def new_cache() -> EntityCache:
+    return EntityCache(LRUCacheBackend(100), ttl=60, negative_ttl=5)
+
+
+class Loader:
+    """Loads `value` once released, counting its calls."""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def __call__(self, key):
+        self.calls += 1
+        self.started.set()
+        await self.release.wait()
+        return self.value
+
+
+def test_concurrent_misses_share_one_load():
+    async def run():
+        cache = new_cache()
+        loader = Loader('Ali')
+        first = asyncio.create_task(cache.get_or_load(1, loader))
+        await loader.started.wait()
+        second = asyncio.create_task(cache.get_or_load(1, loader))
+        await asyncio.sleep(0)
+        loader.release.set()
+        assert await asyncio.gather(first, second) == ['Ali', 'Ali']
+        assert loader.calls == 1
+        assert cache.stats()['coalesced'] == 1
+        assert await cache.peek(1) == 'Ali'
+
+    asyncio.run(run())
+
+
+def test_invalidated_load_is_not_stored():
+    async def run():
+        cache = new_cache()
+        stale = Loader('stale')
+        load = asyncio.create_task(cache.get_or_load(1, stale))
+        await stale.started.wait()
+        # a write lands while the old row is being read
+        await cache.invalidate(1)
+        stale.release.set()
+        # the caller that started the load still gets what it read
+        assert await load == 'stale'
+        assert await cache.peek(1) is MISSING
+
+        fresh = Loader('fresh')
+        fresh.release.set()
+        assert await cache.get_or_load(1, fresh) == 'fresh'
+        assert fresh.calls == 1
+        assert await cache.peek(1) == 'fresh'
+
+    asyncio.run(run())
+
+
+def test_load_after_invalidation_does_not_join_the_stale_one():
+    async def run():
+        cache = new_cache()
+        stale = Loader('stale')
+        first = asyncio.create_task(cache.get_or_load(1, stale))
+        await stale.started.wait()
+        await cache.invalidate(1)
+        fresh = Loader('fresh')
+        second = asyncio.create_task(cache.get_or_load(1, fresh))
+        await fresh.started.wait()
+        stale.release.set()
+        assert await first == 'stale'
+        fresh.release.set()
+        assert await second == 'fresh'
+        # the stale load ending did not drop the fresh one's flight
+        assert await cache.peek(1) == 'fresh'
+        assert cache.stats()['coalesced'] == 0
+
+    asyncio.run(run())
+
+
+def test_missing_entities_are_cached():
+    async def run():
+        cache = new_cache()
+        loader = Loader(None)
+        loader.release.set()
+        assert await cache.get_or_load(1, loader) is None
+        assert await cache.get_or_load(1, loader) is None
+        assert loader.calls == 1
+        assert cache.stats()['hits'] == 1
+
+    asyncio.run(run())
+
+
+def test_failed_load_is_raised_to_every_waiter_and_not_cached():
+    async def run():
+        cache = new_cache()
+        release = asyncio.Event()
+
+        async def failing(key):
+            await release.wait()
+            raise RuntimeError('database down')
+
+        first = asyncio.create_task(cache.get_or_load(1, failing))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(cache.get_or_load(1, failing))
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        assert [str(result) for result in results] == ['database down'] * 2
+        assert await cache.peek(1) is MISSING
+
+    asyncio.run(run())
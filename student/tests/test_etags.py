@@ -0,0 +1,55 @@
+import pytest
+
+from student.helpers.etags import (
+    etag_matches,
+    if_match_versions,
+    make_etag,
+    parse_etags
+)
+
+
+def test_etag_is_the_quoted_version():
+    assert make_etag(3) == '"3"'
+
+
+@pytest.mark.parametrize('header, tags', [
+    ('"1"', ['"1"']),
+    (' "1" , W/"2",, "3" ', ['"1"', 'W/"2"', '"3"']),
+    ('', []),
+    (' * ', None),
+])
+def test_parse_etags(header, tags):
+    assert parse_etags(header) == tags
+
+
+@pytest.mark.parametrize('header, versions', [
+    ('"3"', {3}),
+    ('"1", "2"', {1, 2}),
+    ('"1","1"', {1}),
+    ('*', None),
+    # `If-Match` compares strongly: weak tags never match
+    ('W/"3"', set()),
+    ('W/"3", "4"', {4}),
+    # tags that are not versions of this API are ignored
+    ('"abc"', set()),
+    ('""', set()),
+    ('"-1"', set()),
+    ('"1.5"', set()),
+    ('3', set()),
+    ('"3', set()),
+])
+def test_if_match_versions(header, versions):
+    assert if_match_versions(header) == versions
+
+
+@pytest.mark.parametrize('header, matches', [
+    ('"3"', True),
+    # `If-None-Match` compares weakly
+    ('W/"3"', True),
+    ('"1", "3"', True),
+    ('*', True),
+    ('"4"', False),
+    ('3', False),
+])
+def test_etag_matches(header, matches):
+    assert etag_matches(header, make_etag(3)) is matches
@@ -0,0 +1,106 @@
+import csv
+import io
+from pathlib import Path
+
+import pytest
+
+from student.helpers.enums import GradeOptions
+from student.helpers.exceptions import InvalidImportFileError
+from student.importer import import_students
+
+HEADER = [
+    'first_name', 'last_name', 'phone_number', 'gender', 'birth_date',
+    'education', 'graduation_date', 'address',
+]
+
+
+def csv_file(rows, header=HEADER) -> io.BytesIO:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    writer.writerows(rows)
+    return io.BytesIO(buffer.getvalue().encode())
+
+
+def csv_row(student: dict) -> list:
+    return [student[name] for name in HEADER]
+
+
+def test_rows_are_imported_and_rejects_written(client, new_student, tmp_path):
+    existing = new_student()
+    client.post('/v1/students/bulk', json=[existing])
+    valid, repeated = new_student(), new_student()
+    rows = [
+        csv_row(valid),
+        csv_row(new_student(phone_number='0912')),
+        csv_row(new_student(birth_date='2000-13-45')),
+        csv_row(repeated),
+        csv_row(repeated),
+        csv_row(existing),
+        csv_row(new_student(gender='male', education='doctrate')),
+    ]
+    rejects_path = tmp_path / 'rejects.csv'
+
+    result = import_students(csv_file(rows), rejects_path)
+
+    assert result == {
+        'total': 7,
+        'imported': 3,
+        'rejected': 4,
+        'rejects_path': str(rejects_path),
+    }
+    with open(rejects_path, newline='') as rejects_file:
+        rejects = [(row['record'], row['reject_reason']) for row in csv.DictReader(rejects_file)]
+    assert rejects == [
+        ('2', 'invalid phone_number'),
+        ('3', 'invalid birth_date'),
+        ('5', 'duplicate phone_number in file'),
+        ('6', 'conflicts with an existing student'),
+    ]
+    student = client.get(f"/v1/students/by-phone/{rows[6][2]}").json()
+    assert (student['gender'], student['education']) == ('MALE', GradeOptions.DOCTORATE.value)
+
+
+def test_nothing_rejected_writes_no_rejects_file(client, new_student, tmp_path):
+    rejects_path = tmp_path / 'rejects.csv'
+
+    result = import_students(csv_file([csv_row(new_student())]), rejects_path)
+
+    assert (result['imported'], result['rejects_path']) == (1, None)
+    assert not rejects_path.exists()
+
+
+@pytest.mark.parametrize('header, error', [
+    ([], 'missing header row'),
+    (HEADER + ['nickname'], 'unknown columns nickname'),
+    (HEADER + ['address'], 'repeated columns'),
+    (HEADER[1:], 'missing columns first_name'),
+])
+def test_invalid_headers_are_rejected(header, error):
+    with pytest.raises(InvalidImportFileError, match=error):
+        import_students(csv_file([], header))
+
+
+def test_upload(client, new_student):
+    student = new_student()
+    rows = [csv_row(student), csv_row(new_student(first_name=' '))]
+
+    response = client.post(
+        '/v1/students/import',
+        files={'file': ('students.csv', csv_file(rows), 'text/csv')}
+    )
+
+    assert response.status_code == 200
+    result = response.json()
+    assert (result['total'], result['imported'], result['rejected']) == (2, 1, 1)
+    Path(result['rejects_path']).unlink()
+    assert client.get(f"/v1/students/by-phone/{student['phone_number']}").status_code == 200
+
+
+def test_upload_with_invalid_header(client):
+    response = client.post(
+        '/v1/students/import',
+        files={'file': ('students.csv', csv_file([], ['nickname']), 'text/csv')}
+    )
+
+    assert response.status_code == 400
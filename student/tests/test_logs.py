@@ -0,0 +1,40 @@
+import logging
+
+from utils.logs import SampleFilter
+
+
+def record(level: int = logging.DEBUG, lineno: int = 10) -> logging.LogRecord:
+    return logging.LogRecord('core', level, 'queryset.py', lineno, 'read', None, None)
+
+
+def test_one_in_rate_routine_records_pass():
+    sample = SampleFilter(rate=3)
+    assert [sample.filter(record()) for _ in range(7)] == [
+        True, False, False, True, False, False, True
+    ]
+
+
+def test_call_sites_are_sampled_separately():
+    sample = SampleFilter(rate=2)
+    assert sample.filter(record(lineno=10))
+    assert sample.filter(record(lineno=20))
+    assert not sample.filter(record(lineno=10))
+    assert not sample.filter(record(lineno=20))
+
+
+def test_records_above_level_always_pass():
+    sample = SampleFilter(rate=100)
+    assert all(sample.filter(record(logging.INFO)) for _ in range(5))
+    assert all(sample.filter(record(logging.ERROR)) for _ in range(5))
+
+
+def test_level_is_configurable():
+    sample = SampleFilter(rate=100, level='INFO')
+    assert sample.filter(record(logging.INFO))
+    assert not sample.filter(record(logging.INFO))
+    assert all(sample.filter(record(logging.WARNING)) for _ in range(5))
+
+
+def test_rate_one_keeps_everything():
+    sample = SampleFilter()
+    assert all(sample.filter(record()) for _ in range(5))
@@ -0,0 +1,52 @@
+import base64
+import json
+from datetime import date
+
+import pytest
+
+from student.helpers.exceptions import InvalidCursorError
+from student.helpers.pagination import decode_cursor, encode_cursor
+
+
+def raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+@pytest.mark.parametrize('sort, values', [
+    ('id', [42]),
+    ('last_name', ['Rezaei', 7]),
+    ('last_name', [None, 7]),
+])
+def test_cursor_round_trip(sort, values):
+    assert decode_cursor(encode_cursor(sort, values), sort) == values
+
+
+def test_cursor_is_unpadded_and_url_safe():
+    cursor = encode_cursor('address', ['?&/+' * 5, 1])
+    assert '=' not in cursor
+    assert set(cursor) <= set('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_')
+
+
+def test_cursor_serializes_dates_as_strings():
+    cursor = encode_cursor('birth_date', [date(2000, 1, 2), 3])
+    assert decode_cursor(cursor, 'birth_date') == ['2000-01-02', 3]
+
+
+def test_cursor_of_another_sort_is_rejected():
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(encode_cursor('id', [42]), 'last_name')
+
+
+@pytest.mark.parametrize('cursor', [
+    '',
+    'not a cursor',
+    '%%%',
+    base64.urlsafe_b64encode(b'not json').decode(),
+    raw_cursor([1, 2]),
+    raw_cursor({'s': 'id'}),
+    raw_cursor({'s': 'id', 'v': []}),
+    raw_cursor({'s': 'id', 'v': 42}),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, 'id')
@@ -0,0 +1,96 @@
+import csv
+import io
+from dataclasses import fields
+
+import orjson
+import pytest
+
+from student.helpers.exceptions import InvalidFieldsError
+from student.helpers.pagination import encode_cursor
+from student.repository.dal.records import (
+    DEFAULT_FIELDS,
+    STUDENT_FIELDS,
+    StudentRecord,
+    parse_fields,
+    record_type
+)
+
+
+def test_no_fieldset():
+    assert parse_fields(None) is None
+
+
+@pytest.mark.parametrize('value, parsed', [
+    ('first_name', ('id', 'first_name')),
+    # table order, whatever the requested order
+    ('last_name,first_name', ('id', 'first_name', 'last_name')),
+    (' last_name , ,first_name,last_name ', ('id', 'first_name', 'last_name')),
+    ('id', ('id',)),
+    ('', ('id',)),
+])
+def test_parse_fields(value, parsed):
+    assert parse_fields(value) == parsed
+
+
+def test_every_field():
+    assert parse_fields(','.join(reversed(STUDENT_FIELDS))) == STUDENT_FIELDS
+
+
+def test_unknown_fields_are_listed():
+    with pytest.raises(InvalidFieldsError) as error:
+        parse_fields('first_name,zzz,password')
+    assert error.value.message == 'Unknown fields: password, zzz'
+
+
+def test_default_fields_use_student_record():
+    assert record_type(DEFAULT_FIELDS) is StudentRecord
+
+
+def test_fieldset_record():
+    record = record_type(('id', 'first_name'))
+    assert record is not StudentRecord
+    assert [field.name for field in fields(record)] == ['id', 'first_name']
+    assert record(1, 'Ali').first_name == 'Ali'
+    with pytest.raises(AttributeError):
+        # slotted, like StudentRecord
+        record(1, 'Ali').last_name = 'R'
+
+
+def test_record_types_are_created_once_per_fieldset():
+    assert record_type(('id', 'address')) is record_type(('id', 'address'))
+
+
+def test_extra_fields_come_after_the_columns():
+    record = record_type(DEFAULT_FIELDS, ('score',))
+    assert record is not StudentRecord
+    assert [field.name for field in fields(record)] == [*DEFAULT_FIELDS, 'score']
+
+
+@pytest.mark.parametrize('fieldset', [
+    'first_name,birth_date,graduation_date,enrollment_date',
+    ','.join(STUDENT_FIELDS),
+])
+def test_export_is_shaped_like_the_list(client, new_student, fieldset):
+    result = client.post('/v1/students/bulk', json=[new_student()]).json()['results'][0]
+    page = client.get('/v1/students/', params={
+        'fields': fieldset, 'after': encode_cursor('id', [result['id'] - 1]), 'limit': 1
+    }).json()
+
+    export = client.get('/v1/students/export', params={'fields': fieldset})
+
+    exported = [orjson.loads(line) for line in export.content.splitlines()]
+    assert [student for student in exported if student['id'] == result['id']] == page['items']
+
+
+def test_csv_export_writes_dates(client, new_student):
+    student = new_student()
+    result = client.post('/v1/students/bulk', json=[student]).json()['results'][0]
+
+    export = client.get('/v1/students/export', params={'format': 'csv'})
+
+    rows = {row['id']: row for row in csv.DictReader(io.StringIO(export.text))}
+    row = rows[str(result['id'])]
+    assert (row['birth_date'], row['graduation_date']) == (
+        student['birth_date'], student['graduation_date']
+    )
+    assert list(row) == list(STUDENT_FIELDS)
@@ -0,0 +1,92 @@
+import asyncio
+import random
+from contextlib import aclosing
+from typing import List, Optional
+
+import pytest
+
+from student.repository.dal.sharded import merge_batches, page_order
+
+
+def test_id_order():
+    key = page_order(1, 'id', descending=False)
+    assert key(('Ali', 7)) == (7,)
+
+
+@pytest.mark.parametrize('descending', [False, True])
+def test_missing_sort_values_come_last(descending):
+    # rows are the selected fields, then the sort value and the id
+    rows = [('a', 'Rezaei', 1), ('b', None, 2), ('c', 'Ahmadi', 3), ('d', None, 4), ('e', 'Ahmadi', 5)]
+    key = page_order(1, 'last_name', descending)
+    ordered = [row[0] for row in sorted(rows, key=key, reverse=descending)]
+    if descending:
+        assert ordered == ['a', 'e', 'c', 'd', 'b']
+    else:
+        assert ordered == ['c', 'e', 'a', 'b', 'd']
+
+
+async def stream(batches: List[list], closed: List[int], index: int):
+    try:
+        for batch in batches:
+            await asyncio.sleep(0)
+            yield batch
+    finally:
+        closed.append(index)
+
+
+def merge(shards: List[List[list]], batch_size: int, take: Optional[int] = None) -> tuple:
+    closed = []
+
+    async def run():
+        merged = []
+        streams = [stream(batches, closed, index) for index, batches in enumerate(shards)]
+        batches = merge_batches(streams, key=lambda row: row, batch_size=batch_size)
+        async with aclosing(batches):
+            async for batch in batches:
+                merged.append(batch)
+                if take is not None and len(merged) == take:
+                    break
+            if take is not None:
+                assert closed == []
+        return merged
+
+    merged = asyncio.run(run())
+    return merged, sorted(closed)
+
+
+def test_merge_batches():
+    shards = [
+        [[1, 4], [6, 9]],
+        [[2, 3, 5]],
+        [],
+        [[7], [8], [10]],
+    ]
+    merged, closed = merge(shards, batch_size=4)
+    assert merged == [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10]]
+    assert closed == [0, 1, 2, 3]
+
+
+def test_merge_batches_drops_duplicate_keys():
+    # a student being moved by a rebalance is on both shards for an instant
+    merged, _ = merge([[[1, 3, 5]], [[3, 4, 5]]], batch_size=10)
+    assert merged == [[1, 3, 4, 5]]
+
+
+def test_merge_batches_of_random_streams():
+    rng = random.Random(7)
+    keys = rng.sample(range(1000), 300)
+    shards = []
+    for index in range(3):
+        shard = sorted(keys[index::3])
+        # batches of random sizes, each shard's still in order
+        cuts = sorted(rng.sample(range(1, len(shard)), 8))
+        shards.append([shard[start:end] for start, end in zip([0, *cuts], [*cuts, len(shard)])])
+    merged, _ = merge(shards, batch_size=32)
+    assert [key for batch in merged for key in batch] == sorted(keys)
+    assert all(len(batch) == 32 for batch in merged[:-1])
+
+
+def test_merge_batches_closes_streams_when_left_early():
+    merged, closed = merge([[[1], [3], [5]], [[2], [4], [6]]], batch_size=2, take=1)
+    assert merged == [[1, 2]]
+    assert closed == [0, 1]
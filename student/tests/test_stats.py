@@ -0,0 +1,94 @@
+from collections import Counter
+
+from student.helpers.enums import GenderOptions, GradeOptions
+
+BACHELOR, MASTER = GradeOptions.BACHELOR.value, GradeOptions.MASTER.value
+FEMALE, MALE = GenderOptions.FEMALE.value, GenderOptions.MALE.value
+
+
+def read_stats(client) -> dict:
+    response = client.get('/v1/students/stats')
+    assert response.status_code == 200
+    return response.json()
+
+
+def changes(before: dict, after: dict) -> dict:
+    """Returns the non-zero changes of every count between two reads."""
+    result = {'total': after['total'] - before['total']}
+    for name in ('by_education', 'by_gender', 'enrollments_per_month'):
+        counts = Counter(after[name])
+        counts.subtract(before[name])
+        result[name] = {key: count for key, count in counts.items() if count}
+    return result
+
+
+def create_students(client, *students: dict) -> list:
+    results = client.post('/v1/students/bulk', json=list(students)).json()['results']
+    return [result['id'] for result in results]
+
+
+def test_creates_are_counted(client, new_student):
+    before = read_stats(client)
+
+    create_students(
+        client,
+        new_student(education=MASTER, gender=MALE),
+        new_student(education=MASTER, gender=FEMALE),
+        new_student(education=BACHELOR, gender=FEMALE),
+    )
+
+    delta = changes(before, read_stats(client))
+    assert delta['total'] == 3
+    assert delta['by_education'] == {MASTER: 2, BACHELOR: 1}
+    assert delta['by_gender'] == {FEMALE: 2, MALE: 1}
+    assert list(delta['enrollments_per_month'].values()) == [3]
+
+
+def test_updates_move_students_between_buckets(client, new_student):
+    student = new_student(education=BACHELOR, gender=FEMALE)
+    [id] = create_students(client, student)
+    before = read_stats(client)
+
+    client.put(f'/v1/students/{id}', json={**student, 'education': MASTER})
+
+    assert changes(before, read_stats(client)) == {
+        'total': 0,
+        'by_education': {BACHELOR: -1, MASTER: 1},
+        'by_gender': {},
+        'enrollments_per_month': {},
+    }
+
+
+def test_deletes_are_counted(client, new_student):
+    ids = create_students(client, new_student(gender=MALE), new_student(gender=MALE))
+    before = read_stats(client)
+
+    client.delete(f'/v1/students/{ids[0]}')
+    client.post('/v1/students/batch', json={'operations': [{'op': 'delete', 'id': ids[1]}]})
+
+    delta = changes(before, read_stats(client))
+    assert (delta['total'], delta['by_gender']) == (-2, {MALE: -2})
+
+
+def test_rolled_back_writes_are_not_counted(client, new_student):
+    existing = new_student()
+    create_students(client, existing)
+    before = read_stats(client)
+
+    client.post('/v1/students/batch', json={'atomic': True, 'operations': [
+        {'op': 'create', 'data': new_student()},
+        {'op': 'create', 'data': existing},
+    ]})
+
+    assert read_stats(client) == before
+
+
+def test_counts_match_a_rebuild(client, new_student):
+    ids = create_students(client, *(new_student(education=MASTER) for _ in range(3)))
+    client.delete(f'/v1/students/{ids[0]}')
+    maintained = read_stats(client)
+
+    response = client.post('/admin/stats/rebuild')
+
+    assert response.json() == {'total': maintained['total']}
+    assert read_stats(client) == maintained
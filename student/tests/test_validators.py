@@ -0,0 +1,51 @@
+import pytest
+
+from student.helpers.exceptions import InvalidPhoneNumberError
+from student.helpers.validators import normalize_phone_number
+
+
+@pytest.mark.parametrize('value', [
+    '09123456789',
+    '9123456789',
+    '989123456789',
+    '+989123456789',
+    '+98 912 345 6789',
+    '0912-345-6789',
+    '(0912) 345 6789',
+])
+def test_accepted_forms_are_canonical(value):
+    assert normalize_phone_number(value) == '09123456789'
+
+
+@pytest.mark.parametrize('value', [
+    '',
+    '0912345678',
+    '091234567890',
+    '08123456789',
+    '+9809123456789',
+    '0098 912 345 6789',
+    '0912345678a',
+    '0912.345.6789',
+    # only ASCII digits, not e.g. Persian ones
+    '۰۹۱۲۳۴۵۶۷۸۹',
+])
+def test_invalid_numbers_are_rejected(value):
+    with pytest.raises(InvalidPhoneNumberError):
+        normalize_phone_number(value)
+
+
+def test_lookup_by_any_accepted_form(client, new_student):
+    student = new_student()
+    [result] = client.post('/v1/students/bulk', json=[student]).json()['results']
+    digits = student['phone_number'][1:]
+
+    for phone_number in (f'+98{digits}', digits, f'0{digits[:3]}-{digits[3:]}'):
+        response = client.get(f'/v1/students/by-phone/{phone_number}')
+        assert response.status_code == 200
+        assert response.json()['id'] == result['id']
+        assert 'ETag' in response.headers
+
+
+def test_lookup_by_invalid_or_unknown_number(client):
+    assert client.get('/v1/students/by-phone/0912').status_code == 400
+    assert client.get('/v1/students/by-phone/09999999999').status_code == 404
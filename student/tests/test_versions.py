@@ -0,0 +1,129 @@
+import pytest
+
+MISSING_ID = 10 ** 9
+
+
+@pytest.fixture
+def student(client, new_student) -> dict:
+    student = new_student()
+    result = client.post('/v1/students/bulk', json=[student]).json()['results'][0]
+    return {**student, 'id': result['id']}
+
+
+def etag_of(client, id: int) -> str:
+    return client.get(f'/v1/students/{id}').headers['ETag']
+
+
+def test_current_etag_is_not_modified(client, student):
+    etag = etag_of(client, student['id'])
+
+    response = client.get(f"/v1/students/{student['id']}", headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert response.content == b''
+
+
+@pytest.mark.parametrize('header', ['W/{etag}', '"0", {etag}', '*'])
+def test_if_none_match_forms(client, student, header):
+    etag = etag_of(client, student['id'])
+
+    response = client.get(
+        f"/v1/students/{student['id']}",
+        headers={'If-None-Match': header.format(etag=etag)}
+    )
+
+    assert response.status_code == 304
+
+
+def test_stale_etag_gets_the_student(client, student):
+    etag = etag_of(client, student['id'])
+    client.put(f"/v1/students/{student['id']}", json=student)
+
+    response = client.get(f"/v1/students/{student['id']}", headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.json()['id'] == student['id']
+
+
+def test_sparse_fieldsets_carry_the_etag(client, student):
+    etag = etag_of(client, student['id'])
+
+    response = client.get(f"/v1/students/{student['id']}", params={'fields': 'first_name'})
+
+    assert response.headers['ETag'] == etag
+    assert response.json() == {'id': student['id'], 'first_name': student['first_name']}
+
+
+def test_update_with_current_etag(client, student):
+    etag = etag_of(client, student['id'])
+
+    response = client.put(
+        f"/v1/students/{student['id']}",
+        json={**student, 'first_name': 'Maryam'},
+        headers={'If-Match': etag}
+    )
+
+    assert response.status_code == 200
+    assert response.json()['result'] is True
+    assert response.headers['ETag'] == etag_of(client, student['id']) != etag
+
+
+@pytest.mark.parametrize('header', ['"0"', 'W/{etag}', 'unversioned'])
+def test_update_with_stale_etag_fails(client, student, header):
+    etag = etag_of(client, student['id'])
+
+    response = client.put(
+        f"/v1/students/{student['id']}",
+        json={**student, 'first_name': 'Maryam'},
+        headers={'If-Match': header.format(etag=etag)}
+    )
+
+    assert response.status_code == 412
+    assert client.get(f"/v1/students/{student['id']}").json()['first_name'] == student['first_name']
+
+
+def test_update_of_missing_student(client, new_student):
+    response = client.put(f'/v1/students/{MISSING_ID}', json=new_student())
+
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize('header', ['"1"', '*'])
+def test_conditional_update_of_missing_student_fails(client, new_student, header):
+    response = client.put(
+        f'/v1/students/{MISSING_ID}', json=new_student(), headers={'If-Match': header}
+    )
+
+    assert response.status_code == 412
+
+
+def test_delete_with_current_etag(client, student):
+    etag = etag_of(client, student['id'])
+
+    response = client.delete(f"/v1/students/{student['id']}", headers={'If-Match': etag})
+
+    assert response.status_code == 200
+    assert response.json()['result'] is True
+    assert client.get(f"/v1/students/{student['id']}").status_code == 404
+
+
+def test_delete_with_stale_etag_fails(client, student):
+    response = client.delete(f"/v1/students/{student['id']}", headers={'If-Match': '"0"'})
+
+    assert response.status_code == 412
+    assert client.get(f"/v1/students/{student['id']}").status_code == 200
+
+
+def test_delete_of_missing_student(client):
+    response = client.delete(f'/v1/students/{MISSING_ID}')
+
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize('header', ['"1"', '*'])
+def test_conditional_delete_of_missing_student_fails(client, header):
+    response = client.delete(f'/v1/students/{MISSING_ID}', headers={'If-Match': header})
+
+    assert response.status_code == 412
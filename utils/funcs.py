@@ -1,14 +1,24 @@
 import os
 import tomllib
+from functools import cache
 from typing import Dict
 
 
-def get_settings() -> Dict[str, str]:
+@cache
+def get_settings(path: str = 'settings.toml') -> Dict[str, str]:
     """
     Retrieve settings from a TOML configuration file.
 
     Returns a dictionary containing key-value pairs for the settings
-    specified in the configuration file.
+    specified in the configuration file. The file is `path`, or the one
+    named by the `SETTINGS_FILE` environment variable. It is parsed once;
+    later calls return the same dictionary.
+
+    Parameters
+    ----------
+    path : str, optional
+        The settings file, by default `settings.toml` in the working
+        directory.
 
     Returns
     -------
@@ -30,7 +40,7 @@ def get_settings() -> Dict[str, str]:
     >>> print(settings)
     {'host': 'localhost', 'port': '8080', 'debug': 'True'}
     """
-    with open('settings.toml', 'rb') as settings_file:
+    with open(os.environ.get('SETTINGS_FILE', path), 'rb') as settings_file:
         config = tomllib.load(settings_file)['settings']
     return config
 
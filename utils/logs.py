@@ -0,0 +1,133 @@
+import itertools
+import logging
+import os
+from logging.config import ConvertingList
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Dict, List, Tuple
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    A `QueueHandler` that owns the `QueueListener` draining its queue.
+
+    Logging calls only put the record on an unbounded queue; a background
+    thread formats it and hands it to the wrapped handlers, so file writes
+    and rotation never run on the request path. Unlike the stock
+    `QueueHandler`, records are not formatted before they are queued: they
+    never leave the process, so the formatting is left to the listener too.
+
+    Configured from `config/log/logging.toml` with `cfg://` references to
+    the wrapped handlers, which `dictConfig` must have built already, i.e.
+    their names have to sort before this handler's.
+
+    A process forked from one that configured logging, such as a server
+    worker, inherits the handler but not the listener thread; the child
+    starts a listener of its own on a fresh queue, leaving behind the
+    records the parent had queued.
+
+    Parameters
+    ----------
+    handlers : list of logging.Handler
+        The handlers records are dispatched to.
+    respect_handler_level : bool, optional
+        Whether the level of each wrapped handler is honored, by default
+        True.
+
+    Examples
+    --------
+    >>> handler = QueueListenerHandler([logging.StreamHandler()])
+    >>> logging.getLogger('core').addHandler(handler)
+    """
+
+    def __init__(
+        self,
+        handlers: List[logging.Handler],
+        respect_handler_level: bool = True
+    ) -> None:
+        super().__init__(SimpleQueue())
+        handlers = _resolve_handlers(handlers)
+        for handler in handlers:
+            if not isinstance(handler, logging.Handler):
+                raise TypeError(
+                    f"{handler!r} is not a handler, the wrapped handlers must "
+                    "be configured before the queue handler"
+                )
+        self.respect_handler_level = respect_handler_level
+        self.listener = QueueListener(
+            self.queue, *handlers, respect_handler_level=respect_handler_level
+        )
+        self.listener.start()
+        self._listening = True
+        os.register_at_fork(after_in_child=self._restart_listener)
+
+    def _restart_listener(self) -> None:
+        if not self._listening:
+            return
+        self.queue = SimpleQueue()
+        self.listener = QueueListener(
+            self.queue, *self.listener.handlers,
+            respect_handler_level=self.respect_handler_level
+        )
+        self.listener.start()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def close(self) -> None:
+        """
+        Stops the listener once every queued record has been handled.
+
+        Called by `logging.shutdown()` at exit, before the wrapped handlers
+        are closed since this handler was created after them.
+        """
+        if self._listening:
+            self._listening = False
+            self.listener.stop()
+        super().close()
+
+
+def _resolve_handlers(handlers: List) -> List[logging.Handler]:
+    """Resolves the `cfg://` references `dictConfig` passes in lazily."""
+    if isinstance(handlers, ConvertingList):
+        # items are only converted when indexed, not when iterated
+        return [handlers[index] for index in range(len(handlers))]
+    return list(handlers)
+
+
+class SampleFilter(logging.Filter):
+    """
+    Lets through one in every `rate` routine records of each call site.
+
+    Records above `level` are never dropped, so only routine messages, such
+    as the DEBUG success messages of the read path, are sampled. The first
+    record of a call site always passes.
+
+    Parameters
+    ----------
+    rate : int, optional
+        One in how many records is kept, by default 1 (all of them).
+    level : str, optional
+        The highest level that is sampled, by default "DEBUG".
+
+    Examples
+    --------
+    >>> logging.getLogger('core').addFilter(SampleFilter(rate=100))
+    """
+
+    def __init__(self, rate: int = 1, level: str = 'DEBUG') -> None:
+        super().__init__()
+        self.rate = rate
+        self.level = logging.getLevelName(level)
+        self._counters: Dict[Tuple[str, int], itertools.count] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 1 or record.levelno > self.level:
+            return True
+        key = (record.pathname, record.lineno)
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters.setdefault(key, itertools.count())
+        # `next` on an itertools.count is atomic, so threads sharing a call
+        # site never reuse a number
+        return next(counter) % self.rate == 0